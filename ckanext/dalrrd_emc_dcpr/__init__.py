@@ -3,13 +3,31 @@ import functools
 from ckan.config.middleware import make_app
 from ckan.plugins import toolkit
 
+from . import caching
+
 
 def provide_request_context(func):
+    """Run the decorated function inside a test request context of the CKAN app
+
+    The wrapped function receives the request context as its first argument. The
+    CKAN app is built only once per process, as building it loads every plugin, and
+    it is then reused by all calls. Background jobs run in processes that are forked
+    by the jobs worker, so the plugin builds the app in the worker before it forks
+    (see `DalrrdEmcDcprPlugin.before_fork()`).
+
+    """
+
     @functools.wraps(func)
     def wrapped(*args, **kwargs):
-        app = make_app(toolkit.config)
+        app = get_app()
         with app._wsgi_app.test_request_context() as context:
             result = func(context, *args, **kwargs)
         return result
 
     return wrapped
+
+
+@caching.static_value()
+def get_app():
+    """Return the CKAN app, building it only once per process"""
+    return make_app(toolkit.config)
@@ -60,13 +60,15 @@ def _request_url_(params_nopage, requests_type, q=None, page=None):
 
 
 def _get_dcpr_request_list(ckan_action: str, should_show_create_action: bool = False):
+    page = h.get_page_number(request.args)
+    items_per_page = 20
     try:
         dcpr_requests = toolkit.get_action(ckan_action)(
             context={
                 "user": toolkit.g.user,
                 "dictize_for_ui": True,
             },
-            data_dict={},
+            data_dict={"page": page, "limit": items_per_page},
         )
     except toolkit.NotAuthorized:
         result = toolkit.abort(
@@ -80,18 +82,19 @@ def _get_dcpr_request_list(ckan_action: str, should_show_create_action: bool = F
         ]
         params_nosort = [(k, v) for k, v in params_nopage]
         pager_url = partial(_request_url_, params_nosort, None)
-        page = h.get_page_number(request.args)
+        pager = h.Page(
+            collection=dcpr_requests["results"],
+            page=page,
+            item_count=dcpr_requests["count"],
+            items_per_page=items_per_page,
+            presliced_list=True,
+            url=pager_url,
+        )
         extra_vars = {
-            "dcpr_requests": dcpr_requests,
+            "dcpr_requests": dcpr_requests["results"],
             "statuses": get_status_labels(),
             "show_create_button": should_show_create_action,
-            "page": h.Page(
-                collection=dcpr_requests,
-                items_per_page=20,
-                url=pager_url,
-                page=page,
-                item_count=len(dcpr_requests),
-            ),
+            "page": pager,
         }
         result = toolkit.render("dcpr/list.html", extra_vars=extra_vars)
     return result
@@ -454,7 +457,7 @@ class DcprRequestSubmitView(MethodView):
         if "cancel" not in request.form.keys():
             context = _prepare_context()
             try:
-                toolkit.get_action("dcpr_request_submit")(
+                submitted = toolkit.get_action("dcpr_request_submit")(
                     context, data_dict={"csi_reference_id": csi_reference_id}
                 )
             except toolkit.ObjectNotFound:
@@ -465,6 +468,14 @@ class DcprRequestSubmitView(MethodView):
                 )
             else:
                 toolkit.h["flash_notice"](toolkit._("Dataset has been submitted!"))
+                overlapping = submitted.get("overlapping_accepted_requests", [])
+                if len(overlapping) > 0:
+                    toolkit.h["flash_notice"](
+                        toolkit._(
+                            "The spatial extent of this request overlaps with the "
+                            "following accepted requests: {}"
+                        ).format(", ".join(overlapping))
+                    )
                 result = toolkit.redirect_to(
                     toolkit.h["url_for"](
                         "dcpr.dcpr_request_show", csi_reference_id=csi_reference_id
@@ -717,6 +728,7 @@ def _unflatten_dcpr_request_datasets(flat_data_dict: typing.Dict) -> typing.Dict
         "associated_attributes",
         "data_usage_restrictions",
         "capture_method",
+        "dataset_id",
     ]
     # how many datasets have been submitted?
     first_ds_field_value = flat_data_dict.get(dataset_fields[0])
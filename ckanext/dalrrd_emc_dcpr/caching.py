@@ -0,0 +1,348 @@
+"""Caching utilities for the dalrrd-emc-dcpr extension
+
+The caches defined in this module are meant for data that is expensive to compute and
+that changes rarely, like catalogue-wide search facets or the titles of
+organizations.
+
+Caches are identified by name and are created lazily by calling `get_cache()`. This
+allows unrelated parts of the code (e.g. the code that fills a cache and the code
+that invalidates it) to share the same cache instance.
+
+By default caches live in the memory of the current process. Caches that are
+requested with `shared=True` are instead stored in CKAN's redis instance whenever the
+`ckan.dalrrd_emc_dcpr.shared_cache_backend` setting is set to `redis`, which means
+all CKAN worker processes see the same copy.
+
+Request-scoped caches, obtained with `get_request_cache()`, are plain dicts that are
+discarded at the end of the current request. Outside of requests they may be kept in
+an action context instead.
+
+Additionally, the `static_value` decorator provides a registry of values that never
+change during the lifetime of a process (e.g. the installed version of this
+extension) and thus only need to be computed once.
+
+"""
+
+import abc
+import functools
+import json
+import logging
+import threading
+import time
+import typing
+
+import flask
+import redis
+from ckan.lib.redis import connect_to_redis
+from ckan.plugins import toolkit
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+GLOBAL_FACETS_SNAPSHOT_CACHE_NAME: typing.Final[str] = "global_facets_snapshot"
+GROUP_TITLES_CACHE_NAME: typing.Final[str] = "group_titles"
+HOMEPAGE_DATASETS_CACHE_NAME: typing.Final[str] = "homepage_datasets"
+NAV_PAGES_CACHE_NAME: typing.Final[str] = "nav_pages"
+VOCABULARIES_CACHE_NAME: typing.Final[str] = "vocabularies"
+USER_MEMBERSHIPS_REQUEST_CACHE_NAME: typing.Final[str] = "user_memberships"
+ORG_MEMBERS_REQUEST_CACHE_NAME: typing.Final[str] = "org_members"
+
+_REQUEST_CACHES_ATTRIBUTE_NAME: typing.Final[str] = "_dalrrd_emc_dcpr_request_caches"
+
+SHARED_CACHE_BACKEND_CONFIG_KEY: typing.Final[
+    str
+] = "ckan.dalrrd_emc_dcpr.shared_cache_backend"
+
+
+class Cache(abc.ABC):
+    """Base class for caches, subclasses implement how entries are stored"""
+
+    name: str
+    ttl_seconds: typing.Optional[float]
+
+    def __init__(self, name: str, ttl_seconds: typing.Optional[float] = None):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+
+    @abc.abstractmethod
+    def get(self, key: typing.Hashable, default: typing.Any = None) -> typing.Any:
+        ...
+
+    @abc.abstractmethod
+    def set(
+        self,
+        key: typing.Hashable,
+        value: typing.Any,
+        ttl_seconds: typing.Optional[float] = None,
+    ) -> None:
+        ...
+
+    @abc.abstractmethod
+    def invalidate(self, key: typing.Any = _MISSING) -> None:
+        """Remove `key` from the cache. If no key is given, the cache is emptied"""
+
+    def get_many(
+        self, keys: typing.Iterable[typing.Hashable]
+    ) -> typing.Dict[typing.Hashable, typing.Any]:
+        """Return a mapping with the cached values of those keys that are present"""
+        result = {}
+        for key in keys:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                result[key] = value
+        return result
+
+    def get_or_set(
+        self,
+        key: typing.Hashable,
+        factory: typing.Callable[[], typing.Any],
+        ttl_seconds: typing.Optional[float] = None,
+    ) -> typing.Any:
+        """Return the cached value for `key`, calling `factory` to fill it if needed"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            logger.debug(f"cache {self.name!r} miss for key {key!r}")
+            value = factory()
+            self.set(key, value, ttl_seconds=ttl_seconds)
+        return value
+
+    def _get_ttl(
+        self, ttl_seconds: typing.Optional[float] = None
+    ) -> typing.Optional[float]:
+        return ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+
+
+class LocalCache(Cache):
+    """A process-local key-value cache with optional expiration of entries"""
+
+    _entries: typing.Dict[
+        typing.Hashable, typing.Tuple[typing.Optional[float], typing.Any]
+    ]
+
+    def __init__(self, name: str, ttl_seconds: typing.Optional[float] = None):
+        super().__init__(name, ttl_seconds=ttl_seconds)
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: typing.Hashable, default: typing.Any = None) -> typing.Any:
+        with self._lock:
+            try:
+                expires_at, value = self._entries[key]
+            except KeyError:
+                result = default
+            else:
+                if expires_at is not None and expires_at <= time.monotonic():
+                    del self._entries[key]
+                    result = default
+                else:
+                    result = value
+        return result
+
+    def set(
+        self,
+        key: typing.Hashable,
+        value: typing.Any,
+        ttl_seconds: typing.Optional[float] = None,
+    ) -> None:
+        ttl = self._get_ttl(ttl_seconds)
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+
+    def invalidate(self, key: typing.Any = _MISSING) -> None:
+        with self._lock:
+            if key is _MISSING:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+class RedisCache(Cache):
+    """A key-value cache stored in redis, which is shared by all CKAN processes
+
+    Values must be JSON-serializable. Keys are converted to strings.
+
+    Invalidating the whole cache is done by incrementing a generation counter which
+    is part of every key. Old entries thus become unreachable and are eventually
+    removed by redis when they expire.
+
+    Redis errors are logged and otherwise treated as cache misses, so that an
+    unavailable redis never prevents pages from being rendered.
+
+    """
+
+    def get(self, key: typing.Hashable, default: typing.Any = None) -> typing.Any:
+        try:
+            conn = connect_to_redis()
+            raw_value = conn.get(self._build_key(conn, key))
+        except redis.exceptions.RedisError:
+            logger.exception(f"Could not read from cache {self.name!r}")
+            raw_value = None
+        return json.loads(raw_value) if raw_value is not None else default
+
+    def set(
+        self,
+        key: typing.Hashable,
+        value: typing.Any,
+        ttl_seconds: typing.Optional[float] = None,
+    ) -> None:
+        ttl = self._get_ttl(ttl_seconds)
+        try:
+            conn = connect_to_redis()
+            conn.set(
+                self._build_key(conn, key),
+                json.dumps(value),
+                ex=int(ttl) if ttl else None,
+            )
+        except redis.exceptions.RedisError:
+            logger.exception(f"Could not write to cache {self.name!r}")
+
+    def invalidate(self, key: typing.Any = _MISSING) -> None:
+        try:
+            conn = connect_to_redis()
+            if key is _MISSING:
+                conn.incr(self._generation_key)
+            else:
+                conn.delete(self._build_key(conn, key))
+        except redis.exceptions.RedisError:
+            logger.exception(f"Could not invalidate cache {self.name!r}")
+
+    @property
+    def _prefix(self) -> str:
+        site_id = toolkit.config.get("ckan.site_id", "default")
+        return f"{site_id}:dalrrd_emc_dcpr:cache:{self.name}"
+
+    @property
+    def _generation_key(self) -> str:
+        return f"{self._prefix}:generation"
+
+    def _build_key(self, conn, key: typing.Hashable) -> str:
+        generation = int(conn.get(self._generation_key) or 0)
+        return f"{self._prefix}:{generation}:{key}"
+
+
+_caches: typing.Dict[str, Cache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(
+    name: str, ttl_seconds: typing.Optional[float] = None, shared: bool = False
+) -> Cache:
+    """Return the cache with the input name, creating it if it does not exist yet
+
+    When `shared` is true, the cache is stored in the backend that is configured in
+    the `ckan.dalrrd_emc_dcpr.shared_cache_backend` setting (either `local`, which is
+    the default, or `redis`).
+
+    If `ttl_seconds` is given it becomes the default TTL of the cache's entries.
+
+    """
+
+    with _caches_lock:
+        try:
+            cache = _caches[name]
+        except KeyError:
+            backend = toolkit.config.get(SHARED_CACHE_BACKEND_CONFIG_KEY, "local")
+            if shared and backend == "redis":
+                cache = RedisCache(name, ttl_seconds=ttl_seconds)
+            else:
+                cache = LocalCache(name, ttl_seconds=ttl_seconds)
+            _caches[name] = cache
+        else:
+            if ttl_seconds is not None:
+                cache.ttl_seconds = ttl_seconds
+    return cache
+
+
+def invalidate(name: str, key: typing.Any = _MISSING, shared: bool = False) -> None:
+    """Invalidate the cache with the input name
+
+    Process-local caches are only invalidated if they exist. Shared caches are always
+    invalidated, as their entries may have been stored by another process.
+
+    """
+
+    cache = get_cache(name, shared=True) if shared else _caches.get(name)
+    if cache is not None:
+        cache.invalidate(key)
+
+
+def invalidate_all() -> None:
+    """Invalidate all caches that have been used by the current process"""
+    for cache in list(_caches.values()):
+        cache.invalidate()
+
+
+def get_request_cache(
+    name: str, context: typing.Optional[typing.Dict] = None
+) -> typing.Dict:
+    """Return a dict that can be used to cache values during the current request
+
+    Outside of a request (e.g. when running CLI commands, harvest jobs or other
+    background jobs) the cache is kept in the input action `context` instead, so that
+    it lasts for as long as that context is in use. Without a context a new empty
+    dict is returned on each call, which means nothing is cached.
+
+    """
+
+    if flask.has_request_context():
+        request_caches = flask.g.setdefault(_REQUEST_CACHES_ATTRIBUTE_NAME, {})
+    elif context is not None:
+        request_caches = context.setdefault(_REQUEST_CACHES_ATTRIBUTE_NAME, {})
+    else:
+        request_caches = {}
+    return request_caches.setdefault(name, {})
+
+
+def invalidate_request_cache(
+    name: str, context: typing.Optional[typing.Dict] = None
+) -> None:
+    """Empty the request-scoped cache with the input name, if it exists"""
+    if flask.has_request_context():
+        request_caches = flask.g.get(_REQUEST_CACHES_ATTRIBUTE_NAME, {})
+    elif context is not None:
+        request_caches = context.get(_REQUEST_CACHES_ATTRIBUTE_NAME, {})
+    else:
+        request_caches = {}
+    request_caches.pop(name, None)
+
+
+_static_values: typing.Dict[typing.Hashable, typing.Any] = {}
+
+
+def static_value(vary_on: typing.Optional[typing.Callable[[], typing.Hashable]] = None):
+    """Decorator that computes the result of a function only once per process
+
+    The decorated function's arguments are part of the registry key, so they must be
+    hashable. `vary_on` can be used to also key results on something other than the
+    arguments, like the language of the current request.
+
+    """
+
+    def decorator(func):
+        name = f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (
+                name,
+                args,
+                tuple(sorted(kwargs.items())),
+                vary_on() if vary_on is not None else None,
+            )
+            try:
+                result = _static_values[key]
+            except KeyError:
+                result = func(*args, **kwargs)
+                _static_values[key] = result
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def reset_static_values() -> None:
+    """Forget all values that have been computed by `static_value` functions"""
+    _static_values.clear()
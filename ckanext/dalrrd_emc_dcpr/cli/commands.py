@@ -5,6 +5,8 @@ import inspect
 import json
 import logging
 import os
+import random
+import statistics
 import sys
 import time
 import traceback
@@ -21,6 +23,7 @@ import ckan.plugins as p
 from ckan.plugins import toolkit
 from ckan import model
 from ckan.lib.navl import dictization_functions
+from ckan.lib.redis import connect_to_redis
 from lxml import etree
 from sqlalchemy import text as sla_text
 
@@ -30,16 +33,27 @@ from .. import provide_request_context
 from ckanext.dalrrd_emc_dcpr.model.dcpr_request import (
     DCPRRequest,
     DCPRGeospatialRequest,
+    dcpr_request_dataset_table,
+    dcpr_request_table,
 )
 from ckanext.dalrrd_emc_dcpr.model.dcpr_error_report import DCPRErrorReport
 
 from .. import jobs
 from ..constants import (
+    DatasetManagementActivityType,
+    DcprManagementActivityType,
+    DCPRRequestStatus,
     ISO_TOPIC_CATEGOY_VOCABULARY_NAME,
     ISO_TOPIC_CATEGORIES,
     SASDI_THEMES_VOCABULARY_NAME,
 )
+from ..dcpr_dictization import DCPR_REQUEST_ACTIVITY_COLUMNS
 from ..email_notifications import get_and_send_notifications_for_all_users
+from ..logic.action import (
+    DATASET_ACTIVITY_FIELDS,
+    build_relaxed_activity_schema,
+    get_management_activity_schema,
+)
 
 from . import utils
 from ._bootstrap_data import PORTAL_PAGES, SASDI_ORGANIZATIONS
@@ -63,6 +77,7 @@ _DEFAULT_LEGACY_SASDI_THUMBNAIL_DIR = (
 )
 _DEFAULT_MAX_WORKERS = 5
 _PYCSW_MATERIALIZED_VIEW_NAME = "public.emc_pycsw_view"
+_BENCHMARK_DCPR_REQUEST_NAME_PREFIX = "benchmark-dcpr-request-"
 
 
 @click.group()
@@ -99,6 +114,64 @@ def send_email_notifications():
         logger.error(f"{setting_key} is not enabled in config. Aborting...")
 
 
+@dalrrd_emc_dcpr.command()
+@click.option("-b", "--batch-size", default=500, show_default=True)
+def compact_activities(batch_size: int):
+    """Compact the payload of existing DCPR and dataset management activities
+
+    Older activities store a full snapshot of the DCPR request or dataset they refer
+    to, whereas newer ones only store the fields that describe the activity. This
+    command removes the extra fields from older activities. It is safe to run it more
+    than once.
+
+    """
+
+    activity_types = [t.value for t in DcprManagementActivityType] + [
+        t.value for t in DatasetManagementActivityType
+    ]
+    num_compacted = 0
+    last_id = ""
+    while True:
+        batch = (
+            model.Session.query(model.Activity)
+            .filter(
+                model.Activity.activity_type.in_(activity_types),
+                model.Activity.id > last_id,
+            )
+            .order_by(model.Activity.id)
+            .limit(batch_size)
+            .all()
+        )
+        if len(batch) == 0:
+            break
+        for activity in batch:
+            compact_data = _compact_activity_data(activity.data or {})
+            if compact_data != activity.data:
+                activity.data = compact_data
+                num_compacted += 1
+        last_id = batch[-1].id
+        model.Session.commit()
+    logger.info(f"Compacted {num_compacted} activities")
+
+
+def _compact_activity_data(data: typing.Dict) -> typing.Dict:
+    result = dict(data)
+    dcpr_request = data.get("dcpr_request")
+    if dcpr_request is not None:
+        result["dcpr_request"] = {
+            column: dcpr_request.get(column) for column in DCPR_REQUEST_ACTIVITY_COLUMNS
+        }
+        result["dcpr_request"]["changed_fields"] = dcpr_request.get(
+            "changed_fields", []
+        )
+    dataset = data.get("package")
+    if dataset is not None:
+        result["package"] = {
+            field: dataset.get(field) for field in DATASET_ACTIVITY_FIELDS
+        }
+    return result
+
+
 @dalrrd_emc_dcpr.group()
 def bootstrap():
     """Bootstrap the dalrrd-emc-dcpr extension"""
@@ -999,6 +1072,249 @@ def test_background_job(job_name, job_arg, job_kwarg):
         logger.error(f"Job function {job_name!r} does not exist")
 
 
+@extra_commands.command()
+@click.option("-n", "--num-requests", default=20_000, show_default=True)
+@click.option("-o", "--owner-user", default="tester3", show_default=True)
+@click.option(
+    "-g",
+    "--organization",
+    help=(
+        "Organization of the generated requests. Defaults to the first organization "
+        "where the owner user is a member"
+    ),
+)
+@click.option("-r", "--repetitions", default=5, show_default=True)
+@click.option(
+    "--keep-data",
+    is_flag=True,
+    help="Do not delete the generated requests when the benchmark is done",
+)
+def benchmark_dcpr_request_lists(
+    num_requests: int,
+    owner_user: str,
+    organization: typing.Optional[str],
+    repetitions: int,
+    keep_data: bool,
+):
+    """Measure the latency of the DCPR request list actions
+
+    This command inserts NUM_REQUESTS synthetic DCPR requests and then reports the
+    median latency of each list action, both with and without the indexes of the
+    DCPR tables. Indexes are dropped inside a transaction which is rolled back
+    afterwards, but this locks the tables for the duration of the measurement, so
+    do not run this command against a production DB.
+
+    """
+
+    user_obj = model.User.get(owner_user)
+    if user_obj is None:
+        raise click.BadParameter(f"User {owner_user!r} does not exist")
+    if organization is None:
+        memberships = toolkit.h["emc_org_memberships"](user_obj.id)
+        if len(memberships) == 0:
+            raise click.BadParameter(
+                f"User {owner_user!r} is not a member of any organization"
+            )
+        org_obj = memberships[0][0]
+    else:
+        org_obj = model.Group.get(organization)
+        if org_obj is None:
+            raise click.BadParameter(f"Organization {organization!r} does not exist")
+
+    logger.info(f"Generating {num_requests} DCPR requests...")
+    _generate_benchmark_dcpr_requests(num_requests, user_obj.id, org_obj.id)
+    try:
+        logger.info("Measuring list latencies without indexes...")
+        for table in (dcpr_request_table, dcpr_request_dataset_table):
+            for index in table.indexes:
+                model.Session.execute(sla_text(f"DROP INDEX IF EXISTS {index.name}"))
+        without_indexes = _time_dcpr_request_lists(user_obj, repetitions)
+        model.Session.rollback()
+        logger.info("Measuring list latencies with indexes...")
+        with_indexes = _time_dcpr_request_lists(user_obj, repetitions)
+        model.Session.rollback()
+    finally:
+        # make sure the dropped indexes are never committed, even if the
+        # measurement has been interrupted
+        model.Session.rollback()
+        if not keep_data:
+            logger.info("Deleting generated DCPR requests...")
+            _delete_benchmark_dcpr_requests()
+
+    click.echo(f"{'action':<60} {'without indexes':>16} {'with indexes':>16}")
+    for name, seconds in with_indexes.items():
+        click.echo(
+            f"{name:<60} {without_indexes[name] * 1000:>13.1f} ms "
+            f"{seconds * 1000:>13.1f} ms"
+        )
+
+
+def _generate_benchmark_dcpr_requests(
+    num_requests: int, owner_id: str, organization_id: str, batch_size: int = 1000
+) -> None:
+    statuses = [status.value for status in DCPRRequestStatus]
+    now = dt.datetime.now(dt.timezone.utc).replace(tzinfo=None)
+    for batch_start in range(0, num_requests, batch_size):
+        requests = []
+        datasets = []
+        for index in range(batch_start, min(batch_start + batch_size, num_requests)):
+            request_id = model.types.make_uuid()
+            request_date = now - dt.timedelta(minutes=index)
+            requests.append(
+                {
+                    "csi_reference_id": request_id,
+                    "owner_user": owner_id,
+                    "organization_id": organization_id,
+                    "status": random.choice(statuses),
+                    "proposed_project_name": (
+                        f"{_BENCHMARK_DCPR_REQUEST_NAME_PREFIX}{index}"
+                    ),
+                    "capture_start_date": request_date,
+                    "capture_end_date": request_date + dt.timedelta(days=30),
+                    "cost": "1000",
+                    "request_date": request_date,
+                    "submission_date": request_date + dt.timedelta(hours=1),
+                }
+            )
+            datasets.append(
+                {
+                    "dataset_id": model.types.make_uuid(),
+                    "dcpr_request_id": request_id,
+                    "proposed_dataset_title": f"dataset {index}",
+                    "dataset_purpose": "benchmark",
+                }
+            )
+        model.Session.execute(dcpr_request_table.insert(), requests)
+        model.Session.execute(dcpr_request_dataset_table.insert(), datasets)
+        model.Session.commit()
+
+
+def _time_dcpr_request_lists(
+    user_obj: model.User, repetitions: int
+) -> typing.Dict[str, float]:
+    actions = (
+        "dcpr_request_list_public",
+        "my_dcpr_request_list",
+        "dcpr_request_list_awaiting_nsif_moderation",
+        "dcpr_request_list_awaiting_csi_moderation",
+        "dcpr_request_list_under_preparation",
+    )
+    result = {}
+    for action_name in actions:
+        action = toolkit.get_action(action_name)
+        for page in (1, 50):
+            timings = []
+            for _ in range(repetitions):
+                context = {
+                    "user": user_obj.name,
+                    "auth_user_obj": user_obj,
+                    "ignore_auth": True,
+                    "dictize_for_ui": True,
+                }
+                start = time.perf_counter()
+                action(context, {"page": page, "limit": 20})
+                timings.append(time.perf_counter() - start)
+                # make sure the next repetition loads everything from the DB again
+                model.Session.expunge_all()
+            result[f"{action_name} (page {page})"] = statistics.median(timings)
+    return result
+
+
+def _delete_benchmark_dcpr_requests() -> None:
+    benchmark_requests = sla_text(
+        "SELECT csi_reference_id FROM dcpr_request "
+        "WHERE proposed_project_name LIKE :prefix"
+    )
+    prefix = {"prefix": f"{_BENCHMARK_DCPR_REQUEST_NAME_PREFIX}%"}
+    model.Session.execute(
+        sla_text(
+            f"DELETE FROM dcpr_request_dataset "
+            f"WHERE dcpr_request_id IN ({benchmark_requests.text})"
+        ),
+        prefix,
+    )
+    model.Session.execute(
+        sla_text("DELETE FROM dcpr_request WHERE proposed_project_name LIKE :prefix"),
+        prefix,
+    )
+    model.Session.commit()
+
+
+@extra_commands.command()
+@click.option("-n", "--num-activities", default=10_000, show_default=True)
+def benchmark_activity_schemas(num_activities: int):
+    """Measure the overhead of preparing the schema of custom activities
+
+    This compares building the relaxed activity schema for each activity, which is
+    how it used to be done, with reusing the schema that is built once per process.
+
+    """
+
+    activity_type = DatasetManagementActivityType.REQUEST_MAINTENANCE
+    timings = {}
+    start = time.perf_counter()
+    for _ in range(num_activities):
+        build_relaxed_activity_schema(object_id_validators=["package_id_exists"])
+    timings["built per activity"] = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(num_activities):
+        get_management_activity_schema(activity_type)
+    timings["built once"] = time.perf_counter() - start
+    click.echo(f"{'schema':<30} {'per activity':>16}")
+    for name, seconds in timings.items():
+        click.echo(f"{name:<30} {seconds / num_activities * 1_000_000:>13.2f} us")
+
+
+@extra_commands.command()
+@click.option("-n", "--num-jobs", default=10, show_default=True)
+@click.option("-q", "--queue", default="benchmark", show_default=True)
+@click.option(
+    "-t",
+    "--timeout-seconds",
+    default=120,
+    show_default=True,
+    help="How long to wait for each job to report its startup time",
+)
+def benchmark_job_startup(num_jobs: int, queue: str, timeout_seconds: int):
+    """Measure how long background jobs take to start running with a request context
+
+    This enqueues jobs one at a time on QUEUE and reports how long each one took,
+    from being enqueued until it was running inside a request context. It compares
+    building the CKAN app in each job, which is how it used to be done, with reusing
+    the app that the worker builds before forking.
+
+    A jobs worker must be listening on the queue, which can be started with:
+
+    \b
+        ckan jobs worker benchmark
+
+    """
+
+    redis_conn = connect_to_redis()
+    results_key = f"dalrrd_emc_dcpr:benchmark_job_startup:{os.getpid()}"
+    job_functions = {
+        "app built per job": jobs.report_job_startup_without_app_reuse,
+        "app built once per worker": jobs.report_job_startup,
+    }
+    timings: typing.Dict[str, typing.List[float]] = {}
+    for name, job_function in job_functions.items():
+        timings[name] = []
+        for _ in range(num_jobs):
+            toolkit.enqueue_job(
+                job_function, args=[time.time(), results_key], queue=queue
+            )
+            result = redis_conn.blpop(results_key, timeout=timeout_seconds)
+            if result is None:
+                raise click.ClickException(
+                    f"No job reported its startup time, is a worker listening on "
+                    f"the {queue!r} queue?"
+                )
+            timings[name].append(float(result[1]))
+    click.echo(f"{'request context':<30} {'median job startup':>20}")
+    for name, job_timings in timings.items():
+        click.echo(f"{name:<30} {statistics.median(job_timings) * 1000:>17.1f} ms")
+
+
 @dalrrd_emc_dcpr.group()
 def pycsw():
     """Commands related to integration between CKAN and pycsw"""
@@ -75,6 +75,25 @@ class DCPRRequestStatus(enum.Enum):
     REJECTED = "REJECTED"
 
 
+# DCPR requests that have been moderated are visible to everyone
+DCPR_REQUEST_PUBLISHED_STATUSES: typing.Final[typing.Tuple[DCPRRequestStatus, ...]] = (
+    DCPRRequestStatus.ACCEPTED,
+    DCPRRequestStatus.REJECTED,
+)
+DCPR_REQUEST_NSIF_STATUSES: typing.Final[typing.Tuple[DCPRRequestStatus, ...]] = (
+    DCPRRequestStatus.UNDER_MODIFICATION_REQUESTED_BY_NSIF,
+    DCPRRequestStatus.AWAITING_NSIF_REVIEW,
+    DCPRRequestStatus.UNDER_NSIF_REVIEW,
+)
+DCPR_REQUEST_CSI_STATUSES: typing.Final[typing.Tuple[DCPRRequestStatus, ...]] = (
+    DCPRRequestStatus.UNDER_MODIFICATION_REQUESTED_BY_CSI,
+    DCPRRequestStatus.UNDER_CSI_REVIEW,
+)
+DCPR_REQUEST_NSIF_AND_CSI_STATUSES: typing.Final[
+    typing.Tuple[DCPRRequestStatus, ...]
+] = (DCPRRequestStatus.AWAITING_CSI_REVIEW,)
+
+
 class DcprRequestModerationAction(enum.Enum):
     APPROVE = "APPROVE"
     REJECT = "REJECT"
@@ -13,21 +13,54 @@ which builds the dictionary by iterating over the table columns.
 
 """
 
+import datetime as dt
+import json
 import logging
 import typing
 
 import ckan.lib.dictization as ckan_dictization
+import sqlalchemy
 
 from .model import dcpr_request as dcpr_request_model
 
 logger = logging.getLogger(__name__)
 
+DCPR_REQUEST_SUMMARY_COLUMNS: typing.Final[typing.Tuple[str, ...]] = (
+    "csi_reference_id",
+    "proposed_project_name",
+    "status",
+    "owner_user",
+    "organization_id",
+    "request_date",
+    "submission_date",
+    "nsif_review_date",
+    "csi_moderation_date",
+)
+
+DCPR_REQUEST_ACTIVITY_COLUMNS: typing.Final[typing.Tuple[str, ...]] = (
+    "csi_reference_id",
+    "proposed_project_name",
+    "status",
+    "owner_user",
+    "nsif_reviewer",
+    "csi_moderator",
+)
+
+# these columns are derived from others and are never reported as changed
+_DCPR_REQUEST_DERIVED_COLUMNS: typing.Final[typing.Tuple[str, ...]] = (
+    "search_vector",
+    "spatial_extent_geom",
+)
+
 
 def dcpr_request_dictize(
     dcpr_request: dcpr_request_model.DCPRRequest,
     context: typing.Dict,
 ) -> typing.Dict:
     result_dict = ckan_dictization.table_dictize(dcpr_request, context)
+    # these columns only exist to support searching and are derived from others
+    result_dict.pop("search_vector", None)
+    result_dict.pop("spatial_extent_geom", None)
     result_dict["datasets"] = []
     for dcpr_dataset in dcpr_request.datasets:
         dataset_dict = dcpr_request_dataset_dictize(dcpr_dataset, context)
@@ -46,6 +79,62 @@ def dcpr_request_dictize(
     return result_dict
 
 
+def dcpr_request_activity_dictize(
+    dcpr_request: dcpr_request_model.DCPRRequest,
+    changed_fields: typing.Optional[typing.Iterable[str]] = None,
+) -> typing.Dict:
+    """Dictize a DCPR request for storing in an activity
+
+    Activities only keep the columns listed in `DCPR_REQUEST_ACTIVITY_COLUMNS`,
+    together with the names of the fields that were changed by the activity. The full
+    state of the request is available from the `dcpr_request_show` action.
+
+    """
+
+    result_dict = {
+        column: getattr(dcpr_request, column)
+        for column in DCPR_REQUEST_ACTIVITY_COLUMNS
+    }
+    result_dict["changed_fields"] = sorted(changed_fields or [])
+    return result_dict
+
+
+def get_dcpr_request_changed_fields(
+    dcpr_request: dcpr_request_model.DCPRRequest,
+) -> typing.List[str]:
+    """Return the names of the columns of a DCPR request that have pending changes
+
+    This must be called before the session is flushed, as flushing resets the changes
+    that SQLAlchemy keeps track of.
+
+    """
+
+    state = sqlalchemy.inspect(dcpr_request)
+    return sorted(
+        attr.key
+        for attr in state.mapper.column_attrs
+        if attr.key not in _DCPR_REQUEST_DERIVED_COLUMNS
+        and state.attrs[attr.key].history.has_changes()
+    )
+
+
+def dcpr_request_summary_dictize(row, context: typing.Dict) -> typing.Dict:
+    """Dictize a row of a DCPR request summary query
+
+    Summary rows include the columns listed in `DCPR_REQUEST_SUMMARY_COLUMNS`,
+    together with the names of the owner and of the organization and the number of
+    datasets of the request.
+
+    """
+
+    result_dict = {}
+    for key, value in row._asdict().items():
+        if isinstance(value, dt.datetime):
+            value = value.isoformat()
+        result_dict[key] = value
+    return result_dict
+
+
 def dcpr_request_dataset_dictize(
     dcpr_dataset: dcpr_request_model.DCPRRequestDataset, context: typing.Dict
 ) -> typing.Dict:
@@ -62,23 +151,135 @@ def dcpr_request_dict_save(validated_data_dict: typing.Dict, context: typing.Dic
     dcpr_request = ckan_dictization.table_dict_save(
         validated_data_dict, dcpr_request_model.DCPRRequest, context
     )
+    if "spatial_extent" in validated_data_dict:
+        dcpr_request.spatial_extent_geom = spatial_extent_to_geometry(
+            validated_data_dict["spatial_extent"]
+        )
+    # changes are no longer tracked after flushing, so we keep them in the context
+    # for the activity that describes this save
+    changed_fields = get_dcpr_request_changed_fields(dcpr_request)
     context["session"].flush()
     if context.get("updated_by") == "owner":
         # allow modification of a request's datasets only if current save was requested by the owner
-        for ds in dcpr_request.datasets:
-            context["session"].delete(ds)
         dcpr_request_dataset_list_save(
             validated_data_dict.get("datasets", []), dcpr_request, context
         )
+        if _has_pending_dataset_changes(context["session"]):
+            changed_fields.append("datasets")
+        context["session"].flush()
+    context["dcpr_request_changed_fields"] = changed_fields
+    dcpr_request_model.update_search_vector(
+        context["session"], dcpr_request.csi_reference_id
+    )
     return dcpr_request
 
 
+def _has_pending_dataset_changes(session) -> bool:
+    return any(
+        isinstance(obj, dcpr_request_model.DCPRRequestDataset)
+        for obj in (*session.new, *session.deleted)
+    ) or any(
+        isinstance(obj, dcpr_request_model.DCPRRequestDataset)
+        and session.is_modified(obj)
+        for obj in session.dirty
+    )
+
+
+def parse_spatial_extent(
+    spatial_extent: typing.Optional[str],
+) -> typing.Optional[typing.Tuple[float, float, float, float]]:
+    """Parse a spatial extent into a (min_lon, min_lat, max_lon, max_lat) tuple
+
+    Spatial extents are either a GeoJSON polygon or a comma-separated bounding box
+    with upper left lat, upper left lon, lower right lat, lower right lon, which is
+    what the DCPR request form produces. Values that cannot be parsed result in
+    `None`.
+
+    """
+
+    result = None
+    if spatial_extent:
+        try:
+            coords = json.loads(spatial_extent)["coordinates"][0]
+            result = (
+                min(c[0] for c in coords),
+                min(c[1] for c in coords),
+                max(c[0] for c in coords),
+                max(c[1] for c in coords),
+            )
+        except (ValueError, KeyError, IndexError, TypeError):
+            try:
+                upper_lat, left_lon, lower_lat, right_lon = (
+                    float(i) for i in spatial_extent.split(",")
+                )
+            except ValueError:
+                logger.warning(f"Could not parse spatial extent {spatial_extent!r}")
+            else:
+                result = (
+                    min(left_lon, right_lon),
+                    min(lower_lat, upper_lat),
+                    max(left_lon, right_lon),
+                    max(lower_lat, upper_lat),
+                )
+    return result
+
+
+def spatial_extent_to_geometry(spatial_extent: typing.Optional[str]):
+    """Return an SQL expression with the geometry of a DCPR request's spatial extent"""
+    bbox = parse_spatial_extent(spatial_extent)
+    if bbox is not None:
+        result = sqlalchemy.func.ST_MakeEnvelope(
+            *bbox, dcpr_request_model.SPATIAL_EXTENT_SRID
+        )
+    else:
+        result = None
+    return result
+
+
 def dcpr_request_dataset_list_save(
     datasets: typing.List[typing.Dict], dcpr_request, context: typing.Dict
 ) -> None:
+    """Save the datasets of a DCPR request, writing only what has changed
+
+    Submitted datasets are matched with the request's existing datasets by their
+    `dataset_id`. Matching datasets are updated in place, submitted datasets without
+    a match are created and existing datasets that were not submitted are deleted.
+
+    """
+
+    existing_datasets = {ds.dataset_id: ds for ds in dcpr_request.datasets}
     for dataset_dict in datasets:
         dataset_dict["dcpr_request_id"] = dcpr_request.csi_reference_id
-        dcpr_dataset_save(dataset_dict, context)
+        existing_dataset = existing_datasets.pop(dataset_dict.get("dataset_id"), None)
+        if existing_dataset is None:
+            # do not let ids of datasets from other requests be reused
+            dataset_dict.pop("dataset_id", None)
+            dcpr_dataset_save(dataset_dict, context)
+        else:
+            dcpr_dataset_update(existing_dataset, dataset_dict)
+    for removed_dataset in existing_datasets.values():
+        context["session"].delete(removed_dataset)
+
+
+def dcpr_dataset_update(
+    dcpr_dataset: dcpr_request_model.DCPRRequestDataset,
+    dcpr_dataset_dict: typing.Dict,
+) -> None:
+    """Update an existing DCPR request dataset with the submitted values
+
+    The submitted dict replaces the whole dataset, so columns that are not present
+    in it are reset to their default value, just like they would be when creating a
+    new dataset. Only columns whose value actually changes are modified.
+
+    """
+
+    for column in dcpr_request_model.dcpr_request_dataset_table.columns:
+        if column.primary_key or column.foreign_keys:
+            continue
+        default = column.default.arg if column.default is not None else None
+        value = dcpr_dataset_dict.get(column.name, default)
+        if getattr(dcpr_dataset, column.name) != value:
+            setattr(dcpr_dataset, column.name, value)
 
 
 def dcpr_dataset_save(dcpr_dataset_dict: typing.Dict, context: typing.Dict):
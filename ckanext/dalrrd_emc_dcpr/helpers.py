@@ -1,18 +1,23 @@
 import json
 import logging
 import typing
+from functools import partial
 from urllib.parse import quote
 from html import escape as html_escape
 
+import sqlalchemy
 from shapely import geometry
 from ckan import model
 from ckan.plugins import toolkit
 from ckan.lib.helpers import build_nav_main as core_build_nav_main
 
-from . import constants
+from . import (
+    caching,
+    constants,
+)
 from .logic.action.emc import show_version
+from .logic.auth import get_dcpr_request_object
 from .constants import DCPRRequestStatus
-from .model.dcpr_request import DCPRRequest
 
 
 logger = logging.getLogger(__name__)
@@ -20,17 +25,52 @@ logger = logging.getLogger(__name__)
 
 def get_sasdi_themes(*args, **kwargs) -> typing.List[typing.Dict[str, str]]:
     logger.debug(f"inside get_sasdi_themes {args=} {kwargs=}")
+    sasdi_themes = get_vocabulary_tags(constants.SASDI_THEMES_VOCABULARY_NAME)
+    return [{"value": t, "label": t} for t in sasdi_themes]
+
+
+def get_vocabulary_tags(vocabulary_name: str) -> typing.List[str]:
+    """Return the names of the tags that belong to the input vocabulary
+
+    Tags are kept in a shared cache, which is invalidated whenever a tag or a
+    vocabulary is created, updated or deleted. A vocabulary that does not exist is
+    reported as having no tags.
+
+    """
+
+    return caching.get_cache(
+        caching.VOCABULARIES_CACHE_NAME,
+        ttl_seconds=toolkit.asint(
+            toolkit.config.get("ckan.dalrrd_emc_dcpr.vocabularies_cache_ttl", 3600)
+        ),
+        shared=True,
+    ).get_or_set(vocabulary_name, partial(_list_vocabulary_tags, vocabulary_name))
+
+
+def _list_vocabulary_tags(vocabulary_name: str) -> typing.List[str]:
     try:
-        sasdi_themes = toolkit.get_action("tag_list")(
-            data_dict={"vocabulary_id": constants.SASDI_THEMES_VOCABULARY_NAME}
+        result = toolkit.get_action("tag_list")(
+            data_dict={"vocabulary_id": vocabulary_name}
         )
     except toolkit.ObjectNotFound:
-        sasdi_themes = []
-    return [{"value": t, "label": t} for t in sasdi_themes]
+        result = []
+    return result
 
 
 def get_iso_topic_categories(*args, **kwargs) -> typing.List[typing.Dict[str, str]]:
+    """Return the ISO topic categories as scheming choices
+
+    This is used as a scheming `choices_helper`, which means it gets called with the
+    field dict. The arguments are thus not used for caching.
+
+    """
+
     logger.debug(f"inside get_iso_topic_categories {args=} {kwargs=}")
+    return [category.copy() for category in _get_iso_topic_categories()]
+
+
+@caching.static_value()
+def _get_iso_topic_categories() -> typing.List[typing.Dict[str, str]]:
     return [
         {"value": cat[0], "label": cat[1]} for cat in constants.ISO_TOPIC_CATEGORIES
     ]
@@ -53,6 +93,7 @@ def get_default_spatial_search_extent(
     return result
 
 
+@caching.static_value()
 def get_default_bounding_box() -> typing.Optional[typing.List[float]]:
     """Return the default bounding box in the form upper left, lower right
 
@@ -106,41 +147,75 @@ def helper_show_version(*args, **kwargs) -> typing.Dict:
 
 
 def user_is_org_member(
-    org_id: str, user=None, role: typing.Optional[str] = None
+    org_id: str,
+    user=None,
+    role: typing.Optional[str] = None,
+    context: typing.Optional[typing.Dict] = None,
 ) -> bool:
-    """Check if user has editor role in the input organization."""
+    """Check if user is a member of the input organization, optionally with a role
+
+    The organization may be identified by either its id or its name. Auth functions
+    should pass their `context`, which lets the user's memberships be reused outside
+    of requests too.
+
+    """
+
     result = False
     if user is not None:
-        member_list_action = toolkit.get_action("member_list")
-        try:
-            org_members = member_list_action(
-                data_dict={"id": org_id, "object_type": "user"}
-            )
-        except:
-            return result
-        logger.debug(f"{user.id=}")
-        logger.debug(f"{org_members=}")
-        for member_id, _, member_role in org_members:
-            if user.id == member_id:
-                if role is None or member_role.lower() == role.lower():
-                    result = True
-                break
+        capacity = get_user_memberships(user.id, context=context).get(org_id)
+        if capacity is not None:
+            result = role is None or capacity.lower() == role.lower()
     return result
 
 
 def org_member_list(org_id: str, role: typing.Optional[str] = None) -> typing.List:
     """Return list of organization members with the specified role"""
-    member_list_action = toolkit.get_action("member_list")
-    org_members = member_list_action(data_dict={"id": org_id, "object_type": "user"})
+    cache = caching.get_request_cache(caching.ORG_MEMBERS_REQUEST_CACHE_NAME)
+    try:
+        org_members = cache[org_id]
+    except KeyError:
+        org_members = (
+            model.Session.query(model.Member.table_id, model.Member.capacity)
+            .join(model.Group, model.Group.id == model.Member.group_id)
+            .filter(
+                sqlalchemy.or_(model.Group.id == org_id, model.Group.name == org_id),
+                model.Group.is_organization == True,
+                model.Member.table_name == "user",
+                model.Member.state == "active",
+            )
+            .all()
+        )
+        cache[org_id] = org_members
 
     results = []
-    for member_id, _, member_role in org_members:
+    for member_id, member_role in org_members:
         if role is None or member_role.lower() == role.lower():
             results.append(member_id)
 
     return results
 
 
+def get_user_memberships(
+    user_id: str, context: typing.Optional[typing.Dict] = None
+) -> typing.Dict[str, str]:
+    """Return the capacity of the input user in each organization where it is a member
+
+    The returned mapping uses both the id and the name of each organization as keys.
+
+    Memberships are loaded with a single query and are then kept for the remainder of
+    the current request, as they are checked several times when rendering a page.
+    Outside of requests, e.g. in harvest jobs, they are kept in the input action
+    `context` instead, if there is one.
+
+    """
+
+    result = {}
+    for org, capacity in _get_user_org_memberships(user_id, context=context):
+        result[org.id] = capacity
+        result[org.name] = capacity
+    return result
+
+
 def user_is_staff_member(user_id: str) -> bool:
     """Check if user is a member of the staff org"""
     memberships_action = toolkit.get_action("organization_list_for_user")
@@ -185,11 +260,6 @@ def build_pages_nav_main(*args):
 
     output = core_build_nav_main(*new_args)
 
-    # do not display any private pages in menu even for sysadmins
-    pages_list = toolkit.get_action("ckanext_pages_list")(
-        None, {"order": True, "private": False}
-    )
-
     page_name = ""
     is_current_page = toolkit.get_endpoint() in (
         ("pages", "show"),
@@ -199,31 +269,133 @@ def build_pages_nav_main(*args):
     if is_current_page:
         page_name = toolkit.request.path.split("/")[-1]
 
+    for page in _get_nav_pages():
+        if page["name"] == page_name:
+            li = toolkit.literal('<li class="active">')
+        else:
+            li = toolkit.literal("<li>")
+        output = output + li + toolkit.literal(page["link"]) + toolkit.literal("</li>")
+
+    return output
+
+
+def _get_nav_pages() -> typing.List[typing.Dict[str, str]]:
+    """Return the name and the rendered link of each page shown in the main nav
+
+    The list of pages is cached and it is invalidated whenever a page is created,
+    updated or deleted.
+
+    """
+
+    return caching.get_cache(
+        caching.NAV_PAGES_CACHE_NAME,
+        ttl_seconds=toolkit.asint(
+            toolkit.config.get("ckan.dalrrd_emc_dcpr.nav_pages_cache_ttl", 3600)
+        ),
+        shared=True,
+    ).get_or_set("public", _list_nav_pages)
+
+
+def _list_nav_pages() -> typing.List[typing.Dict[str, str]]:
+    # do not display any private pages in menu even for sysadmins
+    pages_list = toolkit.get_action("ckanext_pages_list")(
+        None, {"order": True, "private": False}
+    )
+    result = []
     for page in pages_list:
         type_ = "blog" if page["page_type"] == "blog" else "pages"
         name = quote(page["name"])
         title = html_escape(page["title"])
-        link = toolkit.h.literal('<a href="/{}/{}">{}</a>'.format(type_, name, title))
-        if page["name"] == page_name:
-            li = (
-                toolkit.literal('<li class="active">') + link + toolkit.literal("</li>")
-            )
-        else:
-            li = toolkit.literal("<li>") + link + toolkit.literal("</li>")
-        output = output + li
+        result.append(
+            {
+                "name": page["name"],
+                "link": '<a href="/{}/{}">{}</a>'.format(type_, name, title),
+            }
+        )
+    return result
 
-    return output
+
+def get_group_titles(
+    group_names: typing.Iterable[str],
+) -> typing.Dict[str, typing.Optional[str]]:
+    """Return a mapping of group (or organization) names to their titles
+
+    Titles are kept in a process-local cache, which is invalidated whenever a group or
+    an organization is created, updated or deleted. As other processes are not aware
+    of this invalidation, cache entries also expire after
+    `ckan.dalrrd_emc_dcpr.group_titles_cache_ttl` seconds.
+
+    """
+
+    cache = caching.get_cache(
+        caching.GROUP_TITLES_CACHE_NAME,
+        ttl_seconds=toolkit.asint(
+            toolkit.config.get("ckan.dalrrd_emc_dcpr.group_titles_cache_ttl", 3600)
+        ),
+    )
+    unique_names = set(group_names)
+    cached = cache.get_many(unique_names)
+    result = {name: cached[name] for name in unique_names if name in cached}
+    missing = unique_names.difference(result)
+    if len(missing) > 0:
+        found = dict(
+            model.Session.query(model.Group.name, model.Group.title)
+            .filter(model.Group.name.in_(missing))
+            .all()
+        )
+        for name in missing:
+            title = found.get(name)
+            cache.set(name, title)
+            result[name] = title
+    return result
 
 
 def get_featured_datasets():
-    search_action = toolkit.get_action("package_search")
-    result = search_action(data_dict={"q": "featured:true", "rows": 5})
-    return result["results"]
+    """Return the datasets that are featured on the homepage
+
+    Results are cached for `ckan.dalrrd_emc_dcpr.homepage_datasets_cache_ttl`
+    seconds and the cache is invalidated whenever a dataset is created, updated or
+    deleted.
+
+    """
+
+    return _get_homepage_datasets_cache().get_or_set(
+        "featured",
+        lambda: _search_homepage_datasets({"q": "featured:true", "rows": 5}),
+    )
 
 
 def get_recently_modified_datasets():
+    """Return the most recently modified datasets, which are cached too"""
+    return _get_homepage_datasets_cache().get_or_set(
+        "recently_modified",
+        lambda: _search_homepage_datasets(
+            {"sort": "metadata_modified desc", "rows": 5}
+        ),
+    )
+
+
+def invalidate_homepage_datasets_cache() -> None:
+    caching.invalidate(caching.HOMEPAGE_DATASETS_CACHE_NAME, shared=True)
+
+
+def _get_homepage_datasets_cache() -> caching.Cache:
+    return caching.get_cache(
+        caching.HOMEPAGE_DATASETS_CACHE_NAME,
+        ttl_seconds=toolkit.asint(
+            toolkit.config.get("ckan.dalrrd_emc_dcpr.homepage_datasets_cache_ttl", 300)
+        ),
+        shared=True,
+    )
+
+
+def _search_homepage_datasets(data_dict: typing.Dict) -> typing.List[typing.Dict]:
     search_action = toolkit.get_action("package_search")
-    result = search_action(data_dict={"sort": "metadata_modified desc", "rows": 5})
+    # the homepage is rendered for anonymous users too, so the cached results must
+    # not depend on the current user's permissions
+    result = search_action(
+        context={"ignore_auth": True}, data_dict={**data_dict, "include_private": False}
+    )
     return result["results"]
 
 
@@ -234,6 +406,7 @@ def _pad_geospatial_extent(extent: typing.Dict, padding: float) -> typing.Dict:
     return geometry.mapping(oriented_padded)
 
 
+@caching.static_value(vary_on=lambda: toolkit.h.lang())
 def get_status_labels() -> typing.Dict:
     """Get status labels for the DCPR requests"""
     status_labels = {
@@ -280,7 +453,7 @@ def get_next_intermediate_dcpr_status(current_status: str) -> typing.Optional[st
 
 
 def user_is_dcpr_request_owner(user_id, dcpr_request_id) -> bool:
-    request_obj = DCPRRequest.get(dcpr_request_id)
+    request_obj = get_dcpr_request_object({}, dcpr_request_id)
     if request_obj is not None:
         result = user_id == request_obj.owner_user
     else:
@@ -290,18 +463,60 @@ def user_is_dcpr_request_owner(user_id, dcpr_request_id) -> bool:
 
 def get_org_memberships(user_id: str):
     """Return a list of organizations and roles where the input user is a member"""
-    query = (
-        model.Session.query(model.Group, model.Member.capacity)
-        .join(model.Member, model.Member.group_id == model.Group.id)
-        .join(model.User, model.User.id == model.Member.table_id)
-        .filter(
-            model.User.id == user_id,
-            model.Member.state == "active",
-            model.Group.is_organization == True,
+    return _get_user_org_memberships(user_id)
+
+
+def user_has_org_membership(user_id: str) -> bool:
+    """Check whether the input user is a member of at least one organization
+
+    If the user's memberships have already been loaded during the current request
+    they are reused, otherwise a single `EXISTS` query is sent to the DB.
+
+    """
+
+    cache = caching.get_request_cache(caching.USER_MEMBERSHIPS_REQUEST_CACHE_NAME)
+    try:
+        result = len(cache[user_id]) > 0
+    except KeyError:
+        membership_query = (
+            model.Session.query(model.Member)
+            .join(model.Group, model.Group.id == model.Member.group_id)
+            .filter(
+                model.Member.table_id == user_id,
+                model.Member.table_name == "user",
+                model.Member.state == "active",
+                model.Group.is_organization == True,
+                model.Group.state == "active",
+            )
         )
-        .order_by(model.Group.name)
+        result = model.Session.query(membership_query.exists()).scalar()
+    return result
+
+
+def _get_user_org_memberships(
+    user_id: str, context: typing.Optional[typing.Dict] = None
+) -> typing.List[typing.Tuple[model.Group, str]]:
+    cache = caching.get_request_cache(
+        caching.USER_MEMBERSHIPS_REQUEST_CACHE_NAME, context=context
     )
-    return query.all()
+    try:
+        result = cache[user_id]
+    except KeyError:
+        query = (
+            model.Session.query(model.Group, model.Member.capacity)
+            .join(model.Member, model.Member.group_id == model.Group.id)
+            .filter(
+                model.Member.table_id == user_id,
+                model.Member.table_name == "user",
+                model.Member.state == "active",
+                model.Group.is_organization == True,
+                model.Group.state == "active",
+            )
+            .order_by(model.Group.name)
+        )
+        result = query.all()
+        cache[user_id] = result
+    return result
 
 
 def get_dcpr_requests_approved_by_nsif(request_origin):
@@ -318,5 +533,5 @@ def get_dcpr_requests_approved_by_nsif(request_origin):
     # request.
     dcpr_requests_approved_by_nsif = toolkit.get_action(
         "dcpr_request_list_awaiting_csi_moderation"
-    )({"request_origin": request_origin})
-    return dcpr_requests_approved_by_nsif
+    )({"request_origin": request_origin}, {"all_fields": True})
+    return dcpr_requests_approved_by_nsif["results"]
@@ -1,9 +1,12 @@
 """Asynchronous jobs for EMC-DCPR"""
 
 import logging
+import time
 import typing
 
 from ckan import model
+from ckan.config.middleware import make_app
+from ckan.lib.redis import connect_to_redis
 from ckan.plugins import toolkit
 
 from . import (
@@ -24,13 +27,57 @@ def test_job(*args, **kwargs):
     logger.debug(f"inside test_job - {args=} {kwargs=}")
 
 
+@provide_request_context
+def report_job_startup(context, enqueued_at: float, results_key: str):
+    """Report how long it took for this job to get a request context
+
+    This is used by the `benchmark-job-startup` CLI command.
+
+    """
+
+    connect_to_redis().rpush(results_key, time.time() - enqueued_at)
+
+
+def report_job_startup_without_app_reuse(enqueued_at: float, results_key: str):
+    """Like `report_job_startup()`, but building the CKAN app in the job itself
+
+    This is how request contexts used to be provided to jobs, before the app was
+    built only once per worker.
+
+    """
+
+    app = make_app(toolkit.config)
+    with app._wsgi_app.test_request_context():
+        connect_to_redis().rpush(results_key, time.time() - enqueued_at)
+
+
 @provide_request_context
 def notify_dcpr_actors_of_relevant_status_change(context, activity_id: str):
+    _notify_dcpr_actors_of_relevant_status_change(activity_id)
+
+
+@provide_request_context
+def notify_dcpr_actors_of_relevant_status_changes(
+    context, activity_ids: typing.List[str]
+):
+    """Notify DCPR actors of several status changes in a single job
+
+    This is used when moderating DCPR requests in bulk, which enqueues one job per
+    request owner instead of one job per request.
+
+    """
+
+    for activity_id in activity_ids:
+        _notify_dcpr_actors_of_relevant_status_change(activity_id)
+
+
+def _notify_dcpr_actors_of_relevant_status_change(activity_id: str) -> None:
     activity_obj = model.Activity.get(activity_id)
     if activity_obj is not None:
         activity_type = DcprManagementActivityType(activity_obj.activity_type)
-        dcpr_request = (activity_obj.data or {}).get("dcpr_request")
-        if dcpr_request is not None:
+        activity_dcpr_request = (activity_obj.data or {}).get("dcpr_request")
+        if activity_dcpr_request is not None:
+            dcpr_request = _get_dcpr_request_full_state(activity_dcpr_request)
             owner_user_obj = model.User.get(dcpr_request["owner_user"])
             nsif_reviewer_obj = model.User.get(dcpr_request["nsif_reviewer"])
             csi_reviewer_obj = model.User.get(dcpr_request["csi_moderator"])
@@ -193,6 +240,24 @@ def notify_dcpr_actors_of_relevant_status_change(context, activity_id: str):
         raise RuntimeError(f"Could not retrieve activity with id {activity_id!r}")
 
 
+def _get_dcpr_request_full_state(activity_dcpr_request: typing.Dict) -> typing.Dict:
+    """Complement the compact DCPR request stored in an activity with its full state
+
+    Values stored in the activity take precedence, as they reflect the request at the
+    time the activity was created.
+
+    """
+
+    try:
+        full_state = toolkit.get_action("dcpr_request_show")(
+            context={"ignore_auth": True},
+            data_dict={"csi_reference_id": activity_dcpr_request["csi_reference_id"]},
+        )
+    except toolkit.ObjectNotFound:
+        full_state = {}
+    return {**full_state, **activity_dcpr_request}
+
+
 def notify_org_admins_of_dataset_management_request(activity_id: str):
     activity_obj = model.Activity.get(activity_id)
     if activity_obj is not None:
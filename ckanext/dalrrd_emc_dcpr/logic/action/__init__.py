@@ -1,5 +1,7 @@
+import enum
 import typing
 
+from ckan import model
 from ckan.logic.schema import default_create_activity_schema
 from ckan.plugins import toolkit
 
@@ -7,12 +9,65 @@ from ...constants import (
     DatasetManagementActivityType,
     DcprManagementActivityType,
 )
-from ...dcpr_dictization import dcpr_request_dictize
+from ...dcpr_dictization import (
+    dcpr_request_activity_dictize,
+    get_dcpr_request_changed_fields,
+)
 from ...model.dcpr_request import DCPRRequest
 
+# maps activity types to the names of the validators for their object ids
+_MANAGEMENT_ACTIVITY_TYPES: typing.Dict[str, typing.Tuple[str, ...]] = {}
+_RELAXED_ACTIVITY_SCHEMAS: typing.Dict[typing.Tuple[str, ...], typing.Dict] = {}
 
-def create_dataset_management_activity(
-    dataset_id: str, activity_type: DatasetManagementActivityType
+DATASET_ACTIVITY_FIELDS: typing.Final[typing.Tuple[str, ...]] = (
+    "id",
+    "name",
+    "title",
+    "type",
+    "owner_org",
+    "state",
+    "private",
+)
+
+
+def register_management_activity_types(
+    activity_types: typing.Iterable[enum.Enum],
+    object_id_validators: typing.Sequence[str] = (),
+) -> None:
+    """Register custom activity types, so that activities of these types can be created
+
+    CKAN's activity schema only accepts its own activity types and object ids. Each
+    registered activity type is instead validated with a relaxed schema, which does
+    not include the `activity_type_exists` and `object_id_validator` validators.
+    `object_id_validators` are the names of validators that replace the latter.
+
+    """
+
+    for activity_type in activity_types:
+        _MANAGEMENT_ACTIVITY_TYPES[activity_type.value] = tuple(object_id_validators)
+
+
+def get_management_activity_schema(activity_type: enum.Enum) -> typing.Dict:
+    """Return the relaxed activity schema of a registered activity type
+
+    Schemas are built only once per process, the first time they are needed, so that
+    the validators they use have already been registered by all plugins.
+
+    """
+
+    try:
+        object_id_validators = _MANAGEMENT_ACTIVITY_TYPES[activity_type.value]
+    except KeyError:
+        raise ValueError(f"Activity type {activity_type.value!r} is not registered")
+    schema = _RELAXED_ACTIVITY_SCHEMAS.get(object_id_validators)
+    if schema is None:
+        schema = build_relaxed_activity_schema(object_id_validators)
+        _RELAXED_ACTIVITY_SCHEMAS[object_id_validators] = schema
+    return schema
+
+
+def build_relaxed_activity_schema(
+    object_id_validators: typing.Sequence[str] = (),
 ) -> typing.Dict:
     """
     This is a hacky way to relax the activity type schema validation
@@ -35,58 +90,129 @@ def create_dataset_management_activity(
             break
     if to_remove:
         activity_schema["object_id"].remove(to_remove)
-    activity_schema["object_id"].append(toolkit.get_validator("package_id_exists"))
-    dataset = toolkit.get_action("package_show")(data_dict={"id": dataset_id})
+    for validator_name in object_id_validators:
+        activity_schema["object_id"].append(toolkit.get_validator(validator_name))
+    return activity_schema
+
+
+def create_dataset_management_activity(
+    dataset_id: str, activity_type: DatasetManagementActivityType
+) -> typing.Dict:
+    dataset_obj = model.Package.get(dataset_id)
+    if dataset_obj is None:
+        raise toolkit.ObjectNotFound
     return toolkit.get_action("activity_create")(
         context={
             "ignore_auth": True,
-            "schema": activity_schema,
+            "schema": get_management_activity_schema(activity_type),
         },
         data_dict={
             "user_id": toolkit.g.userobj.id,
             "object_id": dataset_id,
             "activity_type": activity_type.value,
             "data": {
-                "package": dataset,
+                "package": dataset_activity_dictize(dataset_obj),
             },
         },
     )
 
 
+def dataset_activity_dictize(dataset_obj: model.Package) -> typing.Dict:
+    """Dictize a dataset for storing in a dataset management activity
+
+    Activities only keep the fields listed in `DATASET_ACTIVITY_FIELDS`. The full
+    state of the dataset is available from the `package_show` action.
+
+    """
+
+    return {field: getattr(dataset_obj, field) for field in DATASET_ACTIVITY_FIELDS}
+
+
 def create_dcpr_management_activity(
     dcpr_request_obj: DCPRRequest,
     activity_type: DcprManagementActivityType,
     context: typing.Dict,
+    changed_fields: typing.Optional[typing.Iterable[str]] = None,
 ) -> typing.Dict:
-    """
-    This is a hacky way to relax the activity type schema validation
-    we remove the default activity_type_exists validator because it is not possible
-    to extend it with a custom activity
+    """Create an activity for a DCPR request
+
+    The activity only stores a compact version of the DCPR request, as produced by
+    `dcpr_request_activity_dictize()`. Unless `changed_fields` is provided, these
+    are taken from the request's pending changes, which are lost if the session has
+    already been flushed.
+
+    The activity is added to the current transaction, which is not committed. This
+    lets callers commit the changes to the request and the activity that describes
+    them together.
+
     """
 
-    activity_schema = default_create_activity_schema()
-    to_remove = None
-    for index, validator in enumerate(activity_schema["activity_type"]):
-        if validator.__name__ == "activity_type_exists":
-            to_remove = validator
-            break
-    if to_remove:
-        activity_schema["activity_type"].remove(to_remove)
-    to_remove = None
-    for index, validator in enumerate(activity_schema["object_id"]):
-        if validator.__name__ == "object_id_validator":
-            to_remove = validator
-            break
-    if to_remove:
-        activity_schema["object_id"].remove(to_remove)
+    if changed_fields is None:
+        changed_fields = get_dcpr_request_changed_fields(dcpr_request_obj)
     action_context = context.copy()
     action_context.update(
         {
             "ignore_auth": True,
-            "schema": activity_schema,
+            "defer_commit": True,
+            "schema": get_management_activity_schema(activity_type),
         }
     )
-    user_id = {
+    user_id = _get_dcpr_management_activity_user_id(dcpr_request_obj, activity_type)
+    return toolkit.get_action("activity_create")(
+        context=action_context,
+        data_dict={
+            "user_id": user_id,
+            "object_id": dcpr_request_obj.csi_reference_id,
+            "activity_type": activity_type.value,
+            "data": {
+                "dcpr_request": dcpr_request_activity_dictize(
+                    dcpr_request_obj, changed_fields
+                ),
+            },
+        },
+    )
+
+
+def create_dcpr_management_activities(
+    dcpr_request_objs: typing.Iterable[DCPRRequest],
+    activity_type: DcprManagementActivityType,
+    context: typing.Dict,
+) -> typing.List[model.Activity]:
+    """Create the same kind of activity for several DCPR requests at once
+
+    Activities are added to the current session without committing it, which lets
+    callers save them in the same transaction as the changes they describe. For the
+    same reason, the changed fields of each request are taken from its pending
+    changes.
+
+    """
+
+    result = []
+    if toolkit.asbool(toolkit.config.get("ckan.activity_streams_enabled", True)):
+        for dcpr_request_obj in dcpr_request_objs:
+            result.append(
+                model.Activity(
+                    user_id=_get_dcpr_management_activity_user_id(
+                        dcpr_request_obj, activity_type
+                    ),
+                    object_id=dcpr_request_obj.csi_reference_id,
+                    activity_type=activity_type.value,
+                    data={
+                        "dcpr_request": dcpr_request_activity_dictize(
+                            dcpr_request_obj,
+                            get_dcpr_request_changed_fields(dcpr_request_obj),
+                        )
+                    },
+                )
+            )
+        context["model"].Session.add_all(result)
+    return result
+
+
+def _get_dcpr_management_activity_user_id(
+    dcpr_request_obj: DCPRRequest, activity_type: DcprManagementActivityType
+) -> typing.Optional[str]:
+    return {
         DcprManagementActivityType.CREATE_DCPR_REQUEST: dcpr_request_obj.owner_user,
         DcprManagementActivityType.UPDATE_DCPR_REQUEST_BY_OWNER: dcpr_request_obj.owner_user,
         DcprManagementActivityType.SUBMIT_DCPR_REQUEST: dcpr_request_obj.owner_user,
@@ -104,14 +230,3 @@ def create_dcpr_management_activity(
         DcprManagementActivityType.REJECT_DCPR_REQUEST_CSI: dcpr_request_obj.csi_moderator,
         DcprManagementActivityType.REQUEST_CLARIFICATION_DCPR_REQUEST_CSI: dcpr_request_obj.csi_moderator,
     }.get(activity_type)
-    return toolkit.get_action("activity_create")(
-        context=action_context,
-        data_dict={
-            "user_id": user_id,
-            "object_id": dcpr_request_obj.csi_reference_id,
-            "activity_type": activity_type.value,
-            "data": {
-                "dcpr_request": dcpr_request_dictize(dcpr_request_obj, context),
-            },
-        },
-    )
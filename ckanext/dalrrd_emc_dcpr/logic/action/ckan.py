@@ -6,6 +6,7 @@ import typing
 import ckan.plugins.toolkit as toolkit
 from ckan.model.domain_object import DomainObject
 
+from ... import caching
 from ...model.user_extra_fields import UserExtraFields
 
 logger = logging.getLogger(__name__)
@@ -138,6 +139,127 @@ def user_patch(context: typing.Dict, data_dict: typing.Dict) -> typing.Dict:
     return update_action(context, patched)
 
 
+@toolkit.chained_action
+def group_create(original_action, context, data_dict):
+    """Intercepts the core `group_create` action to invalidate cached group titles"""
+    return _invalidate_group_titles_after(original_action, context, data_dict)
+
+
+@toolkit.chained_action
+def group_update(original_action, context, data_dict):
+    """Intercepts the core `group_update` action to invalidate cached group titles"""
+    return _invalidate_group_titles_after(original_action, context, data_dict)
+
+
+@toolkit.chained_action
+def group_delete(original_action, context, data_dict):
+    """Intercepts the core `group_delete` action to invalidate cached group titles"""
+    return _invalidate_group_titles_after(original_action, context, data_dict)
+
+
+@toolkit.chained_action
+def group_purge(original_action, context, data_dict):
+    """Intercepts the core `group_purge` action to invalidate cached group titles"""
+    return _invalidate_group_titles_after(original_action, context, data_dict)
+
+
+@toolkit.chained_action
+def organization_create(original_action, context, data_dict):
+    """Intercepts the core `organization_create` action to invalidate cached titles"""
+    return _invalidate_group_titles_after(original_action, context, data_dict)
+
+
+@toolkit.chained_action
+def organization_update(original_action, context, data_dict):
+    """Intercepts the core `organization_update` action to invalidate cached titles"""
+    return _invalidate_group_titles_after(original_action, context, data_dict)
+
+
+@toolkit.chained_action
+def organization_delete(original_action, context, data_dict):
+    """Intercepts the core `organization_delete` action to invalidate cached titles"""
+    return _invalidate_group_titles_after(original_action, context, data_dict)
+
+
+@toolkit.chained_action
+def organization_purge(original_action, context, data_dict):
+    """Intercepts the core `organization_purge` action to invalidate cached titles"""
+    return _invalidate_group_titles_after(original_action, context, data_dict)
+
+
+@toolkit.chained_action
+def tag_create(original_action, context, data_dict):
+    """Intercepts the core `tag_create` action to invalidate cached vocabularies"""
+    return _invalidate_vocabularies_after(original_action, context, data_dict)
+
+
+@toolkit.chained_action
+def tag_delete(original_action, context, data_dict):
+    """Intercepts the core `tag_delete` action to invalidate cached vocabularies"""
+    return _invalidate_vocabularies_after(original_action, context, data_dict)
+
+
+@toolkit.chained_action
+def vocabulary_create(original_action, context, data_dict):
+    """Intercepts the core `vocabulary_create` action to invalidate cached vocabularies"""
+    return _invalidate_vocabularies_after(original_action, context, data_dict)
+
+
+@toolkit.chained_action
+def vocabulary_update(original_action, context, data_dict):
+    """Intercepts the core `vocabulary_update` action to invalidate cached vocabularies"""
+    return _invalidate_vocabularies_after(original_action, context, data_dict)
+
+
+@toolkit.chained_action
+def vocabulary_delete(original_action, context, data_dict):
+    """Intercepts the core `vocabulary_delete` action to invalidate cached vocabularies"""
+    return _invalidate_vocabularies_after(original_action, context, data_dict)
+
+
+def _invalidate_vocabularies_after(
+    action: typing.Callable, context: typing.Dict, data: typing.Dict
+):
+    result = action(context, data)
+    caching.invalidate(caching.VOCABULARIES_CACHE_NAME, shared=True)
+    return result
+
+
+@toolkit.chained_action
+def member_create(original_action, context, data_dict):
+    """Intercepts the core `member_create` action to invalidate cached memberships"""
+    result = original_action(context, data_dict)
+    _invalidate_memberships(context)
+    return result
+
+
+@toolkit.chained_action
+def member_delete(original_action, context, data_dict):
+    """Intercepts the core `member_delete` action to invalidate cached memberships"""
+    result = original_action(context, data_dict)
+    _invalidate_memberships(context)
+    return result
+
+
+def _invalidate_group_titles_after(
+    action: typing.Callable, context: typing.Dict, data: typing.Dict
+):
+    result = action(context, data)
+    caching.invalidate(caching.GROUP_TITLES_CACHE_NAME)
+    # groups and organizations may also be saved together with their members
+    _invalidate_memberships(context)
+    return result
+
+
+def _invalidate_memberships(context: typing.Dict) -> None:
+    caching.invalidate_request_cache(
+        caching.USER_MEMBERSHIPS_REQUEST_CACHE_NAME, context=context
+    )
+    caching.invalidate_request_cache(
+        caching.ORG_MEMBERS_REQUEST_CACHE_NAME, context=context
+    )
+
+
 def _act_depending_on_package_visibility(
     action: typing.Callable, context: typing.Dict, data: typing.Dict
 ):
@@ -104,13 +104,14 @@ def dcpr_request_create(context, data_dict):
     logger.debug(f"{validated_data=}")
     context["updated_by"] = "owner"
     request_obj = dcpr_dictization.dcpr_request_dict_save(validated_data, context)
-    model.Session.commit()
     logger.debug(f"{request_obj=}")
     create_dcpr_management_activity(
         request_obj,
         activity_type=DcprManagementActivityType.CREATE_DCPR_REQUEST,
         context=context,
+        changed_fields=context["dcpr_request_changed_fields"],
     )
+    model.Session.commit()
     return toolkit.get_action("dcpr_request_show")(
         context=context.copy(),
         data_dict={"csi_reference_id": request_obj.csi_reference_id},
@@ -3,7 +3,10 @@ import logging
 from ckan.plugins import toolkit
 
 from ....constants import DcprManagementActivityType
-from ....model import dcpr_request
+from ...auth import (
+    forget_dcpr_request_object,
+    get_dcpr_request_object,
+)
 from ...schema import delete_dcpr_request_schema
 from .. import create_dcpr_management_activity
 
@@ -22,13 +25,12 @@ def dcpr_request_delete(context, data_dict):
     toolkit.check_access("dcpr_request_delete_auth", context, validated_data)
 
     model = context["model"]
-    request_obj = model.Session.query(dcpr_request.DCPRRequest).get(
-        validated_data["csi_reference_id"]
-    )
-    model.Session.delete(request_obj)
-    model.Session.commit()
+    request_obj = get_dcpr_request_object(context, validated_data["csi_reference_id"])
+    forget_dcpr_request_object(context, validated_data["csi_reference_id"])
     create_dcpr_management_activity(
         request_obj,
         activity_type=DcprManagementActivityType.DELETE_DCPR_REQUEST,
         context=context,
     )
+    model.Session.delete(request_obj)
+    model.Session.commit()
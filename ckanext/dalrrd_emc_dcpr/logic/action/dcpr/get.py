@@ -1,15 +1,45 @@
 import logging
 import typing
 
+import sqlalchemy
 from ckan.plugins import toolkit
+from sqlalchemy import orm
 
 from ....model import dcpr_request
 from .... import dcpr_dictization
-from ....constants import DCPRRequestStatus
-from ...schema import show_dcpr_request_schema
+from ....constants import (
+    CSI_ORG_NAME,
+    DCPR_REQUEST_CSI_STATUSES,
+    DCPR_REQUEST_NSIF_AND_CSI_STATUSES,
+    DCPR_REQUEST_NSIF_STATUSES,
+    DCPR_REQUEST_PUBLISHED_STATUSES,
+    DCPRRequestStatus,
+    NSIF_ORG_NAME,
+)
+from ...auth import get_dcpr_request_object
+from ...schema import (
+    dcpr_request_list_schema,
+    dcpr_request_search_schema,
+    dcpr_request_spatial_search_schema,
+    show_dcpr_request_schema,
+)
 
 logger = logging.getLogger(__name__)
 
+_SORTABLE_COLUMNS: typing.Final[typing.Tuple[str, ...]] = (
+    "status",
+    "request_date",
+    "submission_date",
+    "nsif_review_date",
+    "csi_moderation_date",
+    "proposed_project_name",
+)
+
+_SPATIAL_RELATIONS: typing.Final[typing.Dict[str, str]] = {
+    "intersects": "ST_Intersects",
+    "within": "ST_Within",
+}
+
 
 @toolkit.side_effect_free
 def dcpr_request_show(context: typing.Dict, data_dict: typing.Dict) -> typing.Dict:
@@ -18,7 +48,9 @@ def dcpr_request_show(context: typing.Dict, data_dict: typing.Dict) -> typing.Di
     if errors:
         raise toolkit.ValidationError(errors)
     toolkit.check_access("dcpr_request_show_auth", context, validated_data)
-    request_object = dcpr_request.DCPRRequest.get(validated_data["csi_reference_id"])
+    request_object = get_dcpr_request_object(
+        context, validated_data["csi_reference_id"]
+    )
     if not request_object:
         raise toolkit.ObjectNotFound
     return dcpr_dictization.dcpr_request_dictize(request_object, context)
@@ -27,7 +59,7 @@ def dcpr_request_show(context: typing.Dict, data_dict: typing.Dict) -> typing.Di
 @toolkit.side_effect_free
 def dcpr_request_list_public(
     context: typing.Dict, data_dict: typing.Dict
-) -> typing.List:
+) -> typing.Dict:
     """Return a list of public DCPR requests."""
     toolkit.check_access("dcpr_request_list_public_auth", context, data_dict or {})
     relevant_statuses = (
@@ -44,7 +76,7 @@ def dcpr_request_list_public(
 @toolkit.side_effect_free
 def my_dcpr_request_list(
     context: typing.Dict, data_dict: typing.Optional[typing.Dict] = None
-) -> typing.List[typing.Dict]:
+) -> typing.Dict:
     toolkit.check_access("my_dcpr_request_list_auth", context, data_dict or {})
     return _get_dcpr_request_list(
         context,
@@ -56,7 +88,7 @@ def my_dcpr_request_list(
 @toolkit.side_effect_free
 def dcpr_request_list_under_preparation(
     context: typing.Dict, data_dict: typing.Dict
-) -> typing.List[typing.Dict]:
+) -> typing.Dict:
     """Return a list of DCPR requests that are still being prepared.
 
     This function returns all DCPR requests that are being prepared by all users.
@@ -77,7 +109,7 @@ def dcpr_request_list_under_preparation(
 @toolkit.side_effect_free
 def dcpr_request_list_awaiting_csi_moderation(
     context: typing.Dict, data_dict: typing.Dict
-) -> typing.List:
+) -> typing.Dict:
     """Return a list of DCPR requests that are awaiting moderation by CSI members."""
     # mohab: we are adding request_origin
     # so the check is not applied when it
@@ -104,7 +136,7 @@ def dcpr_request_list_awaiting_csi_moderation(
 @toolkit.side_effect_free
 def dcpr_request_list_awaiting_nsif_moderation(
     context: typing.Dict, data_dict: typing.Dict
-) -> typing.List:
+) -> typing.Dict:
     """Return a list of DCPR requests that are awaiting moderation by NSIF members."""
     toolkit.check_access(
         "dcpr_request_list_pending_nsif_auth", context, data_dict or {}
@@ -120,24 +152,334 @@ def dcpr_request_list_awaiting_nsif_moderation(
     )
 
 
+@toolkit.side_effect_free
+def dcpr_request_search(
+    context: typing.Dict, data_dict: typing.Optional[typing.Dict] = None
+) -> typing.Dict:
+    """Search DCPR requests
+
+    Only the requests that the current user is allowed to see are searched. Besides
+    the parameters accepted by the `dcpr_request_list_*` actions, the following can
+    be used in the input data_dict:
+
+    - q: text to look for in the project name and context and in the titles and
+      abstracts of the request's datasets. Results are ranked by relevance unless
+      an explicit `sort` is provided
+    - status: a status, or a list of statuses
+    - organization_id: id of the organization of the request
+    - data_capture_urgency: urgency of the request
+    - capture_start_date, capture_end_date: only return requests whose capture
+      period overlaps with this date range
+
+    The result is a dict with the `count` and the `results` keys.
+
+    """
+
+    toolkit.check_access("dcpr_request_search_auth", context, data_dict or {})
+    validated_data, errors = toolkit.navl_validate(
+        data_dict if data_dict is not None else {},
+        dcpr_request_search_schema(),
+        context,
+    )
+    if errors:
+        raise toolkit.ValidationError(errors)
+    return _search_dcpr_requests(context, validated_data)
+
+
+@toolkit.side_effect_free
+def dcpr_request_spatial_search(
+    context: typing.Dict, data_dict: typing.Optional[typing.Dict] = None
+) -> typing.Dict:
+    """Search DCPR requests by their spatial extent
+
+    Accepts the same parameters as `dcpr_request_search`, plus:
+
+    - bbox: bounding box to search, with the same format as a request's
+      `spatial_extent`, i.e. upper left lat, upper left lon, lower right lat,
+      lower right lon
+    - relation: either `intersects` (the default), which matches requests whose
+      spatial extent intersects the bbox, or `within`, which only matches requests
+      whose spatial extent is completely inside the bbox
+
+    """
+
+    toolkit.check_access("dcpr_request_search_auth", context, data_dict or {})
+    validated_data, errors = toolkit.navl_validate(
+        data_dict if data_dict is not None else {},
+        dcpr_request_spatial_search_schema(),
+        context,
+    )
+    if errors:
+        raise toolkit.ValidationError(errors)
+    bbox = dcpr_dictization.parse_spatial_extent(validated_data["bbox"])
+    if bbox is None:
+        raise toolkit.ValidationError({"bbox": [toolkit._("Invalid bounding box")]})
+    relation = validated_data.get("relation", "intersects")
+    try:
+        spatial_function = getattr(sqlalchemy.func, _SPATIAL_RELATIONS[relation])
+    except KeyError:
+        raise toolkit.ValidationError(
+            {"relation": [toolkit._("Invalid relation: {}").format(relation)]}
+        )
+    envelope = sqlalchemy.func.ST_MakeEnvelope(*bbox, dcpr_request.SPATIAL_EXTENT_SRID)
+    spatial_filter = spatial_function(
+        dcpr_request.DCPRRequest.spatial_extent_geom, envelope
+    )
+    return _search_dcpr_requests(context, validated_data, filters=[spatial_filter])
+
+
+@toolkit.side_effect_free
+def dcpr_request_stats(
+    context: typing.Dict, data_dict: typing.Optional[typing.Dict] = None
+) -> typing.Dict:
+    """Return aggregated statistics about DCPR requests
+
+    The result includes:
+
+    - total: the total number of requests
+    - by_status, by_organization, by_urgency, by_month: number of requests for each
+      status, organization name, data capture urgency and month of the request date
+      (formatted as `YYYY-MM`)
+    - median_review_days: median number of days requests spend being reviewed by
+      the NSIF (from submission to the NSIF review) and moderated by the CSI (from
+      the NSIF review to the CSI moderation). Only requests that have gone through
+      a stage are considered for its median
+
+    Each value is computed by a single aggregate query, without loading the
+    requests themselves.
+
+    """
+
+    toolkit.check_access("dcpr_request_stats_auth", context, data_dict or {})
+    model = context["model"]
+    table = dcpr_request.DCPRRequest
+    request_month = sqlalchemy.func.to_char(table.request_date, "YYYY-MM")
+    groupings = {
+        "by_status": (table.status, None),
+        "by_organization": (
+            model.Group.name,
+            (model.Group, model.Group.id == table.organization_id),
+        ),
+        "by_urgency": (table.data_capture_urgency, None),
+        "by_month": (request_month, None),
+    }
+    result = {"total": model.Session.query(table).count()}
+    for key, (column, join) in groupings.items():
+        query = model.Session.query(column, sqlalchemy.func.count())
+        if join is not None:
+            query = query.select_from(table).join(*join)
+        result[key] = dict(query.group_by(column).order_by(column).all())
+    stage_durations = {
+        "nsif_review": (table.submission_date, table.nsif_review_date),
+        "csi_moderation": (table.nsif_review_date, table.csi_moderation_date),
+    }
+    medians = model.Session.query(
+        *(
+            sqlalchemy.func.percentile_cont(0.5)
+            .within_group(sqlalchemy.func.extract("epoch", end - start))
+            .label(stage)
+            for stage, (start, end) in stage_durations.items()
+        )
+    ).one()
+    result["median_review_days"] = {
+        stage: seconds / (24 * 60 * 60) if seconds is not None else None
+        for stage, seconds in medians._asdict().items()
+    }
+    return result
+
+
+def _search_dcpr_requests(
+    context: typing.Dict,
+    validated_data: typing.Dict,
+    filters: typing.Optional[typing.List] = None,
+) -> typing.Dict:
+    filters = list(filters or [])
+    filters.append(_get_dcpr_request_visibility_filter(context))
+    table = dcpr_request.DCPRRequest
+    default_ordering = None
+    if validated_data.get("q"):
+        query = sqlalchemy.func.plainto_tsquery(
+            dcpr_request.SEARCH_CONFIGURATION, validated_data["q"]
+        )
+        filters.append(table.search_vector.op("@@")(query))
+        default_ordering = [sqlalchemy.func.ts_rank(table.search_vector, query).desc()]
+    if validated_data.get("status"):
+        filters.append(table.status.in_(validated_data["status"]))
+    if validated_data.get("organization_id"):
+        filters.append(table.organization_id == validated_data["organization_id"])
+    if validated_data.get("data_capture_urgency"):
+        filters.append(
+            table.data_capture_urgency == validated_data["data_capture_urgency"]
+        )
+    if validated_data.get("capture_start_date"):
+        filters.append(table.capture_end_date >= validated_data["capture_start_date"])
+    if validated_data.get("capture_end_date"):
+        filters.append(table.capture_start_date <= validated_data["capture_end_date"])
+    return _query_dcpr_request_list(
+        context, validated_data, filters, default_ordering=default_ordering
+    )
+
+
+def _get_dcpr_request_visibility_filter(context: typing.Dict):
+    """Build a filter that matches the requests the current user can see
+
+    This mirrors the rules of the `dcpr_request_show_auth` auth function.
+
+    """
+
+    user = context.get("auth_user_obj")
+    table = dcpr_request.DCPRRequest
+    if user is not None and user.sysadmin:
+        result = sqlalchemy.true()
+    else:
+        visible_statuses = set(DCPR_REQUEST_PUBLISHED_STATUSES)
+        if user is not None:
+            is_nsif_member = toolkit.h["emc_user_is_org_member"](NSIF_ORG_NAME, user)
+            is_csi_member = toolkit.h["emc_user_is_org_member"](CSI_ORG_NAME, user)
+            if is_nsif_member:
+                visible_statuses.update(DCPR_REQUEST_NSIF_STATUSES)
+            if is_csi_member:
+                visible_statuses.update(DCPR_REQUEST_CSI_STATUSES)
+            if is_nsif_member or is_csi_member:
+                visible_statuses.update(DCPR_REQUEST_NSIF_AND_CSI_STATUSES)
+        result = table.status.in_([status.value for status in visible_statuses])
+        if user is not None:
+            result = sqlalchemy.or_(result, table.owner_user == user.id)
+    return result
+
+
 def _get_dcpr_request_list(
     context: typing.Dict,
     data_dict: typing.Optional[typing.Dict] = None,
     filter_=None,
-) -> typing.List[typing.Dict]:
-    data_ = data_dict if data_dict is not None else {}
-    query = context["model"].Session.query(dcpr_request.DCPRRequest)
-    if filter_ is not None:
-        query = query.filter(filter_)
-    query = (
-        query.order_by(
+) -> typing.Dict:
+    """Return a page of DCPR requests, together with the total number of requests
+
+    The following parameters are accepted in the input data_dict:
+
+    - limit: maximum number of requests to return, defaults to 10
+    - offset: number of requests to skip
+    - page: 1-based page number, used to calculate the offset when it is provided
+    - sort: comma-separated list of columns, each optionally followed by `asc` or
+      `desc`, e.g. `submission_date desc, proposed_project_name`
+    - all_fields: whether to return the full details of each request, including
+      its datasets. By default only a summary of each request is returned, which
+      contains the fields that are shown in list pages plus the number of datasets
+
+    The result is a dict with the `count` and the `results` keys.
+
+    """
+
+    validated_data, errors = toolkit.navl_validate(
+        data_dict if data_dict is not None else {}, dcpr_request_list_schema(), context
+    )
+    if errors:
+        raise toolkit.ValidationError(errors)
+    return _query_dcpr_request_list(
+        context, validated_data, filters=[filter_] if filter_ is not None else []
+    )
+
+
+def _query_dcpr_request_list(
+    context: typing.Dict,
+    validated_data: typing.Dict,
+    filters: typing.List,
+    default_ordering: typing.Optional[typing.List] = None,
+) -> typing.Dict:
+    limit = validated_data.get("limit", 10)
+    if "page" in validated_data:
+        offset = (validated_data["page"] - 1) * limit
+    else:
+        offset = validated_data.get("offset", 0)
+    base_query = context["model"].Session.query(dcpr_request.DCPRRequest)
+    if filters:
+        base_query = base_query.filter(*filters)
+    dictize: typing.Callable[[typing.Any, typing.Dict], typing.Dict]
+    if validated_data.get("all_fields", False):
+        query = _get_full_dcpr_request_list_query(base_query, context)
+        dictize = dcpr_dictization.dcpr_request_dictize
+    else:
+        query = _get_summary_dcpr_request_list_query(base_query, context)
+        dictize = dcpr_dictization.dcpr_request_summary_dictize
+    ordering = _get_dcpr_request_list_ordering(
+        validated_data.get("sort"), default=default_ordering
+    )
+    query = query.order_by(*ordering).limit(limit).offset(offset)
+    return {
+        "count": base_query.count(),
+        "results": [dictize(i, context) for i in query.all()],
+    }
+
+
+def _get_full_dcpr_request_list_query(base_query, context: typing.Dict):
+    # load all relationships used by the dictization up front, instead of issuing
+    # additional queries for each row
+    eager_options = [orm.selectinload(dcpr_request.DCPRRequest.datasets)]
+    if context.get("dictize_for_ui", False):
+        eager_options.extend(
+            (
+                orm.joinedload(dcpr_request.DCPRRequest.owner),
+                orm.joinedload(dcpr_request.DCPRRequest.organization),
+            )
+        )
+    return base_query.options(*eager_options)
+
+
+def _get_summary_dcpr_request_list_query(base_query, context: typing.Dict):
+    model = context["model"]
+    dataset_count = (
+        sqlalchemy.select(
+            [sqlalchemy.func.count(dcpr_request.DCPRRequestDataset.dataset_id)]
+        )
+        .where(
+            dcpr_request.DCPRRequestDataset.dcpr_request_id
+            == dcpr_request.DCPRRequest.csi_reference_id
+        )
+        .as_scalar()
+    )
+    return (
+        base_query.outerjoin(
+            model.User, model.User.id == dcpr_request.DCPRRequest.owner_user
+        )
+        .outerjoin(
+            model.Group, model.Group.id == dcpr_request.DCPRRequest.organization_id
+        )
+        .with_entities(
+            *(
+                getattr(dcpr_request.DCPRRequest, column)
+                for column in dcpr_dictization.DCPR_REQUEST_SUMMARY_COLUMNS
+            ),
+            model.User.name.label("owner"),
+            model.Group.name.label("organization"),
+            dataset_count.label("dataset_count"),
+        )
+    )
+
+
+def _get_dcpr_request_list_ordering(
+    sort: typing.Optional[str], default: typing.Optional[typing.List] = None
+) -> typing.List:
+    if sort is None and default is not None:
+        result = list(default)
+    elif sort is None:
+        result = [
             dcpr_request.DCPRRequest.status,
             dcpr_request.DCPRRequest.submission_date,
             dcpr_request.DCPRRequest.nsif_review_date,
             dcpr_request.DCPRRequest.csi_moderation_date,
             dcpr_request.DCPRRequest.proposed_project_name,
-        )
-        .limit(data_.get("limit", 10))
-        .offset(data_.get("offset", 0))
-    )
-    return [dcpr_dictization.dcpr_request_dictize(i, context) for i in query.all()]
+        ]
+    else:
+        result = []
+        for sort_item in sort.split(","):
+            column_name, _, direction = sort_item.strip().partition(" ")
+            direction = direction.strip().lower() or "asc"
+            if column_name not in _SORTABLE_COLUMNS or direction not in ("asc", "desc"):
+                raise toolkit.ValidationError(
+                    {"sort": [toolkit._("Invalid sort value: {}").format(sort_item)]}
+                )
+            column = getattr(dcpr_request.DCPRRequest, column_name)
+            result.append(getattr(column, direction)())
+    # the primary key is the final tie-breaker, which keeps pages stable
+    result.append(dcpr_request.DCPRRequest.csi_reference_id.asc())
+    return result
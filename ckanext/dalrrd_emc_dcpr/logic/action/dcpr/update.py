@@ -1,8 +1,11 @@
 import datetime as dt
+import functools
 import logging
 import typing
 
+import sqlalchemy
 from ckan.plugins import toolkit
+from sqlalchemy import orm
 
 from .... import jobs
 from ....constants import (
@@ -13,11 +16,61 @@ from ....constants import (
 from ... import schema as dcpr_schema
 from ....model import dcpr_request
 from .... import dcpr_dictization
-from .. import create_dcpr_management_activity
+from ...auth import get_dcpr_request_object, get_dcpr_request_objects
+from .. import create_dcpr_management_activities, create_dcpr_management_activity
 
 logger = logging.getLogger(__name__)
 
+_CONCURRENT_MODIFICATION_MESSAGE: typing.Final[str] = (
+    "The DCPR request has been modified by someone else in the meantime, please "
+    "reload it and try again"
+)
+
+
+def _reject_concurrent_modifications(action: typing.Callable) -> typing.Callable:
+    """Turn concurrent modifications of a DCPR request into a validation error
+
+    DCPR requests have a version, which SQLAlchemy checks when saving them. Saving a
+    request that has been modified by someone else since it was loaded fails, instead
+    of silently overwriting the other changes.
+
+    """
+
+    @functools.wraps(action)
+    def wrapper(context: typing.Dict, data_dict: typing.Dict):
+        try:
+            return action(context, data_dict)
+        except orm.exc.StaleDataError:
+            context["model"].Session.rollback()
+            raise toolkit.ValidationError(
+                {"version": [toolkit._(_CONCURRENT_MODIFICATION_MESSAGE)]}
+            )
+
+    return wrapper
+
+
+def _check_dcpr_request_version(
+    context: typing.Dict, validated_data: typing.Dict
+) -> None:
+    """Check the version of the DCPR request that the client has loaded, if provided
+
+    This lets clients find out whether the request has been modified since they
+    loaded it, e.g. while a user was filling in the edit form.
+
+    """
+
+    expected_version = validated_data.pop("version", None)
+    if expected_version is not None:
+        request_obj = get_dcpr_request_object(
+            context, validated_data["csi_reference_id"]
+        )
+        if request_obj is not None and request_obj.version != expected_version:
+            raise toolkit.ValidationError(
+                {"version": [toolkit._(_CONCURRENT_MODIFICATION_MESSAGE)]}
+            )
 
+
+@_reject_concurrent_modifications
 def dcpr_request_update_by_owner(context, data_dict):
     schema = dcpr_schema.update_dcpr_request_by_owner_schema()
     validated_data, errors = toolkit.navl_validate(data_dict, schema, context)
@@ -36,18 +89,21 @@ def dcpr_request_update_by_owner(context, data_dict):
             }
         )
     toolkit.check_access("dcpr_request_update_by_owner_auth", context, validated_data)
+    _check_dcpr_request_version(context, validated_data)
     validated_data["owner_user"] = context["auth_user_obj"].id
     context["updated_by"] = "owner"
     request_obj = dcpr_dictization.dcpr_request_dict_save(validated_data, context)
-    context["model"].Session.commit()
     create_dcpr_management_activity(
         request_obj,
         activity_type=DcprManagementActivityType.UPDATE_DCPR_REQUEST_BY_OWNER,
         context=context,
+        changed_fields=context["dcpr_request_changed_fields"],
     )
+    context["model"].Session.commit()
     return dcpr_dictization.dcpr_request_dictize(request_obj, context)
 
 
+@_reject_concurrent_modifications
 def dcpr_request_update_by_nsif(context, data_dict):
     """Update a DCPR request's NSIF-related fields.
 
@@ -63,6 +119,7 @@ def dcpr_request_update_by_nsif(context, data_dict):
     if errors:
         raise toolkit.ValidationError(errors)
     toolkit.check_access("dcpr_request_update_by_nsif_auth", context, validated_data)
+    _check_dcpr_request_version(context, validated_data)
     validated_data.update(
         {
             "nsif_reviewer": context["auth_user_obj"].id,
@@ -70,15 +127,17 @@ def dcpr_request_update_by_nsif(context, data_dict):
         }
     )
     request_obj = dcpr_dictization.dcpr_request_dict_save(validated_data, context)
-    context["model"].Session.commit()
     create_dcpr_management_activity(
         request_obj,
         activity_type=DcprManagementActivityType.UPDATE_DCPR_REQUEST_BY_NSIF,
         context=context,
+        changed_fields=context["dcpr_request_changed_fields"],
     )
+    context["model"].Session.commit()
     return dcpr_dictization.dcpr_request_dictize(request_obj, context)
 
 
+@_reject_concurrent_modifications
 def dcpr_request_update_by_csi(context, data_dict):
     """Update a DCPR request's CSI-related fields.
 
@@ -94,6 +153,7 @@ def dcpr_request_update_by_csi(context, data_dict):
     if errors:
         raise toolkit.ValidationError(errors)
     toolkit.check_access("dcpr_request_update_by_csi_auth", context, validated_data)
+    _check_dcpr_request_version(context, validated_data)
     validated_data.update(
         {
             "csi_moderator": context["auth_user_obj"].id,
@@ -101,21 +161,28 @@ def dcpr_request_update_by_csi(context, data_dict):
         }
     )
     request_obj = dcpr_dictization.dcpr_request_dict_save(validated_data, context)
-    context["model"].Session.commit()
     create_dcpr_management_activity(
         request_obj,
         activity_type=DcprManagementActivityType.UPDATE_DCPR_REQUEST_BY_CSI,
         context=context,
+        changed_fields=context["dcpr_request_changed_fields"],
     )
+    context["model"].Session.commit()
     return dcpr_dictization.dcpr_request_dictize(request_obj, context)
 
 
+@_reject_concurrent_modifications
 def dcpr_request_submit(context, data_dict):
     """Submit a DCPR request.
 
     By submitting a DCPR request, it is marked as ready for review by the SASDI
     organizations.
 
+    The result includes an `overlapping_accepted_requests` key, with the ids of the
+    already accepted DCPR requests whose spatial extent overlaps with the submitted
+    request's. This allows the requester to be warned about a possible duplication
+    of efforts.
+
     """
 
     schema = dcpr_schema.dcpr_request_submit_schema()
@@ -143,22 +210,59 @@ def dcpr_request_submit(context, data_dict):
                 f"sysadmin {context['auth_user_obj'].id} has now been made the owner "
                 f"of DCPR request {request_obj.csi_reference_id}"
             )
-
-        model.Session.commit()
+        # the request and its activity are committed together, and the notification
+        # job is only enqueued afterwards, so that it never sees a partial state
         activity = create_dcpr_management_activity(
             request_obj,
             activity_type=DcprManagementActivityType.SUBMIT_DCPR_REQUEST,
             context=context,
         )
+        model.Session.commit()
         toolkit.enqueue_job(
             jobs.notify_dcpr_actors_of_relevant_status_change,
             args=[activity["id"]],
         )
     else:
         raise toolkit.ObjectNotFound
-    return toolkit.get_action("dcpr_request_show")(context, validated_data)
+    result = toolkit.get_action("dcpr_request_show")(context, validated_data)
+    result["overlapping_accepted_requests"] = _get_overlapping_accepted_requests(
+        context, request_obj.csi_reference_id
+    )
+    return result
+
+
+def _get_overlapping_accepted_requests(
+    context: typing.Dict, csi_reference_id: str
+) -> typing.List[str]:
+    """Return ids of the accepted DCPR requests that overlap with the input one
+
+    The spatial index on the requests' extent keeps this cheap, regardless of how
+    many requests exist.
+
+    """
+
+    other = orm.aliased(dcpr_request.DCPRRequest)
+    query = (
+        context["model"]
+        .Session.query(other.csi_reference_id)
+        .join(
+            dcpr_request.DCPRRequest,
+            sqlalchemy.func.ST_Intersects(
+                other.spatial_extent_geom,
+                dcpr_request.DCPRRequest.spatial_extent_geom,
+            ),
+        )
+        .filter(
+            dcpr_request.DCPRRequest.csi_reference_id == csi_reference_id,
+            other.csi_reference_id != csi_reference_id,
+            other.status == DCPRRequestStatus.ACCEPTED.value,
+        )
+        .order_by(other.csi_reference_id)
+    )
+    return [row.csi_reference_id for row in query.all()]
 
 
+@_reject_concurrent_modifications
 def dcpr_request_nsif_moderate(
     context: typing.Dict, data_dict: typing.Dict
 ) -> typing.Dict:
@@ -175,7 +279,7 @@ def dcpr_request_nsif_moderate(
         raise toolkit.ValidationError(errors)
 
     toolkit.check_access("dcpr_request_nsif_moderate_auth", context, validated_data)
-    validated_data.update(nsif_moderation_date=dt.datetime.now(dt.timezone.utc))
+    _check_dcpr_request_version(context, validated_data)
     request_obj = (
         context["model"]
         .Session.query(dcpr_request.DCPRRequest)
@@ -192,6 +296,7 @@ def dcpr_request_nsif_moderate(
             _update_dcpr_request_status(
                 request_obj, transition_action=moderation_action
             )
+            request_obj.nsif_review_date = dt.datetime.now(dt.timezone.utc)
             # the sysadmin is authorized to moderate a DCPR request - however we want
             # to track that this action has been carried out by the sysadmin and not
             # by the DCPR request's original NSIF reviewer. As such we change the NSIF
@@ -202,7 +307,6 @@ def dcpr_request_nsif_moderate(
                     f"sysadmin {context['auth_user_obj'].id} has now been made the "
                     f"NSIF reviewer for DCPR request {request_obj.csi_reference_id}"
                 )
-            context["model"].Session.commit()
             activity_type = {
                 DcprRequestModerationAction.APPROVE: DcprManagementActivityType.ACCEPT_DCPR_REQUEST_NSIF,
                 DcprRequestModerationAction.REJECT: DcprManagementActivityType.REJECT_DCPR_REQUEST_NSIF,
@@ -211,6 +315,7 @@ def dcpr_request_nsif_moderate(
             activity = create_dcpr_management_activity(
                 request_obj, activity_type=activity_type, context=context
             )
+            context["model"].Session.commit()
             toolkit.enqueue_job(
                 jobs.notify_dcpr_actors_of_relevant_status_change,
                 args=[activity["id"]],
@@ -221,6 +326,7 @@ def dcpr_request_nsif_moderate(
     return result
 
 
+@_reject_concurrent_modifications
 def dcpr_request_csi_moderate(
     context: typing.Dict, data_dict: typing.Dict
 ) -> typing.Dict:
@@ -230,7 +336,7 @@ def dcpr_request_csi_moderate(
         raise toolkit.ValidationError(errors)
 
     toolkit.check_access("dcpr_request_csi_moderate_auth", context, validated_data)
-    validated_data.update(csi_moderation_date=dt.datetime.now(dt.timezone.utc))
+    _check_dcpr_request_version(context, validated_data)
     request_obj = (
         context["model"]
         .Session.query(dcpr_request.DCPRRequest)
@@ -247,6 +353,7 @@ def dcpr_request_csi_moderate(
             _update_dcpr_request_status(
                 request_obj, transition_action=moderation_action
             )
+            request_obj.csi_moderation_date = dt.datetime.now(dt.timezone.utc)
             # The sysadmin is authorized to moderate a DCPR request - however we want
             # to track that this action has been carried out by the sysadmin and not
             # by the DCPR request's original CSI moderator. As such we change the CSI
@@ -257,7 +364,6 @@ def dcpr_request_csi_moderate(
                     f"sysadmin {context['auth_user_obj'].id} has now been made the "
                     f"CSI moderator for DCPR request {request_obj.csi_reference_id}"
                 )
-            context["model"].Session.commit()
             activity_type = {
                 DcprRequestModerationAction.APPROVE: DcprManagementActivityType.ACCEPT_DCPR_REQUEST_CSI,
                 DcprRequestModerationAction.REJECT: DcprManagementActivityType.REJECT_DCPR_REQUEST_CSI,
@@ -266,6 +372,7 @@ def dcpr_request_csi_moderate(
             activity = create_dcpr_management_activity(
                 request_obj, activity_type=activity_type, context=context
             )
+            context["model"].Session.commit()
             toolkit.enqueue_job(
                 jobs.notify_dcpr_actors_of_relevant_status_change,
                 args=[activity["id"]],
@@ -276,6 +383,114 @@ def dcpr_request_csi_moderate(
     return result
 
 
+@_reject_concurrent_modifications
+def dcpr_request_nsif_moderate_bulk(
+    context: typing.Dict, data_dict: typing.Dict
+) -> typing.Dict:
+    """Provide the NSIF's moderation for several DCPR requests at once
+
+    All requests are moderated with the same action, in a single transaction. The
+    operation is only carried out if the current user is allowed to moderate all of
+    the requests.
+
+    """
+
+    return _moderate_bulk(
+        context,
+        data_dict,
+        auth_function="dcpr_request_nsif_moderate_bulk_auth",
+        moderator_request_attribute="nsif_reviewer",
+        moderation_date_attribute="nsif_review_date",
+        activity_types={
+            DcprRequestModerationAction.APPROVE: DcprManagementActivityType.ACCEPT_DCPR_REQUEST_NSIF,
+            DcprRequestModerationAction.REJECT: DcprManagementActivityType.REJECT_DCPR_REQUEST_NSIF,
+            DcprRequestModerationAction.REQUEST_CLARIFICATION: DcprManagementActivityType.REQUEST_CLARIFICATION_DCPR_REQUEST_NSIF,
+        },
+    )
+
+
+@_reject_concurrent_modifications
+def dcpr_request_csi_moderate_bulk(
+    context: typing.Dict, data_dict: typing.Dict
+) -> typing.Dict:
+    """Provide the CSI's moderation for several DCPR requests at once
+
+    This works just like `dcpr_request_nsif_moderate_bulk`.
+
+    """
+
+    return _moderate_bulk(
+        context,
+        data_dict,
+        auth_function="dcpr_request_csi_moderate_bulk_auth",
+        moderator_request_attribute="csi_moderator",
+        moderation_date_attribute="csi_moderation_date",
+        activity_types={
+            DcprRequestModerationAction.APPROVE: DcprManagementActivityType.ACCEPT_DCPR_REQUEST_CSI,
+            DcprRequestModerationAction.REJECT: DcprManagementActivityType.REJECT_DCPR_REQUEST_CSI,
+            DcprRequestModerationAction.REQUEST_CLARIFICATION: DcprManagementActivityType.REQUEST_CLARIFICATION_DCPR_REQUEST_CSI,
+        },
+    )
+
+
+def _moderate_bulk(
+    context: typing.Dict,
+    data_dict: typing.Dict,
+    auth_function: str,
+    moderator_request_attribute: str,
+    moderation_date_attribute: str,
+    activity_types: typing.Dict[
+        DcprRequestModerationAction, DcprManagementActivityType
+    ],
+) -> typing.Dict:
+    schema = dcpr_schema.bulk_moderate_dcpr_request_schema()
+    validated_data, errors = toolkit.navl_validate(data_dict, schema, context)
+    if errors:
+        raise toolkit.ValidationError(errors)
+    toolkit.check_access(auth_function, context, validated_data)
+    csi_reference_ids = validated_data["csi_reference_ids"]
+    request_objs = get_dcpr_request_objects(context, csi_reference_ids)
+    missing = set(csi_reference_ids) - set(request_objs.keys())
+    if len(missing) > 0:
+        raise toolkit.ObjectNotFound(
+            toolkit._("DCPR requests not found: {}").format(", ".join(missing))
+        )
+    moderation_action = DcprRequestModerationAction(validated_data["action"])
+    user = context["auth_user_obj"]
+    moderation_date = dt.datetime.now(dt.timezone.utc)
+    for request_obj in request_objs.values():
+        _update_dcpr_request_status(request_obj, transition_action=moderation_action)
+        setattr(request_obj, moderation_date_attribute, moderation_date)
+        # just like when moderating a single request, sysadmins become the request's
+        # moderator
+        if user.sysadmin:
+            setattr(request_obj, moderator_request_attribute, user.id)
+    activities = create_dcpr_management_activities(
+        request_objs.values(),
+        activity_type=activity_types[moderation_action],
+        context=context,
+    )
+    context["model"].Session.commit()
+    activity_ids_by_owner: typing.Dict[str, typing.List[str]] = {}
+    for activity in activities:
+        owner_user = request_objs[activity.object_id].owner_user
+        activity_ids_by_owner.setdefault(owner_user, []).append(activity.id)
+    for activity_ids in activity_ids_by_owner.values():
+        toolkit.enqueue_job(
+            jobs.notify_dcpr_actors_of_relevant_status_changes, args=[activity_ids]
+        )
+    return {
+        "count": len(request_objs),
+        "results": [
+            {
+                "csi_reference_id": request_obj.csi_reference_id,
+                "status": request_obj.status,
+            }
+            for request_obj in request_objs.values()
+        ],
+    }
+
+
 def claim_dcpr_request_nsif_reviewer(
     context: typing.Dict, data_dict: typing.Dict
 ) -> typing.Dict:
@@ -320,17 +535,71 @@ def _become_reviewer(
         .get(validated_data["csi_reference_id"])
     )
     if request_obj is not None:
-        _update_dcpr_request_status(request_obj)
-        setattr(request_obj, reviewer_request_attribute, context["auth_user_obj"].id)
+        claimed = _claim_dcpr_request_reviewer(
+            context, request_obj, reviewer_request_attribute
+        )
+        if not claimed:
+            model.Session.rollback()
+            raise toolkit.NotAuthorized(
+                toolkit._("DCPR request has already been claimed by another reviewer")
+            )
+        create_dcpr_management_activity(
+            request_obj,
+            activity_type=activity_type,
+            context=context,
+            changed_fields=["status", reviewer_request_attribute],
+        )
         model.Session.commit()
     else:
         raise toolkit.ObjectNotFound
-    create_dcpr_management_activity(
-        request_obj, activity_type=activity_type, context=context
-    )
     return toolkit.get_action("dcpr_request_show")(context, validated_data)
 
 
+def _claim_dcpr_request_reviewer(
+    context: typing.Dict,
+    request_obj: dcpr_request.DCPRRequest,
+    reviewer_request_attribute: str,
+) -> bool:
+    """Make the current user the reviewer of a DCPR request, returning whether it won
+
+    The claim is done with a single conditional UPDATE, which only succeeds if the
+    request's version is still the one that was checked by the auth function. When
+    several users claim the same request at once, the DB lets exactly one of them
+    change it, without any explicit locking. Matching on the version rather than on
+    the status means this also holds when a sysadmin takes over a request that is
+    already being reviewed, as the status does not change in that case.
+
+    """
+
+    current_status = DCPRRequestStatus(request_obj.status)
+    try:
+        next_status = _determine_next_dcpr_request_status(current_status)
+    except NotImplementedError:
+        # sysadmins are allowed to take over requests that are already being reviewed
+        next_status = current_status
+    if next_status is None:
+        raise toolkit.NotAuthorized(
+            toolkit._("DCPR request has already been moderated and cannot be claimed")
+        )
+    table = dcpr_request.dcpr_request_table
+    result = context["model"].Session.execute(
+        table.update()
+        .where(table.c.csi_reference_id == request_obj.csi_reference_id)
+        .where(table.c.version == request_obj.version)
+        .values(
+            {
+                reviewer_request_attribute: context["auth_user_obj"].id,
+                "status": next_status.value,
+                "version": table.c.version + 1,
+            }
+        )
+    )
+    # make sure the request is loaded again with the values that are now in the DB
+    context["model"].Session.expire(request_obj)
+    return result.rowcount == 1
+
+
+@_reject_concurrent_modifications
 def resign_dcpr_request_nsif_reviewer(
     context: typing.Dict, data_dict: typing.Dict
 ) -> typing.Dict:
@@ -342,6 +611,7 @@ def resign_dcpr_request_nsif_reviewer(
     )
 
 
+@_reject_concurrent_modifications
 def resign_dcpr_request_csi_reviewer(
     context: typing.Dict, data_dict: typing.Dict
 ) -> typing.Dict:
@@ -373,12 +643,12 @@ def _resign_reviewer(
         _update_dcpr_request_status(
             request_obj, transition_action=DcprRequestModerationAction.RESIGN
         )
+        activity = create_dcpr_management_activity(
+            request_obj, activity_type=activity_type, context=context
+        )
         context["model"].Session.commit()
     else:
         raise toolkit.ObjectNotFound
-    activity = create_dcpr_management_activity(
-        request_obj, activity_type=activity_type, context=context
-    )
     toolkit.enqueue_job(
         jobs.notify_dcpr_actors_of_relevant_status_change,
         args=[activity["id"]],
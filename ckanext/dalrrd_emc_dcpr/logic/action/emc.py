@@ -6,7 +6,10 @@ import typing
 import ckan.plugins.toolkit as toolkit
 import sqlalchemy
 
-from ... import jobs
+from ... import (
+    caching,
+    jobs,
+)
 from ...constants import DatasetManagementActivityType
 
 from . import create_dataset_management_activity
@@ -20,6 +23,11 @@ def show_version(
     data_dict: typing.Optional[typing.Dict] = None,
 ) -> typing.Dict:
     """return the current version of this project"""
+    return _get_version_info().copy()
+
+
+@caching.static_value()
+def _get_version_info() -> typing.Dict:
     return {
         "version": pkg_resources.require("ckanext-dalrrd-emc-dcpr")[0].version,
         "git_sha": os.getenv("GIT_COMMIT"),
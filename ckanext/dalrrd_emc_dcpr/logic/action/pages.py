@@ -0,0 +1,35 @@
+"""Override of ckanext-pages actions"""
+
+import logging
+import typing
+
+import ckan.plugins.toolkit as toolkit
+
+from ... import caching
+
+logger = logging.getLogger(__name__)
+
+
+@toolkit.chained_action
+def ckanext_pages_update(original_action, context, data_dict):
+    """Intercepts the `ckanext_pages_update` action to invalidate the cached nav pages
+
+    ckanext-pages uses this same action for both creating and updating pages.
+
+    """
+
+    return _invalidate_nav_pages_after(original_action, context, data_dict)
+
+
+@toolkit.chained_action
+def ckanext_pages_delete(original_action, context, data_dict):
+    """Intercepts the `ckanext_pages_delete` action to invalidate the cached nav pages"""
+    return _invalidate_nav_pages_after(original_action, context, data_dict)
+
+
+def _invalidate_nav_pages_after(
+    action: typing.Callable, context: typing.Dict, data: typing.Dict
+):
+    result = action(context, data)
+    caching.invalidate(caching.NAV_PAGES_CACHE_NAME, shared=True)
+    return result
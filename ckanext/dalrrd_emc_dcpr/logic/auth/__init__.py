@@ -0,0 +1,107 @@
+import typing
+
+from ckan import model
+from sqlalchemy import orm
+
+from ... import caching
+from ...model import dcpr_request
+
+DCPR_REQUESTS_REQUEST_CACHE_NAME: typing.Final[str] = "dcpr_requests"
+
+
+def get_dcpr_request_object(
+    context: typing.Dict, csi_reference_id: typing.Optional[str]
+) -> typing.Optional[dcpr_request.DCPRRequest]:
+    """Return the DCPR request with the input id, loading it at most once per request
+
+    This is the DCPR counterpart of CKAN's `get_package_object()`. The loaded request
+    is stashed in the context under the `dcpr_request` key, so that the auth function
+    and the action that share the context also share the object. Loaded requests are
+    additionally kept in a request-scoped cache, which lets subsequent actions of the
+    same request (e.g. those called by a blueprint view) reuse them.
+
+    The request's relationships are eagerly loaded together with the request itself.
+
+    """
+
+    stashed = context.get("dcpr_request")
+    if (
+        stashed is not None
+        and stashed in model.Session
+        and stashed.csi_reference_id == csi_reference_id
+    ):
+        result = stashed
+    elif csi_reference_id is None:
+        result = None
+    else:
+        cache = caching.get_request_cache(DCPR_REQUESTS_REQUEST_CACHE_NAME)
+        result = cache.get(csi_reference_id)
+        if result is None or result not in model.Session:
+            result = (
+                model.Session.query(dcpr_request.DCPRRequest)
+                .options(
+                    orm.joinedload(dcpr_request.DCPRRequest.owner),
+                    orm.joinedload(dcpr_request.DCPRRequest.organization),
+                    orm.selectinload(dcpr_request.DCPRRequest.datasets),
+                )
+                .get(csi_reference_id)
+            )
+            if result is not None:
+                cache[csi_reference_id] = result
+        if result is not None:
+            context["dcpr_request"] = result
+    return result
+
+
+def get_dcpr_request_objects(
+    context: typing.Dict, csi_reference_ids: typing.Iterable[str]
+) -> typing.Dict[str, dcpr_request.DCPRRequest]:
+    """Return the DCPR requests with the input ids, loading the missing ones at once
+
+    This is the bulk counterpart of `get_dcpr_request_object()`. Requests that are
+    neither stashed in the context, under the `dcpr_requests` key, nor in the
+    request-scoped cache are loaded with a single query and added to both. Ids that
+    do not exist are not included in the result.
+
+    """
+
+    stashed = context.setdefault("dcpr_requests", {})
+    cache = caching.get_request_cache(DCPR_REQUESTS_REQUEST_CACHE_NAME)
+    result = {}
+    missing = []
+    for csi_reference_id in csi_reference_ids:
+        cached = stashed.get(csi_reference_id, cache.get(csi_reference_id))
+        if cached is not None and cached in model.Session:
+            result[csi_reference_id] = cached
+        else:
+            missing.append(csi_reference_id)
+    if len(missing) > 0:
+        query = (
+            model.Session.query(dcpr_request.DCPRRequest)
+            .options(
+                orm.joinedload(dcpr_request.DCPRRequest.owner),
+                orm.joinedload(dcpr_request.DCPRRequest.organization),
+                orm.selectinload(dcpr_request.DCPRRequest.datasets),
+            )
+            .filter(dcpr_request.DCPRRequest.csi_reference_id.in_(missing))
+        )
+        for request_obj in query.all():
+            cache[request_obj.csi_reference_id] = request_obj
+            result[request_obj.csi_reference_id] = request_obj
+    stashed.update(result)
+    return result
+
+
+def forget_dcpr_request_object(context: typing.Dict, csi_reference_id: str) -> None:
+    """Remove a DCPR request from the context and the request-scoped cache
+
+    This must be called when a request is deleted.
+
+    """
+
+    stashed = context.pop("dcpr_request", None)
+    if stashed is not None and stashed.csi_reference_id != csi_reference_id:
+        context["dcpr_request"] = stashed
+    caching.get_request_cache(DCPR_REQUESTS_REQUEST_CACHE_NAME).pop(
+        csi_reference_id, None
+    )
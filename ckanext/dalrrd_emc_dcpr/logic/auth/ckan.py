@@ -37,13 +37,11 @@ def package_update(next_auth, context, data_dict=None):
             else:
                 org_id = data_dict.get("owner_org", package.owner_org)
                 if org_id is not None:
-                    members = toolkit.get_action("member_list")(
-                        data_dict={"id": org_id, "object_type": "user"}
+                    is_org_admin = toolkit.h["emc_user_is_org_member"](
+                        org_id, user, role="admin", context=context
                     )
-                    for member_id, _, role in members:
-                        if member_id == user.id and role.lower() == "admin":
-                            result["success"] = True
-                            break
+                    if is_org_admin:
+                        result["success"] = True
                     else:
                         result["msg"] = (
                             f"Only administrators of organization {org_id!r} are "
@@ -89,14 +87,8 @@ def authorize_package_publish(
         # beforehand, so we deny
         owner_org = data_.get("owner_org", data_.get("group_id"))
         if owner_org is not None:
-            members = toolkit.get_action("member_list")(
-                data_dict={"id": owner_org, "object_type": "user"}
-            )
-            admin_member_ids = [
-                member_tuple[0]
-                for member_tuple in members
-                if member_tuple[2] == "Admin"
-            ]
-            if user.id in admin_member_ids:
+            if toolkit.h["emc_user_is_org_member"](
+                owner_org, user, role="admin", context=context
+            ):
                 result = {"success": True}
     return result
@@ -2,8 +2,16 @@ import logging
 import typing
 
 from ckan.plugins import toolkit
-from ...model import dcpr_request as dcpr_request
-from ...constants import DCPRRequestStatus, CSI_ORG_NAME, NSIF_ORG_NAME
+from . import get_dcpr_request_object, get_dcpr_request_objects
+from ...constants import (
+    CSI_ORG_NAME,
+    DCPR_REQUEST_CSI_STATUSES,
+    DCPR_REQUEST_NSIF_AND_CSI_STATUSES,
+    DCPR_REQUEST_NSIF_STATUSES,
+    DCPR_REQUEST_PUBLISHED_STATUSES,
+    DCPRRequestStatus,
+    NSIF_ORG_NAME,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -76,6 +84,27 @@ def dcpr_request_list_pending_nsif_auth(
     return result
 
 
+def dcpr_request_stats_auth(
+    context: typing.Dict, data_dict: typing.Optional[typing.Dict] = None
+) -> typing.Dict:
+    """Authorize viewing aggregated statistics about DCPR requests
+
+    Statistics are available to the members of the NSIF and CSI organizations and to
+    the CKAN sysadmins.
+
+    """
+
+    user = context["auth_user_obj"]
+    if user.sysadmin:
+        result = {"success": True}
+    else:
+        result = {
+            "success": toolkit.h["emc_user_is_org_member"](NSIF_ORG_NAME, user)
+            or toolkit.h["emc_user_is_org_member"](CSI_ORG_NAME, user)
+        }
+    return result
+
+
 def dcpr_report_create_auth(
     context: typing.Dict, data_dict: typing.Optional[typing.Dict] = None
 ) -> typing.Dict:
@@ -108,36 +137,36 @@ def dcpr_request_create_auth(
     if db_user.sysadmin:
         result["success"] = True
     else:
-        member_of_orgs = len(db_user.get_groups()) > 0
+        member_of_orgs = toolkit.h["emc_user_has_org_membership"](db_user.id)
         result = {"success": member_of_orgs}
     return result
 
 
+@toolkit.auth_allow_anonymous_access
+def dcpr_request_search_auth(
+    context: typing.Dict, data_dict: typing.Optional[typing.Dict] = None
+) -> typing.Dict:
+    """Authorize searching DCPR requests
+
+    Everyone is allowed to search. The search action only returns those requests
+    that the current user would be allowed to see with `dcpr_request_show`.
+
+    """
+
+    return {"success": True}
+
+
 @toolkit.auth_allow_anonymous_access
 def dcpr_request_show_auth(context: typing.Dict, data_dict: typing.Dict) -> typing.Dict:
     result = {"success": False}
     unauthorized_msg = toolkit._("You are not authorized to view this request")
-    request_obj = dcpr_request.DCPRRequest.get(data_dict.get("csi_reference_id"))
-    published_statuses = (
-        DCPRRequestStatus.ACCEPTED,
-        DCPRRequestStatus.REJECTED,
-    )
-    nsif_statuses = (
-        DCPRRequestStatus.UNDER_MODIFICATION_REQUESTED_BY_NSIF,
-        DCPRRequestStatus.AWAITING_NSIF_REVIEW,
-        DCPRRequestStatus.UNDER_NSIF_REVIEW,
-    )
-    csi_statuses = (
-        DCPRRequestStatus.UNDER_MODIFICATION_REQUESTED_BY_CSI,
-        DCPRRequestStatus.UNDER_CSI_REVIEW,
-    )
-    nsif_and_csi_statuses = (DCPRRequestStatus.AWAITING_CSI_REVIEW,)
+    request_obj = get_dcpr_request_object(context, data_dict.get("csi_reference_id"))
     if request_obj is not None:
         auth_user_obj = context["auth_user_obj"]
         current_status = DCPRRequestStatus(request_obj.status)
         if auth_user_obj is not None and auth_user_obj.id == request_obj.owner_user:
             result["success"] = True
-        elif current_status in published_statuses:
+        elif current_status in DCPR_REQUEST_PUBLISHED_STATUSES:
             # request has already been moderated, so everyone can see it
             result["success"] = True
         else:
@@ -147,11 +176,11 @@ def dcpr_request_show_auth(context: typing.Dict, data_dict: typing.Dict) -> typi
             is_csi_member = toolkit.h["emc_user_is_org_member"](
                 CSI_ORG_NAME, context["auth_user_obj"]
             )
-            if current_status in nsif_statuses:
+            if current_status in DCPR_REQUEST_NSIF_STATUSES:
                 result["success"] = is_nsif_member
-            elif current_status in csi_statuses:
+            elif current_status in DCPR_REQUEST_CSI_STATUSES:
                 result["success"] = is_csi_member
-            elif current_status in nsif_and_csi_statuses:
+            elif current_status in DCPR_REQUEST_NSIF_AND_CSI_STATUSES:
                 # both NSIF and CSI members are allowed
                 result["success"] = is_nsif_member or is_csi_member
     if not result:
@@ -162,7 +191,7 @@ def dcpr_request_show_auth(context: typing.Dict, data_dict: typing.Dict) -> typi
 def dcpr_request_update_by_owner_auth(
     context: typing.Dict, data_dict: typing.Dict
 ) -> typing.Dict:
-    request_obj = dcpr_request.DCPRRequest.get(data_dict["csi_reference_id"])
+    request_obj = get_dcpr_request_object(context, data_dict["csi_reference_id"])
     result = {"success": False}
     if request_obj is not None:
         owner_updatable_statuses = [
@@ -200,7 +229,7 @@ def dcpr_request_update_by_nsif_auth(
     """
 
     result = {"success": False}
-    request_obj = dcpr_request.DCPRRequest.get(data_dict.get("csi_reference_id"))
+    request_obj = get_dcpr_request_object(context, data_dict.get("csi_reference_id"))
     if request_obj is not None:
         if request_obj.status == DCPRRequestStatus.UNDER_NSIF_REVIEW.value:
             is_reviewer = request_obj.nsif_reviewer == context["auth_user_obj"].id
@@ -235,7 +264,7 @@ def dcpr_request_update_by_csi_auth(
     """
 
     result = {"success": False}
-    request_obj = dcpr_request.DCPRRequest.get(data_dict.get("csi_reference_id"))
+    request_obj = get_dcpr_request_object(context, data_dict.get("csi_reference_id"))
     if request_obj is not None:
         if request_obj.status == DCPRRequestStatus.UNDER_CSI_REVIEW.value:
             is_moderator = request_obj.csi_moderator == context["auth_user_obj"].id
@@ -266,7 +295,7 @@ def dcpr_request_nsif_moderate_auth(
 ) -> typing.Dict:
     """DCPR request nsif_reviewer is the only one allowed to moderate it."""
     logger.debug(f"Entered dcpr_request_nsif_moderate_auth: {context=} {data_dict=}")
-    request_obj = dcpr_request.DCPRRequest.get(data_dict["csi_reference_id"])
+    request_obj = get_dcpr_request_object(context, data_dict["csi_reference_id"])
     result = {"success": False}
     if request_obj is not None:
         if request_obj.status == DCPRRequestStatus.UNDER_NSIF_REVIEW.value:
@@ -297,7 +326,7 @@ def dcpr_request_csi_moderate_auth(
     context: typing.Dict, data_dict: typing.Dict
 ) -> typing.Dict:
     """DCPR request csi_moderator is the only one allowed to moderate it."""
-    request_obj = dcpr_request.DCPRRequest.get(data_dict["csi_reference_id"])
+    request_obj = get_dcpr_request_object(context, data_dict["csi_reference_id"])
     result = {"success": False}
     if request_obj is not None:
         if request_obj.status == DCPRRequestStatus.UNDER_CSI_REVIEW.value:
@@ -323,6 +352,57 @@ def dcpr_request_csi_moderate_auth(
     return result
 
 
+def dcpr_request_nsif_moderate_bulk_auth(
+    context: typing.Dict, data_dict: typing.Dict
+) -> typing.Dict:
+    """Authorize moderating several DCPR requests at once on behalf of the NSIF"""
+    return _authorize_bulk(
+        context, data_dict, single_auth_function=dcpr_request_nsif_moderate_auth
+    )
+
+
+def dcpr_request_csi_moderate_bulk_auth(
+    context: typing.Dict, data_dict: typing.Dict
+) -> typing.Dict:
+    """Authorize moderating several DCPR requests at once on behalf of the CSI"""
+    return _authorize_bulk(
+        context, data_dict, single_auth_function=dcpr_request_csi_moderate_auth
+    )
+
+
+def _authorize_bulk(
+    context: typing.Dict,
+    data_dict: typing.Dict,
+    single_auth_function: typing.Callable[[typing.Dict, typing.Dict], typing.Dict],
+) -> typing.Dict:
+    """Authorize an operation on several DCPR requests at once
+
+    All requests are loaded with a single query and then checked with the auth
+    function of the single request operation. The operation is only authorized if
+    it is authorized for all of the requests.
+
+    """
+
+    csi_reference_ids = data_dict.get("csi_reference_ids", [])
+    request_objs = get_dcpr_request_objects(context, csi_reference_ids)
+    result: typing.Dict[str, typing.Any] = {"success": True}
+    for csi_reference_id in csi_reference_ids:
+        request_obj = request_objs.get(csi_reference_id)
+        request_context = context.copy()
+        if request_obj is not None:
+            request_context["dcpr_request"] = request_obj
+        single_result = single_auth_function(
+            request_context, {"csi_reference_id": csi_reference_id}
+        )
+        if not single_result["success"]:
+            result = {
+                "success": False,
+                "msg": f"{csi_reference_id}: {single_result.get('msg', '')}",
+            }
+            break
+    return result
+
+
 def dcpr_request_delete_auth(
     context: typing.Dict, data_dict: typing.Optional[typing.Dict] = None
 ) -> typing.Dict:
@@ -333,7 +413,7 @@ def dcpr_request_delete_auth(
     """
 
     request_id = toolkit.get_or_bust(data_dict, "csi_reference_id")
-    request_obj = dcpr_request.DCPRRequest.get(request_id)
+    request_obj = get_dcpr_request_object(context, request_id)
     result = {"success": False}
     if request_obj is not None:
         is_owner = context["auth_user_obj"].id == request_obj.owner_user
@@ -352,7 +432,7 @@ def dcpr_request_claim_nsif_reviewer_auth(
 ) -> typing.Dict:
     """Check whether current user can claim the role of NSIF reviewer for a DCPR request"""
     request_id = toolkit.get_or_bust(data_dict, "csi_reference_id")
-    request_obj = dcpr_request.DCPRRequest.get(request_id)
+    request_obj = get_dcpr_request_object(context, request_id)
     result = {"success": False}
     if request_obj is not None:
         if context["auth_user_obj"].sysadmin:
@@ -387,7 +467,7 @@ def dcpr_request_claim_csi_moderator_auth(
 ) -> typing.Dict:
     """Check whether current user can claim the role of CSI moderator for a DCPR request"""
     request_id = toolkit.get_or_bust(data_dict, "csi_reference_id")
-    request_obj = dcpr_request.DCPRRequest.get(request_id)
+    request_obj = get_dcpr_request_object(context, request_id)
     result = {"success": False}
     if request_obj is not None:
         if context["auth_user_obj"].sysadmin:
@@ -425,7 +505,7 @@ def dcpr_request_resign_nsif_reviewer_auth(
     """
 
     request_id = toolkit.get_or_bust(data_dict, "csi_reference_id")
-    request_obj = dcpr_request.DCPRRequest.get(request_id)
+    request_obj = get_dcpr_request_object(context, request_id)
     result = {"success": False}
     if request_obj is not None:
         if request_obj.status == DCPRRequestStatus.UNDER_NSIF_REVIEW.value:
@@ -456,7 +536,7 @@ def dcpr_request_resign_csi_reviewer_auth(
     """
 
     request_id = toolkit.get_or_bust(data_dict, "csi_reference_id")
-    request_obj = dcpr_request.DCPRRequest.get(request_id)
+    request_obj = get_dcpr_request_object(context, request_id)
     result = {"success": False}
     if request_obj is not None:
         if request_obj.status == DCPRRequestStatus.UNDER_CSI_REVIEW.value:
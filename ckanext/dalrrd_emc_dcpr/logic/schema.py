@@ -6,6 +6,58 @@ def show_dcpr_request_schema(not_missing, not_empty, unicode_safe):
     return {"csi_reference_id": [not_missing, not_empty, unicode_safe]}
 
 
+@validator_args
+def dcpr_request_list_schema(
+    boolean_validator,
+    ignore_missing,
+    is_positive_integer,
+    natural_number_validator,
+    unicode_safe,
+):
+    return {
+        "limit": [ignore_missing, is_positive_integer],
+        "offset": [ignore_missing, natural_number_validator],
+        "page": [ignore_missing, is_positive_integer],
+        "sort": [ignore_missing, unicode_safe],
+        "all_fields": [ignore_missing, boolean_validator],
+    }
+
+
+@validator_args
+def dcpr_request_search_schema(
+    convert_to_list_if_string,
+    ignore_missing,
+    isodate,
+    unicode_safe,
+):
+    result = dcpr_request_list_schema()
+    result.update(
+        {
+            "q": [ignore_missing, unicode_safe],
+            "status": [ignore_missing, convert_to_list_if_string],
+            "organization_id": [ignore_missing, unicode_safe],
+            "data_capture_urgency": [ignore_missing, unicode_safe],
+            "capture_start_date": [ignore_missing, isodate],
+            "capture_end_date": [ignore_missing, isodate],
+        }
+    )
+    return result
+
+
+@validator_args
+def dcpr_request_spatial_search_schema(
+    ignore_missing, not_empty, not_missing, unicode_safe
+):
+    result = dcpr_request_search_schema()
+    result.update(
+        {
+            "bbox": [not_missing, not_empty, unicode_safe],
+            "relation": [ignore_missing, unicode_safe],
+        }
+    )
+    return result
+
+
 @validator_args
 def create_dcpr_request_schema(
     ignore_missing,
@@ -68,13 +120,15 @@ def update_dcpr_request_by_owner_schema(
         "spatial_resolution": [ignore_missing, unicode_safe],
         "data_capture_urgency": [ignore_missing, unicode_safe],
         "additional_documents": [unicode_safe, ignore_missing],
-        "datasets": create_dcpr_request_dataset_schema(),
+        "datasets": update_dcpr_request_dataset_schema(),
+        "version": [ignore_missing, is_positive_integer],
     }
 
 
 @validator_args
 def update_dcpr_request_by_nsif_schema(
     ignore_missing,
+    is_positive_integer,
     not_empty,
     not_missing,
     unicode_safe,
@@ -84,12 +138,14 @@ def update_dcpr_request_by_nsif_schema(
         "nsif_recommendation": [ignore_missing, unicode_safe],
         "nsif_review_notes": [ignore_missing, unicode_safe],
         "nsif_review_additional_documents": [ignore_missing, unicode_safe],
+        "version": [ignore_missing, is_positive_integer],
     }
 
 
 @validator_args
 def update_dcpr_request_by_csi_schema(
     ignore_missing,
+    is_positive_integer,
     not_empty,
     not_missing,
     unicode_safe,
@@ -98,6 +154,7 @@ def update_dcpr_request_by_csi_schema(
         "csi_reference_id": [not_missing, not_empty, unicode_safe],
         "csi_moderation_notes": [ignore_missing, unicode_safe],
         "csi_review_additional_documents": [ignore_missing, unicode_safe],
+        "version": [ignore_missing, is_positive_integer],
     }
 
 
@@ -108,6 +165,8 @@ def dcpr_request_submit_schema():
 
 @validator_args
 def moderate_dcpr_request_schema(
+    ignore_missing,
+    is_positive_integer,
     not_missing,
     not_empty,
     dcpr_moderation_choices_validator,
@@ -118,6 +177,7 @@ def moderate_dcpr_request_schema(
         not_empty,
         dcpr_moderation_choices_validator,
     ]
+    result["version"] = [ignore_missing, is_positive_integer]
     return result
 
 
@@ -126,6 +186,25 @@ def delete_dcpr_request_schema():
     return show_dcpr_request_schema()
 
 
+@validator_args
+def bulk_moderate_dcpr_request_schema(
+    convert_to_list_if_string,
+    dcpr_moderation_choices_validator,
+    list_of_strings,
+    not_empty,
+    not_missing,
+):
+    return {
+        "csi_reference_ids": [
+            not_missing,
+            not_empty,
+            convert_to_list_if_string,
+            list_of_strings,
+        ],
+        "action": [not_missing, not_empty, dcpr_moderation_choices_validator],
+    }
+
+
 @validator_args
 def create_dcpr_request_dataset_schema(
     ignore,
@@ -150,6 +229,14 @@ def create_dcpr_request_dataset_schema(
     }
 
 
+@validator_args
+def update_dcpr_request_dataset_schema(ignore_empty, unicode_safe):
+    result = create_dcpr_request_dataset_schema()
+    # existing datasets are identified by their id, datasets without one are new
+    result["dataset_id"] = [ignore_empty, unicode_safe]
+    return result
+
+
 @validator_args
 def claim_reviewer_schema():
     return show_dcpr_request_schema()
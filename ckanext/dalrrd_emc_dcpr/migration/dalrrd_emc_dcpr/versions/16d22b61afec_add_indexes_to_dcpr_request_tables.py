@@ -0,0 +1,53 @@
+"""add-indexes-to-dcpr-request-tables
+
+Revision ID: 16d22b61afec
+Revises: e996e739c44c
+Create Date: 2026-10-18 10:12:41.503113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "16d22b61afec"
+down_revision = "e996e739c44c"
+branch_labels = None
+depends_on = None
+
+_TABLE_NAME = "dcpr_request"
+_DATASET_TABLE_NAME = "dcpr_request_dataset"
+
+
+def upgrade():
+    # matches the default ordering of DCPR request lists, which are also filtered
+    # by status
+    op.create_index(
+        f"ix_{_TABLE_NAME}_status_ordering",
+        _TABLE_NAME,
+        [
+            "status",
+            "submission_date",
+            "nsif_review_date",
+            "csi_moderation_date",
+            "proposed_project_name",
+        ],
+    )
+    op.create_index(f"ix_{_TABLE_NAME}_owner_user", _TABLE_NAME, ["owner_user"])
+    op.create_index(
+        f"ix_{_TABLE_NAME}_organization_id", _TABLE_NAME, ["organization_id"]
+    )
+    op.create_index(
+        f"ix_{_DATASET_TABLE_NAME}_dcpr_request_id",
+        _DATASET_TABLE_NAME,
+        ["dcpr_request_id"],
+    )
+
+
+def downgrade():
+    op.drop_index(
+        f"ix_{_DATASET_TABLE_NAME}_dcpr_request_id", table_name=_DATASET_TABLE_NAME
+    )
+    op.drop_index(f"ix_{_TABLE_NAME}_organization_id", table_name=_TABLE_NAME)
+    op.drop_index(f"ix_{_TABLE_NAME}_owner_user", table_name=_TABLE_NAME)
+    op.drop_index(f"ix_{_TABLE_NAME}_status_ordering", table_name=_TABLE_NAME)
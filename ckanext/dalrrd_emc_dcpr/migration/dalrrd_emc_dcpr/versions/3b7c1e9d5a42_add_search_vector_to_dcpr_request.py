@@ -0,0 +1,56 @@
+"""add-search-vector-to-dcpr-request
+
+Revision ID: 3b7c1e9d5a42
+Revises: 16d22b61afec
+Create Date: 2026-10-18 14:03:27.118406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "3b7c1e9d5a42"
+down_revision = "16d22b61afec"
+branch_labels = None
+depends_on = None
+
+_TABLE_NAME = "dcpr_request"
+_COLUMN_NAME = "search_vector"
+_INDEX_NAME = f"ix_{_TABLE_NAME}_{_COLUMN_NAME}"
+
+
+def upgrade():
+    op.add_column(_TABLE_NAME, sa.Column(_COLUMN_NAME, postgresql.TSVECTOR))
+    op.create_index(_INDEX_NAME, _TABLE_NAME, [_COLUMN_NAME], postgresql_using="gin")
+    # backfill existing rows, this must be kept consistent with
+    # `model.dcpr_request.update_search_vector()`
+    op.execute(
+        f"""
+        UPDATE {_TABLE_NAME} AS r SET {_COLUMN_NAME} =
+            setweight(
+                to_tsvector('english', coalesce(r.proposed_project_name, '')), 'A'
+            )
+            || setweight(to_tsvector('english', coalesce(d.titles, '')), 'B')
+            || setweight(
+                to_tsvector('english', coalesce(r.additional_project_context, '')), 'C'
+            )
+            || setweight(to_tsvector('english', coalesce(d.abstracts, '')), 'C')
+        FROM {_TABLE_NAME} AS r2
+        LEFT JOIN (
+            SELECT
+                dcpr_request_id,
+                string_agg(proposed_dataset_title, ' ') AS titles,
+                string_agg(proposed_abstract, ' ') AS abstracts
+            FROM dcpr_request_dataset
+            GROUP BY dcpr_request_id
+        ) AS d ON d.dcpr_request_id = r2.csi_reference_id
+        WHERE r2.csi_reference_id = r.csi_reference_id
+        """
+    )
+
+
+def downgrade():
+    op.drop_index(_INDEX_NAME, table_name=_TABLE_NAME)
+    op.drop_column(_TABLE_NAME, _COLUMN_NAME)
@@ -0,0 +1,30 @@
+"""add-version-to-dcpr-request
+
+Revision ID: 5c2e9b1f7a34
+Revises: 8e4f0a7c2d19
+Create Date: 2026-10-18 17:41:52.630914
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "5c2e9b1f7a34"
+down_revision = "8e4f0a7c2d19"
+branch_labels = None
+depends_on = None
+
+_TABLE_NAME = "dcpr_request"
+_COLUMN_NAME = "version"
+
+
+def upgrade():
+    op.add_column(
+        _TABLE_NAME,
+        sa.Column(_COLUMN_NAME, sa.Integer, nullable=False, server_default="1"),
+    )
+
+
+def downgrade():
+    op.drop_column(_TABLE_NAME, _COLUMN_NAME)
@@ -0,0 +1,91 @@
+"""add-spatial-extent-geometry-to-dcpr-request
+
+Revision ID: 8e4f0a7c2d19
+Revises: 3b7c1e9d5a42
+Create Date: 2026-10-18 15:21:54.640912
+
+"""
+import json
+import typing
+
+from alembic import op
+import geoalchemy2
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "8e4f0a7c2d19"
+down_revision = "3b7c1e9d5a42"
+branch_labels = None
+depends_on = None
+
+_TABLE_NAME = "dcpr_request"
+_COLUMN_NAME = "spatial_extent_geom"
+_INDEX_NAME = f"ix_{_TABLE_NAME}_{_COLUMN_NAME}"
+_SRID = 4326
+
+
+def upgrade():
+    op.add_column(
+        _TABLE_NAME,
+        sa.Column(
+            _COLUMN_NAME,
+            geoalchemy2.Geometry("POLYGON", srid=_SRID, spatial_index=False),
+        ),
+    )
+    op.create_index(_INDEX_NAME, _TABLE_NAME, [_COLUMN_NAME], postgresql_using="gist")
+    connection = op.get_bind()
+    existing = connection.execute(
+        sa.text(
+            f"SELECT csi_reference_id, spatial_extent FROM {_TABLE_NAME} "
+            f"WHERE spatial_extent IS NOT NULL"
+        )
+    ).fetchall()
+    update_statement = sa.text(
+        f"UPDATE {_TABLE_NAME} SET {_COLUMN_NAME} = "
+        f"ST_MakeEnvelope(:min_lon, :min_lat, :max_lon, :max_lat, {_SRID}) "
+        f"WHERE csi_reference_id = :csi_reference_id"
+    )
+    for csi_reference_id, spatial_extent in existing:
+        bbox = _parse_spatial_extent(spatial_extent)
+        if bbox is not None:
+            connection.execute(
+                update_statement,
+                csi_reference_id=csi_reference_id,
+                **dict(zip(("min_lon", "min_lat", "max_lon", "max_lat"), bbox)),
+            )
+
+
+def downgrade():
+    op.drop_index(_INDEX_NAME, table_name=_TABLE_NAME)
+    op.drop_column(_TABLE_NAME, _COLUMN_NAME)
+
+
+def _parse_spatial_extent(
+    spatial_extent: str,
+) -> typing.Optional[typing.Tuple[float, float, float, float]]:
+    # this is a frozen copy of `dcpr_dictization.parse_spatial_extent()`, in order
+    # to keep the migration independent of later changes to the application code
+    try:
+        coords = json.loads(spatial_extent)["coordinates"][0]
+        result = (
+            min(c[0] for c in coords),
+            min(c[1] for c in coords),
+            max(c[0] for c in coords),
+            max(c[1] for c in coords),
+        )
+    except (ValueError, KeyError, IndexError, TypeError):
+        try:
+            upper_lat, left_lon, lower_lat, right_lon = (
+                float(i) for i in spatial_extent.split(",")
+            )
+        except ValueError:
+            result = None
+        else:
+            result = (
+                min(left_lon, right_lon),
+                min(lower_lat, upper_lat),
+                max(left_lon, right_lon),
+                max(lower_lat, upper_lat),
+            )
+    return result
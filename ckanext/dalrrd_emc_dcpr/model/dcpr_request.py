@@ -6,7 +6,9 @@ from logging import getLogger
 
 log = getLogger(__name__)
 
-from sqlalchemy import orm, types, Column, Table, ForeignKey
+import geoalchemy2
+from sqlalchemy import func, orm, select, types, Column, Index, Table, ForeignKey
+from sqlalchemy.dialects import postgresql
 
 from ckan import model
 
@@ -63,6 +65,29 @@ dcpr_request_table = Table(
     Column("csi_moderation_notes", types.UnicodeText),
     Column("csi_moderation_additional_documents", types.UnicodeText),
     Column("csi_moderation_date", types.DateTime),
+    Column("search_vector", postgresql.TSVECTOR),
+    # used for optimistic concurrency control, see the mapper below
+    Column("version", types.Integer, nullable=False, server_default="1"),
+    Column(
+        "spatial_extent_geom",
+        geoalchemy2.Geometry("POLYGON", srid=4326, spatial_index=False),
+    ),
+    Index(
+        "ix_dcpr_request_status_ordering",
+        "status",
+        "submission_date",
+        "nsif_review_date",
+        "csi_moderation_date",
+        "proposed_project_name",
+    ),
+    Index("ix_dcpr_request_owner_user", "owner_user"),
+    Index("ix_dcpr_request_organization_id", "organization_id"),
+    Index("ix_dcpr_request_search_vector", "search_vector", postgresql_using="gin"),
+    Index(
+        "ix_dcpr_request_spatial_extent_geom",
+        "spatial_extent_geom",
+        postgresql_using="gist",
+    ),
 )
 
 dcpr_request_dataset_table = Table(
@@ -83,6 +108,7 @@ dcpr_request_dataset_table = Table(
     Column("data_usage_restrictions", types.UnicodeText),
     Column("capture_method", types.UnicodeText),
     Column("capture_method_detail", types.UnicodeText),
+    Index("ix_dcpr_request_dataset_dcpr_request_id", "dcpr_request_id"),
 )
 
 dcpr_request_notification_table = Table(
@@ -162,6 +188,51 @@ dcpr_geospatial_request_notification_table = Table(
 )
 
 
+SEARCH_CONFIGURATION = "english"
+SPATIAL_EXTENT_SRID = 4326
+
+
+def update_search_vector(session, csi_reference_id: str) -> None:
+    """Recompute the full-text search vector of a DCPR request
+
+    The search vector is made up of the request's project name and context and of
+    the titles and abstracts of its datasets, weighted in that order of relevance.
+    It must be updated whenever any of these change, which includes changes to the
+    request's datasets.
+
+    """
+
+    datasets = dcpr_request_dataset_table.c
+    requests = dcpr_request_table.c
+    dataset_texts = {}
+    for column in (datasets.proposed_dataset_title, datasets.proposed_abstract):
+        dataset_texts[column.name] = (
+            select([func.string_agg(column, " ")])
+            .where(datasets.dcpr_request_id == requests.csi_reference_id)
+            .as_scalar()
+        )
+    weighted_texts = (
+        (requests.proposed_project_name, "A"),
+        (dataset_texts["proposed_dataset_title"], "B"),
+        (requests.additional_project_context, "C"),
+        (dataset_texts["proposed_abstract"], "C"),
+    )
+    vectors = [
+        func.setweight(
+            func.to_tsvector(SEARCH_CONFIGURATION, func.coalesce(text, "")), weight
+        )
+        for text, weight in weighted_texts
+    ]
+    search_vector = vectors[0]
+    for vector in vectors[1:]:
+        search_vector = search_vector.op("||")(vector)
+    session.execute(
+        dcpr_request_table.update()
+        .where(requests.csi_reference_id == csi_reference_id)
+        .values(search_vector=search_vector)
+    )
+
+
 class DCPRRequestOrganizationLevel(enum.Enum):
     NATIONAL = "National"
     PROVINCIAL = "Provincial"
@@ -314,6 +385,9 @@ model.meta.mapper(
             foreign_keys=dcpr_request_table.c.csi_moderator,
         ),
     },
+    # updates only succeed if the request has not been modified since it was loaded,
+    # otherwise SQLAlchemy raises `orm.exc.StaleDataError`
+    version_id_col=dcpr_request_table.c.version,
 )
 model.meta.mapper(DCPRRequestNotificationTarget, dcpr_request_notification_table)
 model.meta.mapper(
@@ -1,3 +1,4 @@
+import json
 import logging
 import typing
 from collections import OrderedDict
@@ -13,24 +14,29 @@ import dateutil.parser
 from ckan import model
 from ckan.common import _, g
 from flask import Blueprint
+from shapely import geometry
 from sqlalchemy import orm
 
 from ckanext.harvest.utils import DATASET_TYPE_NAME as HARVEST_DATASET_TYPE_NAME
 
 from .. import (
+    caching,
     constants,
+    get_app,
     helpers,
 )
 from ..blueprints.dcpr import dcpr_blueprint
 from ..blueprints.emc import emc_blueprint
 from ..cli import commands
 from ..cli.legacy_sasdi import commands as legacy_sasdi_commands
+from ..logic.action import register_management_activity_types
 from ..logic.action import ckan as ckan_actions
 from ..logic.action.dcpr import create as dcpr_create_actions
 from ..logic.action.dcpr import delete as dcpr_delete_actions
 from ..logic.action.dcpr import get as dcpr_get_actions
 from ..logic.action.dcpr import update as dcpr_update_actions
 from ..logic.action import emc as emc_actions
+from ..logic.action import pages as ckanext_pages_actions
 from ..logic import (
     converters,
     validators,
@@ -43,6 +49,11 @@ from ..model.user_extra_fields import UserExtraFields
 
 logger = logging.getLogger(__name__)
 
+_GLOBAL_FACETS_SNAPSHOT_CONFIG_KEY = "ckan.dalrrd_emc_dcpr.global_facets_snapshot"
+_GLOBAL_FACETS_SNAPSHOT_TTL_CONFIG_KEY = (
+    "ckan.dalrrd_emc_dcpr.global_facets_snapshot_ttl"
+)
+
 
 class DalrrdEmcDcprPlugin(plugins.SingletonPlugin, toolkit.DefaultDatasetForm):
     plugins.implements(plugins.IActions)
@@ -56,6 +67,17 @@ class DalrrdEmcDcprPlugin(plugins.SingletonPlugin, toolkit.DefaultDatasetForm):
     plugins.implements(plugins.IBlueprint)
     plugins.implements(plugins.IFacets)
     plugins.implements(plugins.IPluginObserver)
+    plugins.implements(plugins.IForkObserver)
+
+    def before_fork(self):
+        """Build the CKAN app before the jobs worker forks the process that runs a job
+
+        CKAN's jobs worker runs each job in a new forked process. Building the app in
+        the parent process lets every job inherit it, instead of building it again.
+
+        """
+
+        get_app()
 
     def before_load(self, plugin_class):
         """IPluginObserver interface requires reimplementation of this method."""
@@ -71,11 +93,21 @@ class DalrrdEmcDcprPlugin(plugins.SingletonPlugin, toolkit.DefaultDatasetForm):
         we have to modify CKAN's User model in order to make the relationship work. We
         do that in this function.
 
+        It also registers our custom activity types, so that activities of these
+        types can be created.
+
         """
 
         model.User.extra_fields = orm.relationship(
             UserExtraFields, back_populates="user", uselist=False
         )
+        # the relaxed activity schemas are only built when they are first needed, as
+        # other plugins may not have registered their validators yet
+        register_management_activity_types(constants.DcprManagementActivityType)
+        register_management_activity_types(
+            constants.DatasetManagementActivityType,
+            object_id_validators=["package_id_exists"],
+        )
 
     def before_unload(self, plugin_class):
         """IPluginObserver interface requires reimplementation of this method."""
@@ -86,77 +118,31 @@ class DalrrdEmcDcprPlugin(plugins.SingletonPlugin, toolkit.DefaultDatasetForm):
         pass
 
     def after_create(self, context, pkg_dict):
-        """IPackageController interface requires reimplementation of this method."""
+        """Invalidate the cached datasets that are shown on the homepage"""
+        helpers.invalidate_homepage_datasets_cache()
         return context, pkg_dict
 
     def after_delete(self, context, pkg_dict):
-        """IPackageController interface requires reimplementation of this method."""
+        """Invalidate the cached datasets that are shown on the homepage"""
+        helpers.invalidate_homepage_datasets_cache()
         return context, pkg_dict
 
     def after_search(self, search_results, search_params):
-        """IPackageController interface requires reimplementation of this method."""
+        """Adjust the facets of the search results
 
-        context = {}
-        facets = OrderedDict()
-        default_facet_titles = {
-            "groups": _("Groups"),
-            "tags": _("Tags"),
-        }
-
-        for facet in h.facets():
-            if facet in default_facet_titles:
-                facets[facet] = default_facet_titles[facet]
-            else:
-                facets[facet] = facet
-
-        # Facet titles
-        for plugin in plugins.PluginImplementations(plugins.IFacets):
-            facets = plugin.dataset_facets(facets, "dataset")
-
-        data_dict = {
-            "fq": "",
-            "facet.field": list(facets.keys()),
-        }
+        By default the facets that are returned together with the search results are
+        used as-is, which means their counts reflect the user's current filters and
+        no additional query needs to be sent to Solr.
 
-        if not getattr(g, "user", None):
-            data_dict["fq"] = "+capacity:public " + data_dict["fq"]
+        When the `ckan.dalrrd_emc_dcpr.global_facets_snapshot` setting is enabled,
+        facet counts are instead taken from a snapshot of the whole catalogue, which
+        is cached for `ckan.dalrrd_emc_dcpr.global_facets_snapshot_ttl` seconds.
 
-        query = search.query_for(model.Package)
-        query.run(data_dict, permission_labels=None)
-
-        facets = query.facets
-
-        # organizations in the current search's facets.
-        group_names = []
-        for field_name in ("groups", "organization"):
-            group_names.extend(facets.get(field_name, {}).keys())
-
-        groups = (
-            model.Session.query(model.Group.name, model.Group.title)
-            .filter(model.Group.name.in_(group_names))
-            .all()
-            if group_names
-            else []
-        )
-        group_titles_by_name = dict(groups)
-
-        restructured_facets = {}
-        for key, value in facets.items():
-            restructured_facets[key] = {"title": key, "items": []}
-            for key_, value_ in value.items():
-                new_facet_dict = {"name": key_}
-                if key in ("groups", "organization"):
-                    display_name = group_titles_by_name.get(key_, key_)
-                    display_name = (
-                        display_name if display_name and display_name.strip() else key_
-                    )
-                    new_facet_dict["display_name"] = display_name
-                else:
-                    new_facet_dict["display_name"] = key_
-                new_facet_dict["count"] = value_
-                restructured_facets[key]["items"].append(new_facet_dict)
-        search_results["search_facets"] = restructured_facets
+        """
 
+        if toolkit.asbool(toolkit.config.get(_GLOBAL_FACETS_SNAPSHOT_CONFIG_KEY)):
+            facets = _get_global_facets_snapshot(anonymous=not getattr(g, "user", None))
+            search_results["search_facets"] = _restructure_facets(facets)
         return search_results
 
     def after_show(self, context, pkg_dict):
@@ -164,11 +150,34 @@ class DalrrdEmcDcprPlugin(plugins.SingletonPlugin, toolkit.DefaultDatasetForm):
         return context, pkg_dict
 
     def after_update(self, context, pkg_dict):
-        """IPackageController interface requires reimplementation of this method."""
+        """Invalidate the cached datasets that are shown on the homepage"""
+        helpers.invalidate_homepage_datasets_cache()
         return context, pkg_dict
 
     def before_index(self, pkg_dict):
-        """IPackageController interface requires reimplementation of this method."""
+        """Add fields that make temporal and spatial filtering cheap at query time
+
+        - `reference_date` is normalized into a Solr datetime and is also split into
+          the numeric `reference_date_year` and `reference_date_decade` fields, which
+          can be used for range filters and for facets such as datasets per year;
+        - the bounds of the dataset's `spatial` extra are stored in the numeric
+          `minx`, `miny`, `maxx` and `maxy` fields. These are the same fields that
+          ckanext-spatial uses with its `solr` search backend, so they are only
+          added if they have not been set already.
+
+        """
+
+        reference_date = _parse_reference_date(pkg_dict.get("reference_date"))
+        if reference_date is not None:
+            pkg_dict["reference_date"] = _to_solr_date(reference_date)
+            pkg_dict["reference_date_year"] = reference_date.year
+            pkg_dict["reference_date_decade"] = reference_date.year // 10 * 10
+        bounds = _get_spatial_bounds(
+            pkg_dict.get("spatial") or pkg_dict.get("extras_spatial")
+        )
+        if bounds is not None:
+            for key, value in zip(("minx", "miny", "maxx", "maxy"), bounds):
+                pkg_dict.setdefault(key, value)
         return pkg_dict
 
     def before_search(self, search_params: typing.Dict):
@@ -207,6 +216,10 @@ class DalrrdEmcDcprPlugin(plugins.SingletonPlugin, toolkit.DefaultDatasetForm):
         toolkit.add_template_directory(config_, "../templates")
         toolkit.add_public_directory(config_, "../public")
         toolkit.add_resource("../assets", "ckanext-dalrrdemcdcpr")
+        # values that do not change during the lifetime of the process are resolved
+        # once here, so that templates can render them without further work
+        caching.reset_static_values()
+        emc_actions.show_version()
 
     def get_commands(self):
         return [
@@ -216,7 +229,7 @@ class DalrrdEmcDcprPlugin(plugins.SingletonPlugin, toolkit.DefaultDatasetForm):
         ]
 
     def get_auth_functions(self) -> typing.Dict[str, typing.Callable]:
-        return {
+        result = {
             "package_publish": ckan_auth.authorize_package_publish,
             "package_update": ckan_auth.package_update,
             "package_patch": ckan_auth.package_patch,
@@ -232,6 +245,8 @@ class DalrrdEmcDcprPlugin(plugins.SingletonPlugin, toolkit.DefaultDatasetForm):
             "dcpr_request_list_pending_nsif_auth": (
                 dcpr_auth.dcpr_request_list_pending_nsif_auth
             ),
+            "dcpr_request_search_auth": dcpr_auth.dcpr_request_search_auth,
+            "dcpr_request_stats_auth": dcpr_auth.dcpr_request_stats_auth,
             "dcpr_request_show_auth": dcpr_auth.dcpr_request_show_auth,
             "dcpr_request_update_by_owner_auth": dcpr_auth.dcpr_request_update_by_owner_auth,
             "dcpr_request_update_by_nsif_auth": dcpr_auth.dcpr_request_update_by_nsif_auth,
@@ -243,10 +258,9 @@ class DalrrdEmcDcprPlugin(plugins.SingletonPlugin, toolkit.DefaultDatasetForm):
             "dcpr_request_resign_csi_reviewer_auth": dcpr_auth.dcpr_request_resign_csi_reviewer_auth,
             "dcpr_request_nsif_moderate_auth": dcpr_auth.dcpr_request_nsif_moderate_auth,
             "dcpr_request_csi_moderate_auth": dcpr_auth.dcpr_request_csi_moderate_auth,
+            "dcpr_request_nsif_moderate_bulk_auth": dcpr_auth.dcpr_request_nsif_moderate_bulk_auth,
+            "dcpr_request_csi_moderate_bulk_auth": dcpr_auth.dcpr_request_csi_moderate_bulk_auth,
             "dcpr_request_delete_auth": dcpr_auth.dcpr_request_delete_auth,
-            "ckanext_pages_update": ckanext_pages_auth.authorize_edit_page,
-            "ckanext_pages_delete": ckanext_pages_auth.authorize_delete_page,
-            "ckanext_pages_show": ckanext_pages_auth.authorize_show_page,
             "emc_request_dataset_maintenance": (
                 emc_auth.authorize_request_dataset_maintenance
             ),
@@ -254,9 +268,18 @@ class DalrrdEmcDcprPlugin(plugins.SingletonPlugin, toolkit.DefaultDatasetForm):
                 emc_auth.authorize_request_dataset_publication
             ),
         }
+        if plugins.plugin_loaded("pages"):
+            result.update(
+                {
+                    "ckanext_pages_update": ckanext_pages_auth.authorize_edit_page,
+                    "ckanext_pages_delete": ckanext_pages_auth.authorize_delete_page,
+                    "ckanext_pages_show": ckanext_pages_auth.authorize_show_page,
+                }
+            )
+        return result
 
     def get_actions(self) -> typing.Dict[str, typing.Callable]:
-        return {
+        result = {
             "package_create": ckan_actions.package_create,
             "package_update": ckan_actions.package_update,
             "package_patch": ckan_actions.package_patch,
@@ -274,7 +297,12 @@ class DalrrdEmcDcprPlugin(plugins.SingletonPlugin, toolkit.DefaultDatasetForm):
             "dcpr_request_list_awaiting_nsif_moderation": (
                 dcpr_get_actions.dcpr_request_list_awaiting_nsif_moderation
             ),
+            "dcpr_request_search": dcpr_get_actions.dcpr_request_search,
+            "dcpr_request_spatial_search": (
+                dcpr_get_actions.dcpr_request_spatial_search
+            ),
             "dcpr_request_show": dcpr_get_actions.dcpr_request_show,
+            "dcpr_request_stats": dcpr_get_actions.dcpr_request_stats,
             "dcpr_request_update_by_owner": dcpr_update_actions.dcpr_request_update_by_owner,
             "dcpr_request_submit": dcpr_update_actions.dcpr_request_submit,
             "dcpr_request_update_by_nsif": dcpr_update_actions.dcpr_request_update_by_nsif,
@@ -285,6 +313,8 @@ class DalrrdEmcDcprPlugin(plugins.SingletonPlugin, toolkit.DefaultDatasetForm):
             "resign_dcpr_request_csi_reviewer": dcpr_update_actions.resign_dcpr_request_csi_reviewer,
             "dcpr_request_nsif_moderate": dcpr_update_actions.dcpr_request_nsif_moderate,
             "dcpr_request_csi_moderate": dcpr_update_actions.dcpr_request_csi_moderate,
+            "dcpr_request_nsif_moderate_bulk": dcpr_update_actions.dcpr_request_nsif_moderate_bulk,
+            "dcpr_request_csi_moderate_bulk": dcpr_update_actions.dcpr_request_csi_moderate_bulk,
             "dcpr_request_delete": dcpr_delete_actions.dcpr_request_delete,
             "emc_version": emc_actions.show_version,
             "emc_request_dataset_maintenance": emc_actions.request_dataset_maintenance,
@@ -293,7 +323,32 @@ class DalrrdEmcDcprPlugin(plugins.SingletonPlugin, toolkit.DefaultDatasetForm):
             "user_update": ckan_actions.user_update,
             "user_create": ckan_actions.user_create,
             "user_show": ckan_actions.user_show,
+            "group_create": ckan_actions.group_create,
+            "group_update": ckan_actions.group_update,
+            "group_delete": ckan_actions.group_delete,
+            "group_purge": ckan_actions.group_purge,
+            "organization_create": ckan_actions.organization_create,
+            "organization_update": ckan_actions.organization_update,
+            "organization_delete": ckan_actions.organization_delete,
+            "organization_purge": ckan_actions.organization_purge,
+            "member_create": ckan_actions.member_create,
+            "member_delete": ckan_actions.member_delete,
+            "tag_create": ckan_actions.tag_create,
+            "tag_delete": ckan_actions.tag_delete,
+            "vocabulary_create": ckan_actions.vocabulary_create,
+            "vocabulary_update": ckan_actions.vocabulary_update,
+            "vocabulary_delete": ckan_actions.vocabulary_delete,
         }
+        # these are chained actions, which CKAN refuses to register without the
+        # original ckanext-pages actions
+        if plugins.plugin_loaded("pages"):
+            result.update(
+                {
+                    "ckanext_pages_update": ckanext_pages_actions.ckanext_pages_update,
+                    "ckanext_pages_delete": ckanext_pages_actions.ckanext_pages_delete,
+                }
+            )
+        return result
 
     def get_validators(self) -> typing.Dict[str, typing.Callable]:
         return {
@@ -331,6 +386,7 @@ class DalrrdEmcDcprPlugin(plugins.SingletonPlugin, toolkit.DefaultDatasetForm):
             "dcpr_get_next_intermediate_dcpr_request_status": helpers.get_next_intermediate_dcpr_status,
             "dcpr_user_is_dcpr_request_owner": helpers.user_is_dcpr_request_owner,
             "emc_org_memberships": helpers.get_org_memberships,
+            "emc_user_has_org_membership": helpers.user_has_org_membership,
             # added by mohab
             "dcpr_requests_approved_by_nsif": helpers.get_dcpr_requests_approved_by_nsif,
         }
@@ -368,14 +424,109 @@ class DalrrdEmcDcprPlugin(plugins.SingletonPlugin, toolkit.DefaultDatasetForm):
         return facets_dict
 
 
+def _get_global_facets_snapshot(anonymous: bool) -> typing.Dict:
+    """Return the facets of the whole catalogue, retrieving them from cache if possible
+
+    Anonymous users and logged in users get separate snapshots, as anonymous users
+    must only see counts of public datasets.
+
+    """
+
+    ttl = toolkit.asint(toolkit.config.get(_GLOBAL_FACETS_SNAPSHOT_TTL_CONFIG_KEY, 600))
+    cache = caching.get_cache(caching.GLOBAL_FACETS_SNAPSHOT_CACHE_NAME)
+    return cache.get_or_set(
+        anonymous, partial(_query_global_facets, anonymous), ttl_seconds=ttl
+    )
+
+
+def _query_global_facets(anonymous: bool) -> typing.Dict:
+    facets = OrderedDict()
+    default_facet_titles = {
+        "groups": _("Groups"),
+        "tags": _("Tags"),
+    }
+    for facet in h.facets():
+        facets[facet] = default_facet_titles.get(facet, facet)
+    for plugin in plugins.PluginImplementations(plugins.IFacets):
+        facets = plugin.dataset_facets(facets, "dataset")
+    data_dict = {
+        "fq": "+capacity:public " if anonymous else "",
+        "facet.field": list(facets.keys()),
+    }
+    query = search.query_for(model.Package)
+    query.run(data_dict, permission_labels=None)
+    return query.facets
+
+
+def _restructure_facets(facets: typing.Dict) -> typing.Dict:
+    """Convert raw Solr facets into the structure used by CKAN's `search_facets`"""
+    group_names = []
+    for field_name in ("groups", "organization"):
+        group_names.extend(facets.get(field_name, {}).keys())
+    group_titles_by_name = helpers.get_group_titles(group_names)
+
+    restructured_facets = {}
+    for key, value in facets.items():
+        restructured_facets[key] = {"title": key, "items": []}
+        for key_, value_ in value.items():
+            new_facet_dict = {"name": key_}
+            if key in ("groups", "organization"):
+                display_name = group_titles_by_name.get(key_, key_)
+                display_name = (
+                    display_name if display_name and display_name.strip() else key_
+                )
+                new_facet_dict["display_name"] = display_name
+            else:
+                new_facet_dict["display_name"] = key_
+            new_facet_dict["count"] = value_
+            restructured_facets[key]["items"].append(new_facet_dict)
+    return restructured_facets
+
+
 def _parse_date(raw_date: str) -> typing.Optional[str]:
     """Parse user-submitted date into a string usable in Solr searches."""
     try:
         parsed_date = dateutil.parser.parse(raw_date, ignoretz=True).replace(
             tzinfo=dt.timezone.utc
         )
-        result = parsed_date.isoformat().replace("+00:00", "Z")
+        result = _to_solr_date(parsed_date)
     except dateutil.parser.ParserError:
         logger.exception("Could not parse date from input string")
         result = None
     return result
+
+
+def _to_solr_date(value: dt.datetime) -> str:
+    return value.isoformat().replace("+00:00", "Z")
+
+
+def _parse_reference_date(raw_date: typing.Any) -> typing.Optional[dt.datetime]:
+    """Parse a dataset's reference date, as stored in the DB, into an UTC datetime"""
+    result = None
+    if isinstance(raw_date, str) and raw_date.strip() != "":
+        try:
+            parsed = dateutil.parser.parse(raw_date)
+        except (ValueError, OverflowError):
+            logger.warning(f"Could not parse reference date {raw_date!r}")
+        else:
+            if parsed.tzinfo is None:
+                result = parsed.replace(tzinfo=dt.timezone.utc)
+            else:
+                result = parsed.astimezone(dt.timezone.utc)
+    return result
+
+
+def _get_spatial_bounds(
+    raw_spatial: typing.Any,
+) -> typing.Optional[typing.Tuple[float, float, float, float]]:
+    """Return the (min lon, min lat, max lon, max lat) bounds of a GeoJSON geometry"""
+    result = None
+    if isinstance(raw_spatial, str) and raw_spatial.strip() != "":
+        try:
+            result = geometry.shape(json.loads(raw_spatial)).bounds
+        except (ValueError, TypeError, KeyError, AttributeError):
+            logger.warning(f"Could not parse spatial extent {raw_spatial!r}")
+            result = None
+        else:
+            result = result if len(result) == 4 else None
+    return result
@@ -2,11 +2,14 @@
 
 import pytest
 import shlex
+import sqlalchemy.event
 import sqlalchemy.exc
 import subprocess
 
 import ckan.model
 
+from ckanext.dalrrd_emc_dcpr import caching
+
 pytest_plugins = (
     "ckan.tests.pytest_ckan.fixtures",
     "ckan.tests.pytest_ckan.ckan_setup",
@@ -43,6 +46,8 @@ def emc_clean_db():
         else:
             session.commit()
     session.flush()
+    # cached values refer to data that has just been deleted
+    caching.invalidate_all()
 
 
 @pytest.fixture
@@ -53,3 +58,23 @@ def emc_create_sasdi_themes(request):
             f"poetry run ckan --config {ckan_ini} dalrrd-emc-dcpr bootstrap create-iso-topic-categories"
         )
     )
+
+
+@pytest.fixture
+def emc_query_counter():
+    """Count the SQL statements that are sent to the DB while the fixture is active
+
+    Use the returned list's length to check how many statements have been executed
+    so far. It can be cleared in order to start counting again.
+
+    """
+
+    statements = []
+
+    def _count(conn, cursor, statement, *args, **kwargs):
+        statements.append(statement)
+
+    engine = ckan.model.meta.engine
+    sqlalchemy.event.listen(engine, "before_cursor_execute", _count)
+    yield statements
+    sqlalchemy.event.remove(engine, "before_cursor_execute", _count)
@@ -1,4 +1,5 @@
 import typing
+from unittest import mock
 
 import pytest
 
@@ -132,6 +133,21 @@ def test_dcpr_request_create_auth():
     assert result is True
 
 
+@pytest.mark.usefixtures("emc_clean_db", "with_plugins", "with_request_context")
+def test_dcpr_request_create_auth_user_without_organization():
+    user = factories.User()
+    factories.Organization()
+    with pytest.raises(toolkit.NotAuthorized):
+        helpers.call_auth(
+            "dcpr_request_create_auth",
+            {
+                "model": model,
+                "user": user["id"],
+                "auth_user_obj": model.User.get(user["id"]),
+            },
+        )
+
+
 @pytest.mark.usefixtures("emc_clean_db", "with_plugins")
 def test_dcpr_request_create_auth_anonymous():
     with pytest.raises(toolkit.NotAuthorized):
@@ -700,6 +716,49 @@ def test_dcpr_request_submit_auth():
     )
 
 
+@pytest.mark.usefixtures("emc_clean_db", "with_plugins", "with_request_context")
+def test_membership_index_is_reused_within_request():
+    org = factories.Organization(name=NSIF_ORG_NAME)
+    user = factories.User()
+    _create_membership(user, org, role="editor")
+    user_obj = model.User.get(user["id"])
+    is_member = toolkit.h["emc_user_is_org_member"]
+    assert is_member(NSIF_ORG_NAME, user_obj)
+    with mock.patch.object(model.Session, "query") as mock_query:
+        assert is_member(org["id"], user_obj, role="editor")
+        assert not is_member(org["id"], user_obj, role="admin")
+        assert not is_member("another-org", user_obj)
+        mock_query.assert_not_called()
+    assert user["id"] in toolkit.h["emc_org_member_list"](NSIF_ORG_NAME, "editor")
+    _create_membership(user, org, role="admin")
+    assert is_member(NSIF_ORG_NAME, user_obj, role="admin")
+
+
+@pytest.mark.usefixtures("emc_clean_db", "with_plugins", "with_request_context")
+def test_dcpr_request_show_loads_request_once_per_request(emc_query_counter):
+    owner_user, *_, dcpr_request_obj = _prepare_dcpr_request_auth_test_items()
+    context = {
+        "model": model,
+        "user": owner_user["name"],
+        "auth_user_obj": model.User.get(owner_user["id"]),
+    }
+    first = helpers.call_action(
+        "dcpr_request_show",
+        context=context.copy(),
+        csi_reference_id=dcpr_request_obj.csi_reference_id,
+    )
+    emc_query_counter.clear()
+    second_context = context.copy()
+    second = helpers.call_action(
+        "dcpr_request_show",
+        context=second_context,
+        csi_reference_id=dcpr_request_obj.csi_reference_id,
+    )
+    assert first == second
+    assert second_context["dcpr_request"] is dcpr_request_obj
+    assert not [s for s in emc_query_counter if "FROM dcpr_request" in s]
+
+
 def _create_membership(
     user: typing.Dict, organization: typing.Dict, role: typing.Optional[str] = "member"
 ):
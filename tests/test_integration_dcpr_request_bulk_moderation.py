@@ -0,0 +1,119 @@
+import typing
+from unittest import mock
+
+import pytest
+
+from ckan import model
+from ckan.plugins import toolkit
+from ckan.tests import factories
+
+from ckanext.dalrrd_emc_dcpr import jobs
+from ckanext.dalrrd_emc_dcpr.constants import (
+    DCPRRequestStatus,
+    DcprManagementActivityType,
+)
+from ckanext.dalrrd_emc_dcpr.model.dcpr_request import DCPRRequest
+
+pytestmark = pytest.mark.integration
+
+
+@pytest.mark.usefixtures("emc_clean_db", "with_plugins", "with_request_context")
+def test_dcpr_request_nsif_moderate_bulk():
+    sysadmin = factories.Sysadmin()
+    ids_by_owner = {}
+    for num_requests in (2, 3):
+        owner_user = factories.User()
+        owner_org = factories.Organization(users=[{"name": owner_user["name"]}])
+        ids_by_owner[owner_user["id"]] = [
+            _create_dcpr_request(owner_user, owner_org)["csi_reference_id"]
+            for _ in range(num_requests)
+        ]
+    ids = [id_ for owner_ids in ids_by_owner.values() for id_ in owner_ids]
+    _set_status(ids, DCPRRequestStatus.UNDER_NSIF_REVIEW)
+    with mock.patch.object(toolkit, "enqueue_job") as mock_enqueue_job:
+        result = toolkit.get_action("dcpr_request_nsif_moderate_bulk")(
+            context={"user": sysadmin["name"]},
+            data_dict={"csi_reference_ids": ids, "action": "APPROVE"},
+        )
+    assert result["count"] == 5
+    for item in result["results"]:
+        assert item["status"] == DCPRRequestStatus.AWAITING_CSI_REVIEW.value
+    for request_obj in model.Session.query(DCPRRequest).filter(
+        DCPRRequest.csi_reference_id.in_(ids)
+    ):
+        assert request_obj.nsif_reviewer == sysadmin["id"]
+        assert request_obj.nsif_review_date is not None
+    activities = (
+        model.Session.query(model.Activity)
+        .filter(
+            model.Activity.object_id.in_(ids),
+            model.Activity.activity_type
+            == DcprManagementActivityType.ACCEPT_DCPR_REQUEST_NSIF.value,
+        )
+        .all()
+    )
+    assert len(activities) == len(ids)
+    activity_ids_by_owner = {}
+    for activity in activities:
+        owner_id = next(
+            owner_id
+            for owner_id, owner_ids in ids_by_owner.items()
+            if activity.object_id in owner_ids
+        )
+        activity_ids_by_owner.setdefault(owner_id, set()).add(activity.id)
+    assert mock_enqueue_job.call_count == len(ids_by_owner)
+    notified_activity_ids = []
+    for call in mock_enqueue_job.call_args_list:
+        assert call.args[0] == jobs.notify_dcpr_actors_of_relevant_status_changes
+        notified_activity_ids.append(set(call.kwargs["args"][0]))
+    assert sorted(notified_activity_ids, key=sorted) == sorted(
+        activity_ids_by_owner.values(), key=sorted
+    )
+
+
+@pytest.mark.usefixtures("emc_clean_db", "with_plugins", "with_request_context")
+def test_dcpr_request_nsif_moderate_bulk_is_all_or_nothing():
+    owner_user = factories.User()
+    owner_org = factories.Organization(users=[{"name": owner_user["name"]}])
+    ids = [
+        _create_dcpr_request(owner_user, owner_org)["csi_reference_id"]
+        for _ in range(2)
+    ]
+    _set_status(ids, DCPRRequestStatus.UNDER_NSIF_REVIEW)
+    with mock.patch.object(toolkit, "enqueue_job") as mock_enqueue_job:
+        with pytest.raises(toolkit.NotAuthorized):
+            toolkit.get_action("dcpr_request_nsif_moderate_bulk")(
+                context={"user": owner_user["name"]},
+                data_dict={"csi_reference_ids": ids, "action": "APPROVE"},
+            )
+    mock_enqueue_job.assert_not_called()
+    statuses = {
+        request_obj.status
+        for request_obj in model.Session.query(DCPRRequest).filter(
+            DCPRRequest.csi_reference_id.in_(ids)
+        )
+    }
+    assert statuses == {DCPRRequestStatus.UNDER_NSIF_REVIEW.value}
+
+
+def _create_dcpr_request(user: typing.Dict, organization: typing.Dict) -> typing.Dict:
+    return toolkit.get_action("dcpr_request_create")(
+        context={"user": user["name"]},
+        data_dict={
+            "proposed_project_name": "test",
+            "capture_start_date": "2022-01-01",
+            "capture_end_date": "2022-01-02",
+            "cost": "200000",
+            "organization_id": organization["id"],
+            "datasets": [
+                {"proposed_dataset_title": "first", "dataset_purpose": "dummy"},
+            ],
+        },
+    )
+
+
+def _set_status(ids: typing.List[str], status: DCPRRequestStatus) -> None:
+    model.Session.query(DCPRRequest).filter(
+        DCPRRequest.csi_reference_id.in_(ids)
+    ).update({"status": status.value}, synchronize_session=False)
+    model.Session.commit()
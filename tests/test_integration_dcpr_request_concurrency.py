@@ -0,0 +1,148 @@
+import threading
+import typing
+
+import pytest
+
+from ckan import model
+from ckan.plugins import toolkit
+from ckan.tests import factories
+
+from ckanext.dalrrd_emc_dcpr.constants import (
+    DcprManagementActivityType,
+    DCPRRequestStatus,
+    NSIF_ORG_NAME,
+)
+from ckanext.dalrrd_emc_dcpr.model.dcpr_request import DCPRRequest
+
+pytestmark = pytest.mark.integration
+
+
+@pytest.mark.usefixtures("emc_clean_db", "with_plugins", "with_request_context")
+def test_concurrent_nsif_reviewer_claims_have_a_single_winner(app):
+    owner_user = factories.User()
+    owner_org = factories.Organization(users=[{"name": owner_user["name"]}])
+    nsif_members = [factories.User() for _ in range(4)]
+    factories.Organization(
+        name=NSIF_ORG_NAME,
+        users=[{"name": m["name"], "capacity": "member"} for m in nsif_members],
+    )
+    csi_reference_id = _create_dcpr_request(owner_user, owner_org)["csi_reference_id"]
+    _set_status(csi_reference_id, DCPRRequestStatus.AWAITING_NSIF_REVIEW)
+    outcomes = _claim_concurrently(
+        app, "claim_dcpr_request_nsif_reviewer", csi_reference_id, nsif_members
+    )
+
+    winners = [user_id for user_id, claimed in outcomes.items() if claimed]
+    assert len(outcomes) == len(nsif_members)
+    assert len(winners) == 1
+    request_obj = model.Session.query(DCPRRequest).get(csi_reference_id)
+    assert request_obj.nsif_reviewer == winners[0]
+    assert request_obj.status == DCPRRequestStatus.UNDER_NSIF_REVIEW.value
+    claim_activity_type = DcprManagementActivityType.BECOME_NSIF_REVIEWER_DCPR_REQUEST
+    claim_activities = (
+        model.Session.query(model.Activity)
+        .filter(model.Activity.object_id == csi_reference_id)
+        .filter(model.Activity.activity_type == claim_activity_type.value)
+        .count()
+    )
+    assert claim_activities == 1
+
+
+@pytest.mark.usefixtures("emc_clean_db", "with_plugins", "with_request_context")
+def test_concurrent_sysadmin_takeovers_have_a_single_winner(app):
+    owner_user = factories.User()
+    owner_org = factories.Organization(users=[{"name": owner_user["name"]}])
+    sysadmins = [factories.Sysadmin() for _ in range(4)]
+    csi_reference_id = _create_dcpr_request(owner_user, owner_org)["csi_reference_id"]
+    _set_status(csi_reference_id, DCPRRequestStatus.UNDER_NSIF_REVIEW)
+    outcomes = _claim_concurrently(
+        app, "claim_dcpr_request_nsif_reviewer", csi_reference_id, sysadmins
+    )
+
+    winners = [user_id for user_id, claimed in outcomes.items() if claimed]
+    assert len(outcomes) == len(sysadmins)
+    assert len(winners) == 1
+    request_obj = model.Session.query(DCPRRequest).get(csi_reference_id)
+    assert request_obj.nsif_reviewer == winners[0]
+    assert request_obj.status == DCPRRequestStatus.UNDER_NSIF_REVIEW.value
+
+
+@pytest.mark.usefixtures("emc_clean_db", "with_plugins", "with_request_context")
+def test_dcpr_request_update_rejects_outdated_version():
+    owner_user = factories.User()
+    owner_org = factories.Organization(users=[{"name": owner_user["name"]}])
+    dcpr_request = _create_dcpr_request(owner_user, owner_org)
+    update_action = toolkit.get_action("dcpr_request_update_by_owner")
+    data_dict = {
+        "csi_reference_id": dcpr_request["csi_reference_id"],
+        "proposed_project_name": "first change",
+        "capture_start_date": dcpr_request["capture_start_date"],
+        "capture_end_date": dcpr_request["capture_end_date"],
+        "version": dcpr_request["version"],
+    }
+    updated = update_action(context={"user": owner_user["name"]}, data_dict=data_dict)
+    assert updated["version"] == dcpr_request["version"] + 1
+    with pytest.raises(toolkit.ValidationError) as exc_info:
+        update_action(
+            context={"user": owner_user["name"]},
+            data_dict={**data_dict, "proposed_project_name": "second change"},
+        )
+    assert "version" in exc_info.value.error_dict
+
+
+def _create_dcpr_request(user: typing.Dict, organization: typing.Dict) -> typing.Dict:
+    return toolkit.get_action("dcpr_request_create")(
+        context={"user": user["name"]},
+        data_dict={
+            "proposed_project_name": "test",
+            "capture_start_date": "2022-01-01",
+            "capture_end_date": "2022-01-02",
+            "cost": "200000",
+            "organization_id": organization["id"],
+            "datasets": [
+                {"proposed_dataset_title": "first", "dataset_purpose": "dummy"},
+            ],
+        },
+    )
+
+
+def _set_status(csi_reference_id: str, status: DCPRRequestStatus) -> None:
+    model.Session.query(DCPRRequest).filter(
+        DCPRRequest.csi_reference_id == csi_reference_id
+    ).update({"status": status.value}, synchronize_session=False)
+    model.Session.commit()
+
+
+def _claim_concurrently(
+    app, claim_action: str, csi_reference_id: str, users: typing.List[typing.Dict]
+) -> typing.Dict[str, bool]:
+    """Have all users call the claim action at the same time
+
+    Returns a mapping of user ids to whether each user has won the claim.
+
+    """
+
+    barrier = threading.Barrier(len(users))
+    outcomes = {}
+
+    def claim(user: typing.Dict):
+        with app.flask_app.test_request_context():
+            barrier.wait()
+            try:
+                toolkit.get_action(claim_action)(
+                    context={"user": user["name"]},
+                    data_dict={"csi_reference_id": csi_reference_id},
+                )
+            except toolkit.NotAuthorized:
+                outcomes[user["id"]] = False
+            else:
+                outcomes[user["id"]] = True
+            finally:
+                model.Session.remove()
+
+    threads = [threading.Thread(target=claim, args=(u,)) for u in users]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return outcomes
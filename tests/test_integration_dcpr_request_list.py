@@ -0,0 +1,97 @@
+import typing
+
+import pytest
+
+from ckan.plugins import toolkit
+from ckan.tests import factories
+
+pytestmark = pytest.mark.integration
+
+
+@pytest.mark.usefixtures("emc_clean_db", "with_plugins", "with_request_context")
+def test_dcpr_request_list_query_count_does_not_depend_on_size(emc_query_counter):
+    owner_user = factories.User()
+    owner_org = factories.Organization(users=[{"name": owner_user["name"]}])
+    queries_per_list_size = {}
+    for list_size in (1, 3, 6):
+        while len(_list_my_dcpr_requests(owner_user)) < list_size:
+            _create_dcpr_request(owner_user, owner_org)
+        emc_query_counter.clear()
+        result = _list_my_dcpr_requests(owner_user)
+        assert len(result) == list_size
+        assert all(r["organization"] == owner_org["name"] for r in result)
+        assert all(r["dataset_count"] == 2 for r in result)
+        queries_per_list_size[list_size] = len(emc_query_counter)
+    assert len(set(queries_per_list_size.values())) == 1
+
+
+@pytest.mark.usefixtures("emc_clean_db", "with_plugins", "with_request_context")
+def test_dcpr_request_list_pagination():
+    owner_user = factories.User()
+    owner_org = factories.Organization(users=[{"name": owner_user["name"]}])
+    created_ids = [
+        _create_dcpr_request(owner_user, owner_org)["csi_reference_id"]
+        for _ in range(5)
+    ]
+    list_action = toolkit.get_action("my_dcpr_request_list")
+    seen_ids = []
+    for page in (1, 2, 3):
+        result = list_action(
+            context={"user": owner_user["name"]},
+            data_dict={"page": page, "limit": 2, "sort": "request_date desc"},
+        )
+        assert result["count"] == 5
+        assert len(result["results"]) == (2 if page < 3 else 1)
+        seen_ids.extend(r["csi_reference_id"] for r in result["results"])
+    assert sorted(seen_ids) == sorted(created_ids)
+
+
+@pytest.mark.usefixtures("emc_clean_db", "with_plugins", "with_request_context")
+@pytest.mark.parametrize(
+    "all_fields, expected_present, expected_absent",
+    [
+        pytest.param(False, "dataset_count", "datasets", id="summary"),
+        pytest.param(True, "datasets", "dataset_count", id="all-fields"),
+    ],
+)
+def test_dcpr_request_list_detail(all_fields, expected_present, expected_absent):
+    owner_user = factories.User()
+    owner_org = factories.Organization(users=[{"name": owner_user["name"]}])
+    _create_dcpr_request(owner_user, owner_org)
+    result = _list_my_dcpr_requests(owner_user, {"all_fields": all_fields})
+    assert len(result) == 1
+    assert expected_present in result[0]
+    assert expected_absent not in result[0]
+
+
+@pytest.mark.usefixtures("emc_clean_db", "with_plugins", "with_request_context")
+def test_dcpr_request_list_rejects_invalid_sort():
+    owner_user = factories.User()
+    with pytest.raises(toolkit.ValidationError):
+        _list_my_dcpr_requests(owner_user, {"sort": "cost; drop table"})
+
+
+def _list_my_dcpr_requests(
+    user: typing.Dict, data_dict: typing.Optional[typing.Dict] = None
+) -> typing.List[typing.Dict]:
+    return toolkit.get_action("my_dcpr_request_list")(
+        context={"user": user["name"], "dictize_for_ui": True},
+        data_dict=data_dict or {},
+    )["results"]
+
+
+def _create_dcpr_request(user: typing.Dict, organization: typing.Dict) -> typing.Dict:
+    return toolkit.get_action("dcpr_request_create")(
+        context={"user": user["name"]},
+        data_dict={
+            "proposed_project_name": "test",
+            "capture_start_date": "2022-01-01",
+            "capture_end_date": "2022-01-02",
+            "cost": "200000",
+            "organization_id": organization["id"],
+            "datasets": [
+                {"proposed_dataset_title": "first", "dataset_purpose": "dummy"},
+                {"proposed_dataset_title": "second", "dataset_purpose": "dummy"},
+            ],
+        },
+    )
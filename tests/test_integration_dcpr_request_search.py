@@ -0,0 +1,165 @@
+import typing
+
+import pytest
+
+from ckan import model
+from ckan.plugins import toolkit
+from ckan.tests import factories
+
+from ckanext.dalrrd_emc_dcpr.constants import DCPRRequestStatus
+from ckanext.dalrrd_emc_dcpr.model import dcpr_request
+
+pytestmark = pytest.mark.integration
+
+
+@pytest.mark.usefixtures("emc_clean_db", "with_plugins", "with_request_context")
+@pytest.mark.parametrize(
+    "data_dict, expected_names",
+    [
+        pytest.param({}, ["roads", "rivers", "schools"], id="no-filter"),
+        pytest.param({"q": "river"}, ["rivers"], id="project-name"),
+        pytest.param({"q": "bridges"}, ["roads"], id="dataset-title"),
+        pytest.param({"q": "classrooms"}, ["schools"], id="dataset-abstract"),
+        pytest.param({"q": "volcanoes"}, [], id="no-match"),
+        pytest.param(
+            {"data_capture_urgency": "High"}, ["roads", "rivers"], id="urgency"
+        ),
+        pytest.param(
+            {"capture_start_date": "2022-06-01", "capture_end_date": "2022-06-30"},
+            ["schools"],
+            id="capture-date-range",
+        ),
+    ],
+)
+def test_dcpr_request_search(data_dict, expected_names):
+    owner_user = factories.User()
+    owner_org = factories.Organization(users=[{"name": owner_user["name"]}])
+    _create_dcpr_request(
+        owner_user,
+        owner_org,
+        "roads",
+        [{"proposed_dataset_title": "bridges", "proposed_abstract": "crossings"}],
+    )
+    _create_dcpr_request(
+        owner_user,
+        owner_org,
+        "rivers",
+        [{"proposed_dataset_title": "gauges", "proposed_abstract": "flows"}],
+    )
+    _create_dcpr_request(
+        owner_user,
+        owner_org,
+        "schools",
+        [{"proposed_dataset_title": "buildings", "proposed_abstract": "classrooms"}],
+        urgency="Low",
+        capture_dates=("2022-06-10", "2022-07-10"),
+    )
+    result = toolkit.get_action("dcpr_request_search")(
+        context={"user": owner_user["name"]}, data_dict=data_dict
+    )
+    assert result["count"] == len(expected_names)
+    assert sorted(r["proposed_project_name"] for r in result["results"]) == sorted(
+        expected_names
+    )
+
+
+@pytest.mark.usefixtures("emc_clean_db", "with_plugins", "with_request_context")
+def test_dcpr_request_search_hides_requests_under_preparation():
+    owner_user = factories.User()
+    owner_org = factories.Organization(users=[{"name": owner_user["name"]}])
+    _create_dcpr_request(owner_user, owner_org, "roads", [])
+    other_user = factories.User()
+    sysadmin = factories.Sysadmin()
+    search_action = toolkit.get_action("dcpr_request_search")
+    other_user_result = search_action(context={"user": other_user["name"]})
+    sysadmin_result = search_action(context={"user": sysadmin["name"]})
+    assert other_user_result["count"] == 0
+    assert sysadmin_result["count"] == 1
+
+
+@pytest.mark.usefixtures("emc_clean_db", "with_plugins", "with_request_context")
+@pytest.mark.parametrize(
+    "bbox, relation, expected_names",
+    [
+        pytest.param("-20, 10, -30, 20", "intersects", ["west", "centre"], id="west"),
+        pytest.param("-20, 10, -30, 40", "within", ["west", "east"], id="within"),
+        pytest.param("-40, 50, -50, 60", "intersects", [], id="no-match"),
+    ],
+)
+def test_dcpr_request_spatial_search(bbox, relation, expected_names):
+    owner_user = factories.User()
+    owner_org = factories.Organization(users=[{"name": owner_user["name"]}])
+    for name, spatial_extent in (
+        ("west", "-22, 12, -28, 18"),
+        ("centre", "-22, 18, -28, 45"),
+        ("east", "-22, 30, -28, 38"),
+    ):
+        _create_dcpr_request(
+            owner_user, owner_org, name, [], spatial_extent=spatial_extent
+        )
+    result = toolkit.get_action("dcpr_request_spatial_search")(
+        context={"user": owner_user["name"]},
+        data_dict={"bbox": bbox, "relation": relation},
+    )
+    assert sorted(r["proposed_project_name"] for r in result["results"]) == sorted(
+        expected_names
+    )
+
+
+@pytest.mark.usefixtures("emc_clean_db", "with_plugins", "with_request_context")
+def test_dcpr_request_submit_reports_overlapping_accepted_requests():
+    owner_user = factories.User()
+    owner_org = factories.Organization(users=[{"name": owner_user["name"]}])
+    accepted = _create_dcpr_request(
+        owner_user, owner_org, "accepted", [], spatial_extent="-22, 16, -35, 33"
+    )
+    model.Session.query(dcpr_request.DCPRRequest).filter_by(
+        csi_reference_id=accepted["csi_reference_id"]
+    ).update({"status": DCPRRequestStatus.ACCEPTED.value})
+    model.Session.commit()
+    elsewhere = _create_dcpr_request(
+        owner_user, owner_org, "elsewhere", [], spatial_extent="10, 0, 0, 10"
+    )
+    overlapping = _create_dcpr_request(
+        owner_user, owner_org, "overlapping", [], spatial_extent="-30, 20, -40, 25"
+    )
+    submit_action = toolkit.get_action("dcpr_request_submit")
+    elsewhere_result = submit_action(
+        context={"user": owner_user["name"]},
+        data_dict={"csi_reference_id": elsewhere["csi_reference_id"]},
+    )
+    overlapping_result = submit_action(
+        context={"user": owner_user["name"]},
+        data_dict={"csi_reference_id": overlapping["csi_reference_id"]},
+    )
+    assert elsewhere_result["overlapping_accepted_requests"] == []
+    assert overlapping_result["overlapping_accepted_requests"] == [
+        accepted["csi_reference_id"]
+    ]
+
+
+def _create_dcpr_request(
+    user: typing.Dict,
+    organization: typing.Dict,
+    name: str,
+    datasets: typing.List[typing.Dict],
+    urgency: str = "High",
+    capture_dates: typing.Tuple[str, str] = ("2022-01-01", "2022-01-02"),
+    spatial_extent: typing.Optional[str] = None,
+) -> typing.Dict:
+    optional_fields = {}
+    if spatial_extent is not None:
+        optional_fields["spatial_extent"] = spatial_extent
+    return toolkit.get_action("dcpr_request_create")(
+        context={"user": user["name"]},
+        data_dict={
+            "proposed_project_name": name,
+            "capture_start_date": capture_dates[0],
+            "capture_end_date": capture_dates[1],
+            "cost": "200000",
+            "data_capture_urgency": urgency,
+            "organization_id": organization["id"],
+            "datasets": [{"dataset_purpose": "dummy", **ds} for ds in datasets],
+            **optional_fields,
+        },
+    )
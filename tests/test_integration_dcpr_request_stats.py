@@ -0,0 +1,109 @@
+import datetime as dt
+import typing
+from unittest import mock
+
+import pytest
+
+from ckan import model
+from ckan.plugins import toolkit
+from ckan.tests import factories
+
+from ckanext.dalrrd_emc_dcpr.constants import DCPRRequestStatus
+from ckanext.dalrrd_emc_dcpr.model import dcpr_request
+
+pytestmark = pytest.mark.integration
+
+
+@pytest.mark.usefixtures("emc_clean_db", "with_plugins", "with_request_context")
+def test_dcpr_request_stats():
+    owner_user = factories.User()
+    owner_org = factories.Organization(users=[{"name": owner_user["name"]}])
+    for urgency, status in (
+        ("High", DCPRRequestStatus.UNDER_PREPARATION),
+        ("High", DCPRRequestStatus.AWAITING_CSI_REVIEW),
+        ("Low", DCPRRequestStatus.AWAITING_CSI_REVIEW),
+        ("Low", DCPRRequestStatus.AWAITING_CSI_REVIEW),
+    ):
+        created = _create_dcpr_request(owner_user, owner_org, urgency)
+        model.Session.query(dcpr_request.DCPRRequest).filter_by(
+            csi_reference_id=created["csi_reference_id"]
+        ).update({"status": status.value, "request_date": dt.datetime(2022, 2, 15)})
+    model.Session.commit()
+    sysadmin = factories.Sysadmin()
+    result = toolkit.get_action("dcpr_request_stats")(
+        context={"user": sysadmin["name"]}, data_dict={}
+    )
+    assert result["total"] == 4
+    assert result["by_status"] == {
+        DCPRRequestStatus.UNDER_PREPARATION.value: 1,
+        DCPRRequestStatus.AWAITING_CSI_REVIEW.value: 3,
+    }
+    assert result["by_organization"] == {owner_org["name"]: 4}
+    assert result["by_urgency"] == {"High": 2, "Low": 2}
+    assert result["by_month"] == {"2022-02": 4}
+    assert result["median_review_days"]["nsif_review"] is None
+    assert result["median_review_days"]["csi_moderation"] is None
+
+
+@pytest.mark.usefixtures("emc_clean_db", "with_plugins", "with_request_context")
+def test_dcpr_request_stats_median_review_days():
+    owner_user = factories.User()
+    owner_org = factories.Organization(users=[{"name": owner_user["name"]}])
+    sysadmin = factories.Sysadmin()
+    created = _create_dcpr_request(
+        owner_user,
+        owner_org,
+        "High",
+        datasets=[{"proposed_dataset_title": "first", "dataset_purpose": "dummy"}],
+    )
+    data_dict = {"csi_reference_id": created["csi_reference_id"]}
+    with mock.patch.object(toolkit, "enqueue_job"):
+        toolkit.get_action("dcpr_request_submit")(
+            context={"user": owner_user["name"]}, data_dict=data_dict
+        )
+        for claim_action, moderate_action in (
+            ("claim_dcpr_request_nsif_reviewer", "dcpr_request_nsif_moderate"),
+            ("claim_dcpr_request_csi_reviewer", "dcpr_request_csi_moderate"),
+        ):
+            toolkit.get_action(claim_action)(
+                context={"user": sysadmin["name"]}, data_dict=data_dict
+            )
+            toolkit.get_action(moderate_action)(
+                context={"user": sysadmin["name"]},
+                data_dict={**data_dict, "action": "APPROVE"},
+            )
+    result = toolkit.get_action("dcpr_request_stats")(
+        context={"user": sysadmin["name"]}, data_dict={}
+    )
+    assert result["by_status"] == {DCPRRequestStatus.ACCEPTED.value: 1}
+    assert result["median_review_days"]["nsif_review"] >= 0
+    assert result["median_review_days"]["csi_moderation"] >= 0
+
+
+@pytest.mark.usefixtures("emc_clean_db", "with_plugins", "with_request_context")
+def test_dcpr_request_stats_auth():
+    user = factories.User()
+    with pytest.raises(toolkit.NotAuthorized):
+        toolkit.get_action("dcpr_request_stats")(
+            context={"user": user["name"], "ignore_auth": False}, data_dict={}
+        )
+
+
+def _create_dcpr_request(
+    user: typing.Dict,
+    organization: typing.Dict,
+    urgency: str,
+    datasets: typing.Optional[typing.List[typing.Dict]] = None,
+) -> typing.Dict:
+    return toolkit.get_action("dcpr_request_create")(
+        context={"user": user["name"]},
+        data_dict={
+            "proposed_project_name": "test",
+            "capture_start_date": "2022-01-01",
+            "capture_end_date": "2022-01-02",
+            "cost": "200000",
+            "data_capture_urgency": urgency,
+            "organization_id": organization["id"],
+            "datasets": datasets or [],
+        },
+    )
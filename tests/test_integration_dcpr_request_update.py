@@ -0,0 +1,145 @@
+import typing
+from unittest import mock
+
+import pytest
+
+from ckan import model
+from ckan.plugins import toolkit
+from ckan.tests import factories
+
+from ckanext.dalrrd_emc_dcpr.constants import DCPRRequestStatus
+from ckanext.dalrrd_emc_dcpr.model.dcpr_request import DCPRRequest
+
+pytestmark = pytest.mark.integration
+
+
+@pytest.mark.usefixtures("emc_clean_db", "with_plugins", "with_request_context")
+def test_dcpr_request_update_by_owner_saves_dataset_changes():
+    owner_user = factories.User()
+    owner_org = factories.Organization(users=[{"name": owner_user["name"]}])
+    dcpr_request = _create_dcpr_request(owner_user, owner_org)
+    kept, removed = dcpr_request["datasets"]
+    updated = _update_dcpr_request(
+        owner_user,
+        dcpr_request,
+        [
+            {**kept, "proposed_dataset_title": "changed"},
+            {"proposed_dataset_title": "new", "dataset_purpose": "dummy"},
+        ],
+    )
+    datasets = {ds["proposed_dataset_title"]: ds for ds in updated["datasets"]}
+    assert sorted(datasets.keys()) == ["changed", "new"]
+    assert datasets["changed"]["dataset_id"] == kept["dataset_id"]
+    assert removed["dataset_id"] not in (ds["dataset_id"] for ds in updated["datasets"])
+
+
+@pytest.mark.usefixtures("emc_clean_db", "with_plugins", "with_request_context")
+def test_dcpr_request_update_by_owner_does_not_rewrite_unchanged_datasets(
+    emc_query_counter,
+):
+    owner_user = factories.User()
+    owner_org = factories.Organization(users=[{"name": owner_user["name"]}])
+    dcpr_request = _create_dcpr_request(owner_user, owner_org)
+    emc_query_counter.clear()
+    updated = _update_dcpr_request(owner_user, dcpr_request, dcpr_request["datasets"])
+    dataset_writes = [
+        statement
+        for statement in emc_query_counter
+        if statement.lstrip().startswith(
+            (
+                "INSERT INTO dcpr_request_dataset ",
+                "UPDATE dcpr_request_dataset ",
+                "DELETE FROM dcpr_request_dataset ",
+            )
+        )
+    ]
+    assert dataset_writes == []
+    assert sorted(ds["dataset_id"] for ds in updated["datasets"]) == sorted(
+        ds["dataset_id"] for ds in dcpr_request["datasets"]
+    )
+
+
+@pytest.mark.usefixtures("emc_clean_db", "with_plugins", "with_request_context")
+def test_dcpr_request_update_by_owner_stores_compact_activity():
+    owner_user = factories.User()
+    owner_org = factories.Organization(users=[{"name": owner_user["name"]}])
+    dcpr_request = _create_dcpr_request(owner_user, owner_org)
+    first = dcpr_request["datasets"][0]
+    _update_dcpr_request(
+        owner_user, dcpr_request, [{**first, "proposed_dataset_title": "changed"}]
+    )
+    activity = (
+        model.Session.query(model.Activity)
+        .filter(model.Activity.object_id == dcpr_request["csi_reference_id"])
+        .order_by(model.Activity.timestamp.desc())
+        .first()
+    )
+    activity_dcpr_request = activity.data["dcpr_request"]
+    assert sorted(activity_dcpr_request.keys()) == [
+        "changed_fields",
+        "csi_moderator",
+        "csi_reference_id",
+        "nsif_reviewer",
+        "owner_user",
+        "proposed_project_name",
+        "status",
+    ]
+    assert "datasets" in activity_dcpr_request["changed_fields"]
+    assert "proposed_project_name" not in activity_dcpr_request["changed_fields"]
+
+
+@pytest.mark.usefixtures("emc_clean_db", "with_plugins", "with_request_context")
+def test_dcpr_request_submit_does_not_commit_without_activity():
+    owner_user = factories.User()
+    owner_org = factories.Organization(users=[{"name": owner_user["name"]}])
+    dcpr_request = _create_dcpr_request(owner_user, owner_org)
+    with mock.patch(
+        "ckanext.dalrrd_emc_dcpr.logic.action.dcpr.update."
+        "create_dcpr_management_activity",
+        side_effect=RuntimeError,
+    ), mock.patch(
+        "ckanext.dalrrd_emc_dcpr.logic.action.dcpr.update.toolkit.enqueue_job"
+    ) as mock_enqueue_job:
+        with pytest.raises(RuntimeError):
+            toolkit.get_action("dcpr_request_submit")(
+                context={"user": owner_user["name"]},
+                data_dict={"csi_reference_id": dcpr_request["csi_reference_id"]},
+            )
+    model.Session.rollback()
+    request_obj = model.Session.query(DCPRRequest).get(dcpr_request["csi_reference_id"])
+    assert request_obj.status == DCPRRequestStatus.UNDER_PREPARATION.value
+    mock_enqueue_job.assert_not_called()
+
+
+def _create_dcpr_request(user: typing.Dict, organization: typing.Dict) -> typing.Dict:
+    return toolkit.get_action("dcpr_request_create")(
+        context={"user": user["name"]},
+        data_dict={
+            "proposed_project_name": "test",
+            "capture_start_date": "2022-01-01",
+            "capture_end_date": "2022-01-02",
+            "cost": "200000",
+            "organization_id": organization["id"],
+            "datasets": [
+                {"proposed_dataset_title": "first", "dataset_purpose": "dummy"},
+                {"proposed_dataset_title": "second", "dataset_purpose": "dummy"},
+            ],
+        },
+    )
+
+
+def _update_dcpr_request(
+    user: typing.Dict, dcpr_request: typing.Dict, datasets: typing.List[typing.Dict]
+) -> typing.Dict:
+    return toolkit.get_action("dcpr_request_update_by_owner")(
+        context={"user": user["name"]},
+        data_dict={
+            "csi_reference_id": dcpr_request["csi_reference_id"],
+            "proposed_project_name": dcpr_request["proposed_project_name"],
+            "capture_start_date": dcpr_request["capture_start_date"],
+            "capture_end_date": dcpr_request["capture_end_date"],
+            "cost": dcpr_request["cost"],
+            "organization_id": dcpr_request["organization_id"],
+            "datasets": [dict(ds) for ds in datasets],
+        },
+    )
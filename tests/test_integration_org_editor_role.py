@@ -1,12 +1,17 @@
 import json
+from unittest import mock
+
 import pytest
 
+from ckan import model
 from ckan.tests import (
     factories,
     helpers,
 )
 from ckan.logic import NotAuthorized
 
+from ckanext.dalrrd_emc_dcpr import caching
+
 pytestmark = pytest.mark.integration
 
 
@@ -172,3 +177,71 @@ def test_update_package(name, private, org_role):
         id=name,
         notes=patched_notes,
     )
+
+
+@pytest.mark.usefixtures("emc_clean_db", "with_plugins", "with_request_context")
+def test_package_publish_auth_cost_does_not_grow_with_org_size(emc_query_counter):
+    queries_per_org_size = {}
+    for org_size in (1, 10, 50):
+        organization = factories.Organization()
+        for _ in range(org_size):
+            helpers.call_action(
+                "organization_member_create",
+                id=organization["id"],
+                username=factories.User()["name"],
+                role="editor",
+            )
+        admin = factories.User()
+        helpers.call_action(
+            "organization_member_create",
+            id=organization["id"],
+            username=admin["name"],
+            role="admin",
+        )
+        context = {
+            "user": admin["name"],
+            "auth_user_obj": model.User.get(admin["id"]),
+            "model": model,
+        }
+        emc_query_counter.clear()
+        assert helpers.call_auth(
+            "package_publish", context.copy(), owner_org=organization["id"]
+        )
+        queries_per_org_size[org_size] = len(emc_query_counter)
+        emc_query_counter.clear()
+        helpers.call_auth(
+            "package_publish", context.copy(), owner_org=organization["id"]
+        )
+        # the memberships of the admin are only loaded once per request
+        assert len(emc_query_counter) < queries_per_org_size[org_size]
+    assert len(set(queries_per_org_size.values())) == 1
+
+
+@pytest.mark.usefixtures("emc_clean_db", "with_plugins", "with_request_context")
+def test_package_publish_auth_reuses_memberships_outside_requests(emc_query_counter):
+    organization = factories.Organization()
+    admin = factories.User()
+    helpers.call_action(
+        "organization_member_create",
+        id=organization["id"],
+        username=admin["name"],
+        role="admin",
+    )
+    # harvest jobs and CLI commands run without a flask request context, but they
+    # reuse the same action context for related auth checks
+    context = {
+        "user": admin["name"],
+        "auth_user_obj": model.User.get(admin["id"]),
+        "model": model,
+    }
+    with mock.patch.object(caching.flask, "has_request_context", return_value=False):
+        emc_query_counter.clear()
+        assert helpers.call_auth(
+            "package_publish", context, owner_org=organization["id"]
+        )
+        first_check_queries = len(emc_query_counter)
+        emc_query_counter.clear()
+        assert helpers.call_auth(
+            "package_publish", context, owner_org=organization["id"]
+        )
+        assert len(emc_query_counter) < first_check_queries
@@ -0,0 +1,134 @@
+from unittest import mock
+
+import flask
+import pytest
+
+from ckanext.dalrrd_emc_dcpr import caching
+
+pytestmark = pytest.mark.unit
+
+
+def test_local_cache_get_or_set_calls_factory_once():
+    cache = caching.LocalCache("test")
+    factory = mock.MagicMock(return_value="value")
+    assert cache.get_or_set("key", factory) == "value"
+    assert cache.get_or_set("key", factory) == "value"
+    factory.assert_called_once()
+
+
+def test_local_cache_entries_expire():
+    cache = caching.LocalCache("test", ttl_seconds=10)
+    with mock.patch.object(caching.time, "monotonic", return_value=100):
+        cache.set("key", "value")
+    with mock.patch.object(caching.time, "monotonic", return_value=105):
+        assert cache.get("key") == "value"
+    with mock.patch.object(caching.time, "monotonic", return_value=111):
+        assert cache.get("key") is None
+
+
+@pytest.mark.parametrize(
+    "key, expected",
+    [
+        pytest.param("first", {"first": None, "second": 2}, id="single-key"),
+        pytest.param(caching._MISSING, {"first": None, "second": None}, id="all-keys"),
+    ],
+)
+def test_local_cache_invalidate(key, expected):
+    cache = caching.LocalCache("test")
+    cache.set("first", 1)
+    cache.set("second", 2)
+    cache.invalidate(key)
+    assert {k: cache.get(k) for k in ("first", "second")} == expected
+
+
+def test_get_cache_returns_same_instance():
+    assert caching.get_cache("shared-test") is caching.get_cache("shared-test")
+
+
+def test_cache_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        caching.Cache("abstract-test")
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value.encode() if isinstance(value, str) else value
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1).encode()
+
+
+def test_redis_cache_invalidation():
+    fake_redis = _FakeRedis()
+    cache = caching.RedisCache("test")
+    with mock.patch.object(caching, "connect_to_redis", return_value=fake_redis):
+        cache.set("first", {"a": 1})
+        cache.set("second", [1, 2])
+        assert cache.get_many(["first", "second", "third"]) == {
+            "first": {"a": 1},
+            "second": [1, 2],
+        }
+        cache.invalidate("first")
+        assert cache.get("first") is None
+        assert cache.get("second") == [1, 2]
+        cache.invalidate()
+        assert cache.get("second") is None
+
+
+def test_redis_cache_errors_are_cache_misses():
+    conn = mock.MagicMock()
+    conn.get.side_effect = caching.redis.exceptions.ConnectionError
+    cache = caching.RedisCache("test")
+    factory = mock.MagicMock(return_value="value")
+    with mock.patch.object(caching, "connect_to_redis", return_value=conn):
+        assert cache.get_or_set("key", factory) == "value"
+    factory.assert_called_once()
+
+
+def test_static_value_is_computed_once_per_key():
+    calls = []
+
+    @caching.static_value()
+    def double(value):
+        calls.append(value)
+        return value * 2
+
+    caching.reset_static_values()
+    assert double(1) == double(1) == 2
+    assert double(2) == 4
+    assert calls == [1, 2]
+    caching.reset_static_values()
+    double(1)
+    assert calls == [1, 2, 1]
+
+
+def test_request_cache_is_scoped_to_the_current_request():
+    app = flask.Flask(__name__)
+    with app.test_request_context():
+        caching.get_request_cache("test")["key"] = "value"
+        assert caching.get_request_cache("test") == {"key": "value"}
+        caching.invalidate_request_cache("test")
+        assert caching.get_request_cache("test") == {}
+        caching.get_request_cache("test")["key"] = "value"
+    with app.test_request_context():
+        assert caching.get_request_cache("test") == {}
+    caching.get_request_cache("test")["key"] = "value"
+    assert caching.get_request_cache("test") == {}
+
+
+def test_request_cache_is_kept_in_the_context_outside_of_requests():
+    context = {}
+    caching.get_request_cache("test", context=context)["key"] = "value"
+    assert caching.get_request_cache("test", context=context) == {"key": "value"}
+    assert caching.get_request_cache("test", context={}) == {}
+    caching.invalidate_request_cache("test", context=context)
+    assert caching.get_request_cache("test", context=context) == {}
@@ -0,0 +1,48 @@
+import pytest
+
+from ckanext.dalrrd_emc_dcpr import dcpr_dictization
+from ckanext.dalrrd_emc_dcpr.model import dcpr_request as dcpr_request_model
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        pytest.param("-22, 16, -35, 33", (16, -35, 33, -22), id="bbox"),
+        pytest.param(
+            '{"type": "Polygon", "coordinates": [[[16, -35], [33, -35], [33, -22], '
+            "[16, -22], [16, -35]]]}",
+            (16, -35, 33, -22),
+            id="geojson",
+        ),
+        pytest.param("spatial_extent", None, id="invalid"),
+        pytest.param("1, 2, 3", None, id="incomplete-bbox"),
+        pytest.param("", None, id="empty"),
+        pytest.param(None, None, id="none"),
+    ],
+)
+def test_parse_spatial_extent(value, expected):
+    assert dcpr_dictization.parse_spatial_extent(value) == expected
+
+
+def test_dcpr_request_activity_dictize():
+    request_obj = dcpr_request_model.DCPRRequest(
+        csi_reference_id="dummy-id",
+        proposed_project_name="dummy project",
+        status="UNDER_PREPARATION",
+        owner_user="dummy-user",
+        nsif_review_notes="these are not kept",
+    )
+    result = dcpr_dictization.dcpr_request_activity_dictize(
+        request_obj, changed_fields=["status", "nsif_review_notes"]
+    )
+    assert result == {
+        "csi_reference_id": "dummy-id",
+        "proposed_project_name": "dummy project",
+        "status": "UNDER_PREPARATION",
+        "owner_user": "dummy-user",
+        "nsif_reviewer": None,
+        "csi_moderator": None,
+        "changed_fields": ["nsif_review_notes", "status"],
+    }
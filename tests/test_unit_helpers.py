@@ -1,6 +1,11 @@
+from unittest import mock
+
 import pytest
 
-from ckanext.dalrrd_emc_dcpr import helpers
+from ckanext.dalrrd_emc_dcpr import (
+    caching,
+    helpers,
+)
 
 pytestmark = pytest.mark.unit
 
@@ -21,3 +26,65 @@ pytestmark = pytest.mark.unit
 )
 def test_convert_geojson_to_bbox(value, expected):
     assert helpers.convert_geojson_to_bbox(value) == expected
+
+
+def test_get_group_titles_queries_db_only_on_cache_miss(ckan_config):
+    caching.invalidate(caching.GROUP_TITLES_CACHE_NAME)
+    with mock.patch.object(helpers.model, "Session") as mock_session:
+        mock_query = mock_session.query.return_value.filter.return_value
+        mock_query.all.return_value = [("org1", "Organization 1")]
+        first = helpers.get_group_titles(["org1", "missing"])
+        second = helpers.get_group_titles(["org1", "missing"])
+    assert first == second == {"org1": "Organization 1", "missing": None}
+    mock_session.query.assert_called_once()
+    caching.invalidate(caching.GROUP_TITLES_CACHE_NAME)
+
+
+def test_homepage_datasets_are_cached_until_invalidated(ckan_config):
+    helpers.invalidate_homepage_datasets_cache()
+    with mock.patch.object(helpers.toolkit, "get_action") as mock_get_action:
+        mock_get_action.return_value.return_value = {"results": [{"name": "ds1"}]}
+        helpers.get_featured_datasets()
+        helpers.get_featured_datasets()
+        assert mock_get_action.return_value.call_count == 1
+        helpers.invalidate_homepage_datasets_cache()
+        assert helpers.get_featured_datasets() == [{"name": "ds1"}]
+        assert mock_get_action.return_value.call_count == 2
+    helpers.invalidate_homepage_datasets_cache()
+
+
+def test_nav_pages_are_cached_until_a_page_changes(ckan_config):
+    caching.invalidate(caching.NAV_PAGES_CACHE_NAME)
+    pages = [{"name": "about-us", "title": "About <us>", "page_type": "page"}]
+    with mock.patch.object(helpers.toolkit, "get_action") as mock_get_action:
+        mock_get_action.return_value.return_value = pages
+        first = helpers._get_nav_pages()
+        second = helpers._get_nav_pages()
+        caching.invalidate(caching.NAV_PAGES_CACHE_NAME)
+        helpers._get_nav_pages()
+    expected_link = '<a href="/pages/about-us">About &lt;us&gt;</a>'
+    assert first == second == [{"name": "about-us", "link": expected_link}]
+    assert mock_get_action.return_value.call_count == 2
+    caching.invalidate(caching.NAV_PAGES_CACHE_NAME)
+
+
+def test_get_sasdi_themes_uses_cached_vocabulary(ckan_config):
+    caching.invalidate(caching.VOCABULARIES_CACHE_NAME, shared=True)
+    with mock.patch.object(helpers.toolkit, "get_action") as mock_get_action:
+        mock_get_action.return_value.return_value = ["Hydrology"]
+        first = helpers.get_sasdi_themes()
+        second = helpers.get_sasdi_themes()
+    assert first == second == [{"value": "Hydrology", "label": "Hydrology"}]
+    mock_get_action.return_value.assert_called_once()
+    caching.invalidate(caching.VOCABULARIES_CACHE_NAME, shared=True)
+
+
+def test_get_iso_topic_categories_accepts_scheming_field():
+    caching.reset_static_values()
+    field = {"field_name": "iso_topic_category", "choices_helper": "dummy"}
+    first = helpers.get_iso_topic_categories(field)
+    first[0]["label"] = "changed by the caller"
+    second = helpers.get_iso_topic_categories(field)
+    assert second[0]["label"] != "changed by the caller"
+    assert len(second) == len(first)
+    caching.reset_static_values()
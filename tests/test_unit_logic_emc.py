@@ -1,8 +1,16 @@
+import enum
+
 import pkg_resources
 import pytest
 from unittest import mock
 
-from ckanext.dalrrd_emc_dcpr.logic.action import emc
+from ckanext.dalrrd_emc_dcpr import caching
+from ckanext.dalrrd_emc_dcpr.constants import DcprManagementActivityType
+from ckanext.dalrrd_emc_dcpr.logic.action import (
+    emc,
+    get_management_activity_schema,
+    register_management_activity_types,
+)
 
 pytestmark = pytest.mark.unit
 
@@ -16,6 +24,27 @@ def test_show_version(mock_pkg_resources, mock_os):
     mock_pkg_resources_working_set = mock.MagicMock(pkg_resources.WorkingSet)
     mock_pkg_resources_working_set.version = fake_version
     mock_pkg_resources.require.return_value = [mock_pkg_resources_working_set]
+    caching.reset_static_values()
     result = emc.show_version()
     assert result["git_sha"] == fake_git_sha
     assert result["version"] == fake_version
+    emc.show_version()
+    mock_pkg_resources.require.assert_called_once()
+    caching.reset_static_values()
+
+
+def test_get_management_activity_schema_is_built_once():
+    register_management_activity_types(DcprManagementActivityType)
+    activity_type = DcprManagementActivityType.CREATE_DCPR_REQUEST
+    schema = get_management_activity_schema(activity_type)
+    validator_names = [v.__name__ for v in schema["activity_type"]]
+    assert "activity_type_exists" not in validator_names
+    assert get_management_activity_schema(activity_type) is schema
+
+
+def test_get_management_activity_schema_rejects_unregistered_types():
+    class UnregisteredActivityType(enum.Enum):
+        DUMMY = "dummy activity"
+
+    with pytest.raises(ValueError):
+        get_management_activity_schema(UnregisteredActivityType.DUMMY)
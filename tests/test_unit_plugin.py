@@ -1,4 +1,5 @@
 import pytest
+from unittest import mock
 
 from ckanext.dalrrd_emc_dcpr.plugins import emc_dcpr_plugin
 
@@ -16,3 +17,102 @@ pytestmark = pytest.mark.unit
 def test_parse_date(raw_date, expected):
     result = emc_dcpr_plugin._parse_date(raw_date)
     assert result == expected
+
+
+def test_after_search_reuses_facets_of_current_search(ckan_config, monkeypatch):
+    monkeypatch.setitem(
+        ckan_config, "ckan.dalrrd_emc_dcpr.global_facets_snapshot", "false"
+    )
+    search_facets = {
+        "tags": {"title": "tags", "items": [{"name": "a", "display_name": "a"}]}
+    }
+    search_results = {
+        "facets": {"tags": {"a": 1}},
+        "search_facets": search_facets,
+    }
+    with mock.patch.object(emc_dcpr_plugin.search, "query_for") as mock_query_for:
+        result = emc_dcpr_plugin.DalrrdEmcDcprPlugin().after_search(search_results, {})
+    mock_query_for.assert_not_called()
+    assert result["search_facets"] == search_facets
+
+
+@pytest.mark.parametrize("pages_loaded", [True, False])
+def test_pages_actions_are_only_registered_with_the_pages_plugin(pages_loaded):
+    plugin = emc_dcpr_plugin.DalrrdEmcDcprPlugin()
+    with mock.patch.object(
+        emc_dcpr_plugin.plugins, "plugin_loaded", return_value=pages_loaded
+    ):
+        actions = plugin.get_actions()
+        auth_functions = plugin.get_auth_functions()
+    for name in ("ckanext_pages_update", "ckanext_pages_delete"):
+        assert (name in actions) == pages_loaded
+        assert (name in auth_functions) == pages_loaded
+
+
+def test_restructure_facets():
+    result = emc_dcpr_plugin._restructure_facets({"tags": {"a": 2, "b": 1}})
+    assert result == {
+        "tags": {
+            "title": "tags",
+            "items": [
+                {"name": "a", "display_name": "a", "count": 2},
+                {"name": "b", "display_name": "b", "count": 1},
+            ],
+        }
+    }
+
+
+@pytest.mark.parametrize(
+    "pkg_dict, expected",
+    [
+        pytest.param(
+            {"reference_date": "2022-02-23"},
+            {
+                "reference_date": "2022-02-23T00:00:00Z",
+                "reference_date_year": 2022,
+                "reference_date_decade": 2020,
+            },
+            id="reference-date",
+        ),
+        pytest.param(
+            {"reference_date": "2019-05-01T12:00:00+02:00"},
+            {
+                "reference_date": "2019-05-01T10:00:00Z",
+                "reference_date_year": 2019,
+                "reference_date_decade": 2010,
+            },
+            id="reference-date-with-timezone",
+        ),
+        pytest.param(
+            {"reference_date": "not a date"},
+            {"reference_date": "not a date"},
+            id="invalid-reference-date",
+        ),
+        pytest.param(
+            {
+                "extras_spatial": (
+                    '{"type": "Polygon", "coordinates": [[[16.0, -35.0], '
+                    "[33.0, -35.0], [33.0, -22.0], [16.0, -22.0], [16.0, -35.0]]]}"
+                )
+            },
+            {"minx": 16.0, "miny": -35.0, "maxx": 33.0, "maxy": -22.0},
+            id="spatial-bounds",
+        ),
+        pytest.param(
+            {"spatial": "not geojson"},
+            {"spatial": "not geojson"},
+            id="invalid-spatial",
+        ),
+    ],
+)
+def test_before_index(pkg_dict, expected):
+    result = emc_dcpr_plugin.DalrrdEmcDcprPlugin().before_index(dict(pkg_dict))
+    for key, value in expected.items():
+        assert result[key] == value
+
+
+def test_before_fork_builds_app_for_forked_jobs():
+    plugin = emc_dcpr_plugin.DalrrdEmcDcprPlugin()
+    with mock.patch.object(emc_dcpr_plugin, "get_app") as mock_get_app:
+        plugin.before_fork()
+    mock_get_app.assert_called_once()
@@ -0,0 +1,21 @@
+from unittest import mock
+
+import pytest
+
+import ckanext.dalrrd_emc_dcpr
+from ckanext.dalrrd_emc_dcpr import caching
+
+pytestmark = pytest.mark.unit
+
+
+@mock.patch("ckanext.dalrrd_emc_dcpr.make_app", autospec=True)
+def test_provide_request_context_builds_app_once(mock_make_app):
+    caching.reset_static_values()
+
+    @ckanext.dalrrd_emc_dcpr.provide_request_context
+    def job(context, value):
+        return value
+
+    assert [job(i) for i in range(3)] == [0, 1, 2]
+    mock_make_app.assert_called_once()
+    caching.reset_static_values()